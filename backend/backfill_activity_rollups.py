@@ -0,0 +1,36 @@
+"""Backfill per-user, per-day activity rollups from the raw activity history
+
+Days up to yesterday (UTC) are rebuilt; today's rollups are left to the live
+counters. When rollups are first deployed, run this once right away and once
+more after the next midnight UTC, so activity logged earlier on the deploy
+day is counted too. Reruns are safe: counters are only ever raised.
+
+Usage:
+    python backfill_activity_rollups.py [--user-id USER_ID]
+"""
+import argparse
+import asyncio
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+from dependencies import get_activity_service, cleanup_services
+
+async def main(user_id: str = None):
+    activity_service = get_activity_service()
+    await activity_service.ensure_indexes()
+    
+    rollups = await activity_service.backfill_rollups(user_id)
+    print(f"Rebuilt {rollups} activity rollup(s) up to yesterday (UTC)")
+    
+    await cleanup_services()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill activity rollups")
+    parser.add_argument("--user-id", help="Only backfill rollups for this user")
+    args = parser.parse_args()
+    
+    asyncio.run(main(args.user_id))
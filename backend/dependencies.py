@@ -9,8 +9,16 @@ from services.document_service import DocumentService
 from services.llm_service import LLMService
 from services.embedding_service import EmbeddingService
 from services.task_service import TaskService
+from services.task_events import TaskEventBus
+from services.task_worker import TaskWorker
 from services.auth_service import AuthService
 from services.activity_service import ActivityService
+from services.activity_sink import ActivitySink
+from services.message_bus import create_message_bus
+from services.intent_router import IntentRouter
+from services.transcription_service import TranscriptionBackend, create_transcription_backend
+from services.tts_service import TTSService
+from services.janitor import Janitor
 
 # Global dependencies
 security = HTTPBearer()
@@ -28,8 +36,13 @@ _document_service = None
 _llm_service = None
 _embedding_service = None
 _task_service = None
+_task_worker = None
 _auth_service = None
 _activity_service = None
+_intent_router = None
+_transcription_backend = None
+_tts_service = None
+_janitor = None
 
 def get_database():
     """Get database instance"""
@@ -61,41 +74,122 @@ def get_task_service():
     """Get task service instance"""
     global _task_service
     if _task_service is None:
-        _task_service = TaskService(db)
+        events = TaskEventBus(create_message_bus(
+            os.environ.get('TASK_EVENT_BROKER', 'local'), db, "task_events"
+        ))
+        _task_service = TaskService(
+            db, events,
+            batch_concurrency=int(os.environ.get('TASK_BATCH_CONCURRENCY', 8)),
+            retention_days=int(os.environ.get('TASK_RETENTION_DAYS', 7)),
+            document_service=get_document_service(),
+            redaction_workers=int(os.environ['REDACTION_WORKERS']) if os.environ.get('REDACTION_WORKERS') else None
+        )
     return _task_service
 
+def get_task_worker():
+    """Get the in-process task worker, or None when tasks run in standalone workers"""
+    global _task_worker
+    if _task_worker is None and os.environ.get('TASK_EMBEDDED_WORKER', 'true').lower() == 'true':
+        task_service = get_task_service()
+        _task_worker = TaskWorker(
+            task_service,
+            concurrency=int(os.environ.get('TASK_WORKER_CONCURRENCY', 4)),
+            visibility_timeout=float(os.environ.get('TASK_VISIBILITY_TIMEOUT', 60)),
+            reserved_slots=int(os.environ.get('TASK_RESERVED_SLOTS', 1))
+        )
+        task_service.queue_listeners.append(_task_worker.notify)
+    return _task_worker
+
 def get_auth_service():
     """Get auth service instance"""
     global _auth_service
     if _auth_service is None:
         secret_key = os.environ.get('JWT_SECRET_KEY', 'your-secret-key-change-in-production')
-        _auth_service = AuthService(db, secret_key)
+        _auth_service = AuthService(
+            db,
+            secret_key,
+            session_cache_ttl=float(os.environ.get('SESSION_CACHE_TTL', 30)),
+            activity_flush_interval=float(os.environ.get('SESSION_ACTIVITY_FLUSH_INTERVAL', 60)),
+            invalidation_bus=create_message_bus(
+                os.environ.get('SESSION_INVALIDATION_BUS', 'local'), db, "sessions"
+            )
+        )
     return _auth_service
 
 def get_activity_service():
     """Get activity service instance"""
     global _activity_service
     if _activity_service is None:
-        _activity_service = ActivityService(db)
+        sink = ActivitySink(
+            db,
+            max_queue_size=int(os.environ.get('ACTIVITY_QUEUE_SIZE', 10000)),
+            batch_size=int(os.environ.get('ACTIVITY_BATCH_SIZE', 200)),
+            flush_interval=float(os.environ.get('ACTIVITY_FLUSH_INTERVAL_MS', 250)) / 1000
+        )
+        _activity_service = ActivityService(db, sink)
     return _activity_service
 
+def get_intent_router():
+    """Get voice intent router instance"""
+    global _intent_router
+    if _intent_router is None:
+        _intent_router = IntentRouter(db, get_llm_service())
+    return _intent_router
+
+def get_transcription_backend() -> TranscriptionBackend:
+    """Get transcription backend instance"""
+    global _transcription_backend
+    if _transcription_backend is None:
+        _transcription_backend = create_transcription_backend(
+            os.environ.get('TRANSCRIPTION_BACKEND', 'mock')
+        )
+    return _transcription_backend
+
+def get_tts_service():
+    """Get text-to-speech audio cache instance"""
+    global _tts_service
+    if _tts_service is None:
+        storage_path = Path(__file__).parent / "storage" / "tts"
+        max_bytes = int(os.environ.get('TTS_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+        _tts_service = TTSService(str(storage_path), max_bytes)
+    return _tts_service
+
+def get_janitor():
+    """Get the background retention janitor, or None when it is disabled"""
+    global _janitor
+    if _janitor is None and os.environ.get('JANITOR_ENABLED', 'true').lower() == 'true':
+        activity_retention_days = int(os.environ.get('ACTIVITY_RETENTION_DAYS', 90))
+        _janitor = Janitor(
+            db,
+            interval=float(os.environ.get('JANITOR_INTERVAL', 3600)),
+            batch_size=int(os.environ.get('JANITOR_BATCH_SIZE', 500)),
+            activity_retention_days=activity_retention_days if activity_retention_days > 0 else None,
+            archive_activities=os.environ.get('ACTIVITY_ARCHIVE', 'false').lower() == 'true',
+            task_retention_days=int(os.environ.get('TASK_RETENTION_DAYS', 7))
+        )
+    return _janitor
+
+async def authenticate_token(token: str, auth_service: AuthService) -> str:
+    """Resolve a bearer token to its user id, raising 401 if it is not valid"""
+    # Verify token
+    payload = auth_service.verify_token(token)
+    if not payload:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    
+    # Check if session exists
+    session = await auth_service.get_session(payload["session_id"])
+    if not session:
+        raise HTTPException(status_code=401, detail="Session not found")
+    
+    return payload["user_id"]
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     auth_service: AuthService = Depends(get_auth_service)
 ) -> str:
     """Get current user from token"""
     try:
-        # Verify token
-        payload = auth_service.verify_token(credentials.credentials)
-        if not payload:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        
-        # Check if session exists
-        session = await auth_service.get_session(payload["session_id"])
-        if not session:
-            raise HTTPException(status_code=401, detail="Session not found")
-        
-        return payload["user_id"]
+        return await authenticate_token(credentials.credentials, auth_service)
         
     except Exception as e:
         raise HTTPException(status_code=401, detail="Authentication failed")
@@ -110,9 +204,50 @@ async def get_current_user_optional(
     except:
         return "anonymous"
 
+# Startup function for application startup
+async def startup_services():
+    """Start background components of services on application startup"""
+    auth_service = get_auth_service()
+    await auth_service.ensure_indexes()
+    await auth_service.invalidation_bus.start()
+    await auth_service.activity_buffer.start()
+    
+    task_service = get_task_service()
+    await task_service.ensure_indexes()
+    await task_service.events.broker.start()
+    
+    task_worker = get_task_worker()
+    if task_worker:
+        await task_worker.start()
+    
+    activity_service = get_activity_service()
+    await activity_service.ensure_indexes()
+    await activity_service.sink.start()
+    
+    janitor = get_janitor()
+    if janitor:
+        await janitor.start()
+
 # Cleanup function for application shutdown
 async def cleanup_services():
     """Cleanup services on application shutdown"""
     global client
+    if _janitor is not None:
+        await _janitor.stop()
+    
+    if _task_worker is not None:
+        await _task_worker.stop()
+    
+    if _task_service is not None:
+        await _task_service.events.broker.stop()
+        _task_service.redaction_engine.shutdown()
+    
+    if _activity_service is not None:
+        await _activity_service.sink.stop()
+    
+    if _auth_service is not None:
+        await _auth_service.activity_buffer.stop()
+        await _auth_service.invalidation_bus.stop()
+    
     if client:
         client.close()
\ No newline at end of file
@@ -39,6 +39,11 @@ class DocumentAction(BaseModel):
     document_ids: List[str]
     parameters: Dict[str, Any] = {}
 
+class DocumentExport(BaseModel):
+    document_ids: Optional[List[str]] = None
+    category: Optional[str] = None  # Export a whole category; combined with ids it filters them
+    include_manifest: bool = True
+
 class DocumentSearchResult(BaseModel):
     document: DocumentMetadata
     relevance_score: float
@@ -61,12 +66,25 @@ class TaskStatus(BaseModel):
     task_type: str
     status: str = "pending"  # pending, processing, completed, failed
     progress: float = 0.0
+    priority: str = "normal"  # interactive, normal, bulk
     result: Optional[Dict[str, Any]] = None
     error: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     user_id: str
 
+class PipelineNode(BaseModel):
+    id: str
+    op: str  # extract, translate, summarize, analyze, generate_tasks
+    inputs: List[str] = []
+    params: Dict[str, Any] = {}
+
+class PipelineRequest(BaseModel):
+    document_id: str
+    template: Optional[str] = None  # Use a predefined pipeline instead of nodes
+    nodes: Optional[List[PipelineNode]] = None
+    priority: Optional[str] = None
+
 class UserSession(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     user_id: str
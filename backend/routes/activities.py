@@ -38,6 +38,14 @@ async def get_activity_summary(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/writer/stats")
+async def get_activity_writer_stats(
+    activity_service: ActivityService = Depends(get_activity_service),
+    current_user: str = Depends(get_current_user)
+):
+    """Get queue depth, lag and drop counters for the batched activity writer"""
+    return activity_service.sink.get_stats()
+
 @router.get("/memories", response_model=List[MemoryEntry])
 async def get_memories(
     limit: int = Query(50, le=100),
@@ -1,13 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Header
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
+from datetime import datetime
 import json
 
 from services.document_service import DocumentService
 from services.task_service import TaskService
 from services.activity_service import ActivityService
 from services.auth_service import AuthService
-from models.document import DocumentMetadata, DocumentSearch, DocumentAction, DocumentSearchResult
-from dependencies import get_document_service, get_task_service, get_activity_service, get_current_user
+from services.llm_service import LLMService
+from models.document import DocumentMetadata, DocumentSearch, DocumentAction, DocumentSearchResult, DocumentExport
+from dependencies import get_document_service, get_task_service, get_activity_service, get_llm_service, get_current_user
+from utils.sse import format_sse, SSE_HEADERS
+
+STREAMABLE_ACTIONS = {"summarize", "compare", "redact", "translate", "extract"}
+TEXT_ACTIONS = {"summarize", "translate", "analyze", "redact", "compare"}  # Task handlers that read extracted text
+MAX_HANDOFF_TEXT_CHARS = 1_000_000  # Larger texts are re-read by the task instead of stored with it
 
 router = APIRouter(prefix="/documents", tags=["documents"])
 
@@ -113,42 +121,111 @@ async def search_documents(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/export")
+async def export_documents(
+    export: DocumentExport,
+    document_service: DocumentService = Depends(get_document_service),
+    activity_service: ActivityService = Depends(get_activity_service),
+    current_user: str = Depends(get_current_user)
+):
+    """Stream a ZIP archive of selected documents or a whole category"""
+    try:
+        if not export.document_ids and not export.category:
+            raise HTTPException(status_code=400, detail="Select document_ids or a category to export")
+        
+        if not await document_service.has_export_documents(current_user, export.document_ids, export.category):
+            raise HTTPException(status_code=404, detail="No documents to export")
+        
+        await activity_service.log_activity(
+            user_id=current_user,
+            action="Documents Exported",
+            description=f"Exported {export.category or 'selected'} documents as ZIP",
+            activity_type="export",
+            actor="user"
+        )
+        
+        documents = document_service.iter_export_documents(current_user, export.document_ids, export.category)
+        label = "".join(c if c.isalnum() or c in "-_" else "_" for c in export.category or "documents")
+        filename = f"{label}-{datetime.utcnow():%Y%m%d-%H%M%S}.zip"
+        return StreamingResponse(
+            document_service.export_archive(documents, export.include_manifest),
+            media_type="application/zip",
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.post("/action")
 async def document_action(
     action: DocumentAction,
     document_service: DocumentService = Depends(get_document_service),
     task_service: TaskService = Depends(get_task_service),
     activity_service: ActivityService = Depends(get_activity_service),
-    current_user: str = Depends(get_current_user)
+    current_user: str = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None)
 ):
     """Perform action on documents"""
     try:
-        # Validate documents belong to user
-        documents = []
+        # Validate documents belong to user with a single query
+        include_text = action.action in TEXT_ACTIONS
+        documents = await document_service.get_documents_by_ids(action.document_ids, current_user, include_text)
+        found = {doc.id for doc in documents}
         for doc_id in action.document_ids:
-            doc = await document_service.get_document_by_id(doc_id, current_user)
-            if not doc:
+            if doc_id not in found:
                 raise HTTPException(status_code=404, detail=f"Document {doc_id} not found")
-            documents.append(doc)
         
-        # Create background task for processing
+        # Hand the validated documents to the task so it does not read them again
+        if include_text and sum(len(doc.extracted_text or "") for doc in documents) > MAX_HANDOFF_TEXT_CHARS:
+            include_text = False
+        fields = {"id", "original_filename", "file_path", "file_type", "mime_type", "category"}
+        if include_text:
+            fields.add("extracted_text")
+        
+        # Create background task for processing; repeated identical submissions reuse it
         task_params = {
             "user_id": current_user,
             "action": action.action,
             "document_ids": action.document_ids,
-            "parameters": action.parameters
+            "parameters": action.parameters,
+            "documents": [doc.dict(include=fields) for doc in documents]
         }
         
-        if action.action == "summarize":
-            task = await task_service.create_task("document_summarization", current_user, task_params)
+        # Optional scheduling class; clients may only lower the task type's default
+        priority = action.parameters.get("priority")
+        
+        if action.action in ("summarize", "analyze") and len(documents) > 1:
+            # Several documents fan out as one batch task
+            task_params["operation"] = action.action
+            task, created = await task_service.submit_task("batch_document_processing", current_user, task_params, priority, idempotency_key)
+        elif action.action == "summarize":
+            task, created = await task_service.submit_task("document_summarization", current_user, task_params, priority, idempotency_key)
         elif action.action == "merge":
-            task = await task_service.create_task("document_merge", current_user, task_params)
+            task, created = await task_service.submit_task("document_merge", current_user, task_params, priority, idempotency_key)
+        elif action.action == "compare":
+            if len(documents) != 2:
+                raise ValueError("Select exactly two documents to compare")
+            task, created = await task_service.submit_task("document_comparison", current_user, task_params, priority, idempotency_key)
+        elif action.action == "redact":
+            task, created = await task_service.submit_task("document_redaction", current_user, task_params, priority, idempotency_key)
         elif action.action == "translate":
-            task = await task_service.create_task("document_translation", current_user, task_params)
+            task, created = await task_service.submit_task("document_translation", current_user, task_params, priority, idempotency_key)
         elif action.action == "analyze":
-            task = await task_service.create_task("document_analysis", current_user, task_params)
+            task, created = await task_service.submit_task("document_analysis", current_user, task_params, priority, idempotency_key)
         else:
-            task = await task_service.create_task("document_processing", current_user, task_params)
+            task, created = await task_service.submit_task("document_processing", current_user, task_params, priority, idempotency_key)
+        
+        if not created:
+            # Same task as an earlier submission: report it, including its result if finished
+            return {
+                "task_id": task.id,
+                "status": task.status,
+                "deduplicated": True,
+                "result": task.result,
+                "message": f"{action.action.title()} already requested for {len(documents)} document(s)"
+            }
         
         # Log activity
         await activity_service.log_activity(
@@ -163,9 +240,14 @@ async def document_action(
         return {
             "task_id": task.id,
             "status": task.status,
+            "deduplicated": False,
             "message": f"Started {action.action} for {len(documents)} document(s)"
         }
         
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -253,4 +335,61 @@ async def get_document_file(
         )
         
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/{document_id}/{action}/stream")
+async def stream_document_action(
+    document_id: str,
+    action: str,
+    language: Optional[str] = Query(None),
+    compare_with: Optional[str] = Query(None),
+    document_service: DocumentService = Depends(get_document_service),
+    task_service: TaskService = Depends(get_task_service),
+    llm_service: LLMService = Depends(get_llm_service),
+    activity_service: ActivityService = Depends(get_activity_service),
+    current_user: str = Depends(get_current_user)
+):
+    """Stream a document action (e.g. summarize) as Server-Sent Events"""
+    if action not in STREAMABLE_ACTIONS:
+        raise HTTPException(status_code=400, detail=f"Action '{action}' does not support streaming")
+    
+    document = await document_service.get_document_by_id(document_id, current_user)
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    
+    parameters = {"language": language} if language else {}
+    
+    if action == "compare":
+        # Compare streams the diff of this document against another one
+        other = await document_service.get_document_by_id(compare_with, current_user) if compare_with else None
+        if not other:
+            raise HTTPException(status_code=400, detail="compare_with must name another of your documents")
+        # Share the compare task's cache so repeated diffs of the same texts are computed once
+        parameters["comparison"], _ = await task_service.compare_texts(
+            document.extracted_text or "", other.extracted_text or ""
+        )
+    
+    async def event_stream():
+        try:
+            async for event in llm_service.stream_document_action(
+                action, document.extracted_text or "", parameters
+            ):
+                if event["type"] == "token":
+                    yield format_sse({"token": event["content"]}, event="token")
+                else:
+                    yield format_sse(event["result"], event="done")
+            
+            await activity_service.log_activity(
+                user_id=current_user,
+                action=f"Document {action.title()}",
+                description=f"Streamed {action} for document: {document.original_filename}",
+                activity_type=action,
+                actor="ai",
+                file_type=document.file_type.upper(),
+                files=[document.original_filename]
+            )
+        
+        except Exception as e:
+            yield format_sse({"detail": str(e)}, event="error")
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
@@ -1,9 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Header
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import List, Optional
+import asyncio
 
 from services.task_service import TaskService
-from models.document import TaskStatus
-from dependencies import get_task_service, get_current_user
+from services.auth_service import AuthService
+from services.task_events import TERMINAL_EVENTS
+from models.document import TaskStatus, PipelineRequest
+from dependencies import get_task_service, get_auth_service, get_current_user, authenticate_token
+from utils.sse import format_sse, SSE_HEADERS
+
+optional_security = HTTPBearer(auto_error=False)
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
@@ -44,6 +52,93 @@ async def get_task(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/{task_id}/events")
+async def stream_task_events(
+    task_id: str,
+    token: Optional[str] = Query(None),
+    last_event_id: Optional[str] = Header(None),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    task_service: TaskService = Depends(get_task_service),
+    auth_service: AuthService = Depends(get_auth_service)
+):
+    """Stream task status, progress and result events as Server-Sent Events
+    
+    Accepts the token as a query parameter because browser EventSource cannot
+    set headers. Reconnecting clients resume after their Last-Event-ID.
+    """
+    try:
+        current_user = await authenticate_token(
+            credentials.credentials if credentials else (token or ""), auth_service
+        )
+    except Exception:
+        raise HTTPException(status_code=401, detail="Authentication failed")
+    
+    # Subscribe before reading the snapshot so no state change is missed in between
+    resume_from = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+    queue, replay = task_service.events.subscribe(task_id, resume_from)
+    
+    task = await task_service.get_task_status(task_id, current_user)
+    if not task:
+        task_service.events.unsubscribe(task_id, queue)
+        raise HTTPException(status_code=404, detail="Task not found")
+    
+    async def event_stream():
+        try:
+            if replay:
+                for event in replay:
+                    yield format_sse(event["data"], event=event["event"], event_id=str(event["id"]))
+                    if event["event"] in TERMINAL_EVENTS:
+                        return
+            else:
+                yield format_sse({
+                    "status": task.status,
+                    "progress": task.progress,
+                    "updated_at": task.updated_at
+                }, event="status")
+                
+                if task.status == "completed":
+                    yield format_sse({"result": task.result}, event="result")
+                    return
+                if task.status == "failed":
+                    yield format_sse({"error": task.error}, event="error")
+                    return
+                if task.status == "cancelled":
+                    yield format_sse({}, event="cancelled")
+                    return
+            
+            last_state = (task.status, task.progress)
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=15.0)
+                except asyncio.TimeoutError:
+                    # Events from workers on a local-only broker never arrive here, so re-check the DB
+                    current = await task_service.get_task_status(task_id, current_user)
+                    if current and (current.status, current.progress) != last_state:
+                        last_state = (current.status, current.progress)
+                        yield format_sse({
+                            "status": current.status,
+                            "progress": current.progress,
+                            "updated_at": current.updated_at
+                        }, event="status")
+                        if current.status == "completed":
+                            yield format_sse({"result": current.result}, event="result")
+                            return
+                        if current.status in ("failed", "cancelled"):
+                            yield format_sse({"error": current.error} if current.status == "failed" else {},
+                                             event="error" if current.status == "failed" else "cancelled")
+                            return
+                    else:
+                        yield ": keepalive\n\n"
+                    continue
+                
+                yield format_sse(event["data"], event=event["event"], event_id=str(event["id"]))
+                if event["event"] in TERMINAL_EVENTS:
+                    return
+        finally:
+            task_service.events.unsubscribe(task_id, queue)
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
 @router.post("/{task_id}/cancel")
 async def cancel_task(
     task_id: str,
@@ -91,34 +186,63 @@ async def get_task_stats(
 ):
     """Get task statistics"""
     try:
-        # Get all user tasks
-        tasks = await task_service.get_user_tasks(current_user, 1000)
-        
-        # Calculate statistics
-        total_tasks = len(tasks)
-        status_counts = {}
-        type_counts = {}
-        
-        for task in tasks:
-            # Count by status
-            status = task.status
-            status_counts[status] = status_counts.get(status, 0) + 1
-            
-            # Count by type
-            task_type = task.task_type
-            type_counts[task_type] = type_counts.get(task_type, 0) + 1
+        return await task_service.get_task_stats(current_user)
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/stats/queue")
+async def get_queue_stats(
+    task_service: TaskService = Depends(get_task_service),
+    current_user: str = Depends(get_current_user)
+):
+    """Get queue depth and wait times per priority class (admin function)"""
+    try:
+        # The queue spans every user's tasks
+        if current_user != "admin":
+            raise HTTPException(status_code=403, detail="Admin access required")
+        
+        return await task_service.get_queue_stats()
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/pipelines")
+async def create_pipeline(
+    request: PipelineRequest,
+    idempotency_key: Optional[str] = Header(None),
+    task_service: TaskService = Depends(get_task_service),
+    current_user: str = Depends(get_current_user)
+):
+    """Run a DAG of document steps as one background task"""
+    try:
+        nodes = [node.dict() for node in request.nodes] if request.nodes else None
+        # Reject invalid graphs before anything is queued
+        task_service.pipelines.resolve_nodes(request.template, nodes)
         
-        # Calculate completion rate
-        completed = status_counts.get("completed", 0)
-        completion_rate = (completed / total_tasks * 100) if total_tasks > 0 else 0
+        task, created = await task_service.submit_task(
+            "document_pipeline",
+            current_user,
+            {
+                "user_id": current_user,
+                "document_id": request.document_id,
+                "template": request.template,
+                "nodes": nodes
+            },
+            request.priority,  # May only lower the pipeline's default class
+            idempotency_key
+        )
         
         return {
-            "total_tasks": total_tasks,
-            "completion_rate": round(completion_rate, 1),
-            "status_breakdown": status_counts,
-            "type_breakdown": type_counts,
-            "active_tasks": status_counts.get("processing", 0) + status_counts.get("pending", 0)
+            "task_id": task.id,
+            "status": task.status,
+            "deduplicated": not created,
+            "result": task.result
         }
         
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,93 +1,126 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from typing import Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Request, BackgroundTasks, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, List, Optional, Tuple
+import asyncio
 import json
 
 from services.llm_service import LLMService
 from services.document_service import DocumentService
 from services.activity_service import ActivityService
-from models.document import VoiceCommand, VoiceCommandResult
-from dependencies import get_llm_service, get_document_service, get_activity_service, get_current_user
+from services.intent_router import IntentRouter
+from services.auth_service import AuthService
+from services.transcription_service import TranscriptionBackend
+from services.tts_service import TTSService
+from models.document import VoiceCommand, VoiceCommandResult, DocumentSearch
+from dependencies import (
+    get_llm_service, get_document_service, get_activity_service, get_intent_router,
+    get_auth_service, get_transcription_backend, get_tts_service, get_current_user, authenticate_token
+)
+from utils.json_encoder import CustomJSONEncoder
+from utils.sse import format_sse, SSE_HEADERS
+from utils.range_response import range_file_response
 
 router = APIRouter(prefix="/voice", tags=["voice"])
 
+# Execution plan per intent. The search limit is pushed down to what the intent
+# actually consumes, so merges only fetch the documents they will merge.
+INTENT_PLANS = {
+    "search_documents": {"use_query": True, "requires_category": False, "limit": 10, "actions": []},
+    "merge_documents": {"use_query": False, "requires_category": True, "limit": 3, "actions": ["merge"]},
+    "summarize_documents": {"use_query": False, "requires_category": True, "limit": 10, "actions": ["summarize"]}
+}
+
+def build_voice_plan(intent: str, parameters: Dict[str, Any]) -> Tuple[List[DocumentSearch], List[str]]:
+    """Build the independent search steps and follow-up actions for an intent"""
+    plan = INTENT_PLANS.get(intent)
+    if not plan:
+        return [], []
+    
+    categories = parameters.get("categories") or (
+        [parameters["category"]] if parameters.get("category") else []
+    )
+    if plan["requires_category"] and not categories:
+        return [], []
+    
+    query = parameters.get("query", "") if plan["use_query"] else ""
+    
+    # One step per category; steps are independent and run concurrently
+    searches = [
+        DocumentSearch(query=query, categories=[category], limit=plan["limit"])
+        for category in categories
+    ] or [DocumentSearch(query=query, limit=plan["limit"])]
+    
+    return searches, list(plan["actions"])
+
+async def execute_voice_command(command: VoiceCommand, user_id: str,
+                                intent_router: IntentRouter,
+                                document_service: DocumentService) -> Tuple[VoiceCommandResult, Dict[str, Any]]:
+    """Resolve a voice command and run its execution plan"""
+    # Resolve intent locally when confident, otherwise fall back to the LLM
+    llm_result = await intent_router.route(command.command, command.context)
+    
+    searches, actions = build_voice_plan(llm_result["intent"], llm_result["parameters"])
+    step_results = await asyncio.gather(
+        *(document_service.search_documents(search, user_id) for search in searches)
+    )
+    
+    documents = []
+    seen_ids = set()
+    for search, search_results in zip(searches, step_results):
+        for search_result in search_results[:search.limit]:
+            if search_result.document.id not in seen_ids:
+                seen_ids.add(search_result.document.id)
+                documents.append(search_result.document)
+    
+    result = VoiceCommandResult(
+        intent=llm_result["intent"],
+        parameters=llm_result["parameters"],
+        response=llm_result["response"],
+        documents=documents,
+        actions=actions
+    )
+    
+    return result, llm_result
+
+async def log_voice_command(activity_service: ActivityService, user_id: str, command: str,
+                            llm_result: Dict[str, Any], documents_found: int):
+    """Record a processed voice command in the activity log"""
+    await activity_service.log_activity(
+        user_id=user_id,
+        action="Voice Command Processed",
+        description=f"Processed voice command: {command}",
+        activity_type="voice_command",
+        actor="ai",
+        metadata={
+            "command": command,
+            "intent": llm_result["intent"],
+            "parameters": llm_result["parameters"],
+            "response": llm_result["response"],
+            "confidence": llm_result.get("confidence", 0.0),
+            "tier": llm_result.get("tier", "llm"),
+            "documents_found": documents_found
+        }
+    )
+
 @router.post("/command", response_model=VoiceCommandResult)
 async def process_voice_command(
     command: VoiceCommand,
-    llm_service: LLMService = Depends(get_llm_service),
+    background_tasks: BackgroundTasks,
+    intent_router: IntentRouter = Depends(get_intent_router),
     document_service: DocumentService = Depends(get_document_service),
     activity_service: ActivityService = Depends(get_activity_service),
     current_user: str = Depends(get_current_user)
 ):
     """Process a voice command"""
     try:
-        # Process command with LLM
-        llm_result = await llm_service.process_voice_command(command.command, command.context)
-        
-        # Execute the command based on intent
-        documents = []
-        actions = []
-        
-        if llm_result["intent"] == "search_documents":
-            # Search for documents
-            from models.document import DocumentSearch
-            search = DocumentSearch(
-                query=llm_result["parameters"].get("query", ""),
-                categories=[llm_result["parameters"].get("category")] if llm_result["parameters"].get("category") else None,
-                limit=10
-            )
-            
-            search_results = await document_service.search_documents(search, current_user)
-            documents = [result.document for result in search_results]
-            
-        elif llm_result["intent"] == "merge_documents":
-            # Find documents to merge
-            category = llm_result["parameters"].get("category")
-            if category:
-                from models.document import DocumentSearch
-                search = DocumentSearch(
-                    query="",
-                    categories=[category],
-                    limit=10
-                )
-                search_results = await document_service.search_documents(search, current_user)
-                documents = [result.document for result in search_results[:3]]  # Take first 3 for merge
-                actions = ["merge"]
-        
-        elif llm_result["intent"] == "summarize_documents":
-            # Find documents to summarize
-            category = llm_result["parameters"].get("category")
-            if category:
-                from models.document import DocumentSearch
-                search = DocumentSearch(
-                    query="",
-                    categories=[category],
-                    limit=10
-                )
-                search_results = await document_service.search_documents(search, current_user)
-                documents = [result.document for result in search_results]
-                actions = ["summarize"]
-        
-        # Create result
-        result = VoiceCommandResult(
-            intent=llm_result["intent"],
-            parameters=llm_result["parameters"],
-            response=llm_result["response"],
-            documents=documents,
-            actions=actions
+        result, llm_result = await execute_voice_command(
+            command, current_user, intent_router, document_service
         )
         
-        # Log activity
-        await activity_service.log_activity(
-            user_id=current_user,
-            action="Voice Command Processed",
-            description=f"Processed voice command: {command.command}",
-            activity_type="voice_command",
-            actor="ai",
-            metadata={
-                "intent": llm_result["intent"],
-                "confidence": llm_result.get("confidence", 0.0),
-                "documents_found": len(documents)
-            }
+        # Log activity after the response has been sent
+        background_tasks.add_task(
+            log_voice_command, activity_service, current_user,
+            command.command, llm_result, len(result.documents)
         )
         
         return result
@@ -95,88 +128,203 @@ async def process_voice_command(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/intent-stats")
+async def get_intent_stats(
+    intent_router: IntentRouter = Depends(get_intent_router),
+    current_user: str = Depends(get_current_user)
+):
+    """Get hit rates for the local and LLM intent tiers"""
+    return intent_router.get_stats()
+
+@router.post("/chat/stream")
+async def stream_chat(
+    data: Dict[str, Any],
+    llm_service: LLMService = Depends(get_llm_service),
+    current_user: str = Depends(get_current_user)
+):
+    """Stream a chat completion as Server-Sent Events"""
+    messages = data.get("messages", [])
+    if not messages:
+        raise HTTPException(status_code=400, detail="Messages are required")
+    
+    async def event_stream():
+        try:
+            response = []
+            async for token in llm_service.stream_chat_completion(
+                messages,
+                model=data.get("model", "gpt-4"),
+                temperature=data.get("temperature", 0.7)
+            ):
+                response.append(token)
+                yield format_sse({"token": token}, event="token")
+            
+            yield format_sse({"response": "".join(response)}, event="done")
+        
+        except Exception as e:
+            yield format_sse({"detail": str(e)}, event="error")
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
 @router.post("/transcribe")
 async def transcribe_audio(
     audio: UploadFile = File(...),
+    language: str = Form("en"),
+    transcription_backend: TranscriptionBackend = Depends(get_transcription_backend),
     current_user: str = Depends(get_current_user)
 ):
-    """Transcribe audio to text (mock implementation)"""
+    """Transcribe an uploaded audio file to text"""
     try:
-        # Mock transcription - in reality, this would use Whisper API
-        import random
-        
-        # Simulate processing time
-        import asyncio
-        await asyncio.sleep(1.0)
-        
-        # Mock transcription results
-        mock_transcriptions = [
-            "Find the signed contract from last October for ACME Corp",
-            "Merge the three most recent invoices from Vendor A into one PDF",
-            "Summarize all HR onboarding forms signed this month",
-            "Show me all compliance documents that need review",
-            "Convert this document to PDF format",
-            "Send the quarterly report to the team"
-        ]
-        
-        transcription = random.choice(mock_transcriptions)
-        
-        return {
-            "transcription": transcription,
-            "confidence": round(random.uniform(0.85, 0.98), 2),
-            "language": "en",
-            "duration": round(random.uniform(2.5, 8.0), 1),
-            "processing_time": 1.0
-        }
+        audio_data = await audio.read()
+        return await transcription_backend.transcribe(audio_data, language)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _send_json(websocket: WebSocket, payload: Dict[str, Any]):
+    """Send a JSON message, encoding datetimes the same way as the REST API"""
+    await websocket.send_text(json.dumps(payload, cls=CustomJSONEncoder))
+
+@router.websocket("/ws")
+async def voice_session(
+    websocket: WebSocket,
+    token: Optional[str] = Query(None),
+    language: str = Query("en"),
+    auth_service: AuthService = Depends(get_auth_service),
+    intent_router: IntentRouter = Depends(get_intent_router),
+    document_service: DocumentService = Depends(get_document_service),
+    activity_service: ActivityService = Depends(get_activity_service),
+    transcription_backend: TranscriptionBackend = Depends(get_transcription_backend)
+):
+    """Voice session over a WebSocket
+    
+    Authenticates once, then accepts binary audio frames as they are recorded and
+    pushes partial transcripts back. A {"type": "end_utterance"} message finalizes
+    the transcript and runs the command; {"type": "command", "command": "..."}
+    runs a typed command on the same socket.
+    """
+    await websocket.accept()
+    
+    try:
+        current_user = await authenticate_token(token or "", auth_service)
+    except Exception:
+        await websocket.close(code=4401, reason="Authentication failed")
+        return
+    
+    await _send_json(websocket, {"type": "ready", "user_id": current_user})
+    stream = None
+    
+    async def run_command(text: str, context: Dict[str, Any]):
+        command = VoiceCommand(command=text, context=context)
+        result, llm_result = await execute_voice_command(
+            command, current_user, intent_router, document_service
+        )
+        await _send_json(websocket, {"type": "result", "result": result.dict()})
+        await log_voice_command(
+            activity_service, current_user, text, llm_result, len(result.documents)
+        )
+    
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            
+            if message.get("bytes") is not None:
+                if stream is None:
+                    stream = transcription_backend.open_stream(language)
+                partial = await stream.feed(message["bytes"])
+                if partial is not None:
+                    await _send_json(websocket, {"type": "partial", "transcription": partial})
+                continue
+            
+            try:
+                data = json.loads(message.get("text") or "{}")
+            except json.JSONDecodeError:
+                await _send_json(websocket, {"type": "error", "detail": "Invalid message"})
+                continue
+            
+            try:
+                if data.get("type") == "end_utterance":
+                    if stream is None:
+                        await _send_json(websocket, {"type": "error", "detail": "No audio received"})
+                        continue
+                    
+                    final = await stream.finish()
+                    stream = None
+                    await _send_json(websocket, {"type": "final", **final})
+                    
+                    if final["transcription"]:
+                        await run_command(final["transcription"], data.get("context", {}))
+                
+                elif data.get("type") == "command":
+                    if not data.get("command"):
+                        await _send_json(websocket, {"type": "error", "detail": "Command is required"})
+                        continue
+                    await run_command(data["command"], data.get("context", {}))
+                
+                elif data.get("type") == "close":
+                    await websocket.close()
+                    break
+                
+                else:
+                    await _send_json(websocket, {"type": "error", "detail": "Unknown message type"})
+            
+            except Exception as e:
+                await _send_json(websocket, {"type": "error", "detail": str(e)})
+    
+    except WebSocketDisconnect:
+        pass
+
 @router.post("/text-to-speech")
 async def text_to_speech(
     data: Dict[str, Any],
+    tts_service: TTSService = Depends(get_tts_service),
     current_user: str = Depends(get_current_user)
 ):
-    """Convert text to speech (mock implementation)"""
+    """Convert text to speech, reusing cached audio for repeated phrases"""
     try:
         text = data.get("text", "")
         voice = data.get("voice", "default")
+        language = data.get("language", "en")
         
         if not text:
             raise HTTPException(status_code=400, detail="Text is required")
         
-        # Mock TTS processing
-        import asyncio
-        await asyncio.sleep(0.5)
+        audio = await tts_service.synthesize(text, voice, language)
         
         return {
-            "audio_url": f"/api/voice/audio/{hash(text) % 10000}",
+            "audio_id": audio["audio_id"],
+            "audio_url": f"/api/voice/audio/{audio['audio_id']}",
             "text": text,
             "voice": voice,
-            "duration": len(text) * 0.05,  # Rough estimate
-            "format": "mp3"
+            "language": language,
+            "duration": audio["duration"],
+            "format": audio["format"],
+            "cached": audio["cached"]
         }
-        
+    
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/audio/{audio_id}")
 async def get_audio(
     audio_id: str,
+    request: Request,
+    tts_service: TTSService = Depends(get_tts_service),
     current_user: str = Depends(get_current_user)
 ):
-    """Get synthesized audio (mock implementation)"""
-    try:
-        # Mock audio response
-        return {
-            "audio_id": audio_id,
-            "message": "Audio file would be served here",
-            "format": "mp3",
-            "status": "ready"
-        }
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    """Stream synthesized audio with Range support"""
+    path = tts_service.get_audio_path(audio_id)
+    if not path:
+        raise HTTPException(status_code=404, detail="Audio not found")
+    
+    # Audio ids are content hashes, so the bytes behind a URL never change
+    return range_file_response(
+        request, path, tts_service.synthesizer.media_type, etag=audio_id,
+        headers={"Cache-Control": "private, max-age=31536000, immutable"}
+    )
 
 @router.get("/supported-languages")
 async def get_supported_languages():
@@ -11,7 +11,7 @@ import asyncio
 from routes import documents, voice, tasks, activities, auth
 
 # Import dependencies
-from dependencies import cleanup_services
+from dependencies import startup_services, cleanup_services
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -75,6 +75,8 @@ async def startup_event():
     storage_dir.mkdir(exist_ok=True)
     
     logger.info("Storage directory created/verified")
+    
+    await startup_services()
     logger.info("FileClerkAI Backend startup complete")
 
 # Shutdown event
@@ -1,15 +1,24 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
 
 from models.document import ActivityLog, MemoryEntry
+from services.activity_sink import ActivitySink
 from utils.json_encoder import serialize_document, serialize_documents
 
 class ActivityService:
     """Service for managing user activities and memories"""
     
-    def __init__(self, db: AsyncIOMotorClient):
+    def __init__(self, db: AsyncIOMotorClient, sink: ActivitySink = None):
         self.db = db
+        self.sink = sink or ActivitySink(db)
+        self.sink.add_batch_hook(self.update_rollups)
+    
+    async def ensure_indexes(self):
+        """Create indexes used by activity rollups and retention"""
+        await self.db.activity_rollups.create_index([("user_id", 1), ("day", 1)], unique=True)
+        await self.db.activities.create_index("created_at")
     
     async def log_activity(self, user_id: str, action: str, description: str,
                           activity_type: str, actor: str = "user",
@@ -29,9 +38,13 @@ class ActivityService:
             metadata=metadata or {}
         )
         
-        # Store in database
+        # Queue for a batched write; fall back to a direct insert when the sink is not running
         activity_dict = activity.dict()
-        await self.db.activities.insert_one(activity_dict)
+        if self.sink.running:
+            await self.sink.submit(activity_dict)
+        else:
+            await self.db.activities.insert_one(activity_dict)
+            await self.update_rollups([activity_dict])
         
         return activity
     
@@ -168,28 +181,103 @@ class ActivityService:
             metadata={"reference_id": reference_id}
         )
     
+    @staticmethod
+    def _rollup_key(value: str) -> str:
+        """Make a counter name safe to use as a MongoDB field name"""
+        return str(value).replace(".", "_").replace("$", "_")
+    
+    async def update_rollups(self, activities: List[Dict[str, Any]]):
+        """Increment per-user, per-day rollup counters for written activities"""
+        increments: Dict[tuple, Dict[str, int]] = {}
+        
+        for activity in activities:
+            day = activity["created_at"].strftime("%Y-%m-%d")
+            counters = increments.setdefault((activity["user_id"], day), {})
+            
+            type_field = f"activity_types.{self._rollup_key(activity.get('activity_type', 'unknown'))}"
+            actor_field = f"actors.{self._rollup_key(activity.get('actor', 'user'))}"
+            for field in ("total", type_field, actor_field):
+                counters[field] = counters.get(field, 0) + 1
+        
+        if not increments:
+            return
+        
+        operations = [
+            UpdateOne({"user_id": user_id, "day": day}, {"$inc": counters}, upsert=True)
+            for (user_id, day), counters in increments.items()
+        ]
+        await self.db.activity_rollups.bulk_write(operations, ordered=False)
+    
+    async def backfill_rollups(self, user_id: str = None) -> int:
+        """Rebuild rollup documents from the raw activity history
+        
+        Only days before the current UTC day are rebuilt, since the sink is
+        still incrementing today's rollups and a snapshot merged into them
+        would race those increments. Counters are merged with $max so a rerun
+        never lowers them, e.g. after the janitor deleted raw activities.
+        
+        Activity logged on the day rollups are deployed, before the new code
+        started incrementing them, is therefore not counted until this is run
+        again after midnight UTC.
+        """
+        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        match: Dict[str, Any] = {"created_at": {"$lt": today}}
+        if user_id:
+            match["user_id"] = user_id
+        pipeline = [
+            {"$match": match},
+            {"$group": {
+                "_id": {
+                    "user_id": "$user_id",
+                    "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
+                    "activity_type": {"$ifNull": ["$activity_type", "unknown"]},
+                    "actor": {"$ifNull": ["$actor", "user"]}
+                },
+                "count": {"$sum": 1}
+            }}
+        ]
+        
+        counters: Dict[tuple, Dict[str, int]] = {}
+        async for row in self.db.activities.aggregate(pipeline, allowDiskUse=True):
+            key = row["_id"]
+            rollup = counters.setdefault((key["user_id"], key["day"]), {})
+            
+            type_field = f"activity_types.{self._rollup_key(key['activity_type'])}"
+            actor_field = f"actors.{self._rollup_key(key['actor'])}"
+            for field in ("total", type_field, actor_field):
+                rollup[field] = rollup.get(field, 0) + row["count"]
+        
+        operations = [
+            UpdateOne({"user_id": user_id, "day": day}, {"$max": fields}, upsert=True)
+            for (user_id, day), fields in counters.items()
+        ]
+        for start in range(0, len(operations), 1000):
+            await self.db.activity_rollups.bulk_write(operations[start:start + 1000], ordered=False)
+        
+        return len(operations)
+    
     async def get_recent_activities_summary(self, user_id: str, days: int = 7) -> Dict[str, Any]:
-        """Get summary of recent activities"""
-        # Get activities from the last N days
-        from datetime import timedelta
+        """Get summary of recent activities from the per-day rollups"""
         cutoff_date = datetime.utcnow() - timedelta(days=days)
         
-        activities = await self.db.activities.find({
+        rollups = await self.db.activity_rollups.find({
             "user_id": user_id,
-            "created_at": {"$gte": cutoff_date}
-        }).to_list(1000)
+            "day": {"$gte": cutoff_date.strftime("%Y-%m-%d")}
+        }).to_list(days + 1)
         
         # Calculate summary statistics
-        total_activities = len(activities)
+        total_activities = 0
         activity_types = {}
         actors = {"ai": 0, "user": 0}
         
-        for activity in activities:
-            activity_type = activity.get("activity_type", "unknown")
-            activity_types[activity_type] = activity_types.get(activity_type, 0) + 1
+        for rollup in rollups:
+            total_activities += rollup.get("total", 0)
             
-            actor = activity.get("actor", "user")
-            actors[actor] = actors.get(actor, 0) + 1
+            for activity_type, count in rollup.get("activity_types", {}).items():
+                activity_types[activity_type] = activity_types.get(activity_type, 0) + count
+            
+            for actor, count in rollup.get("actors", {}).items():
+                actors[actor] = actors.get(actor, 0) + count
         
         return {
             "total_activities": total_activities,
@@ -197,4 +285,4 @@ class ActivityService:
             "actors": actors,
             "days": days,
             "period": f"{cutoff_date.strftime('%Y-%m-%d')} to {datetime.utcnow().strftime('%Y-%m-%d')}"
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,121 @@
+import asyncio
+import time
+from typing import Dict, Any, List, Callable, Awaitable
+from motor.motor_asyncio import AsyncIOMotorClient
+
+class ActivitySink:
+    """Asynchronous, batched activity log writer
+
+    Activities are queued in a bounded in-memory queue and written with
+    insert_many every ``flush_interval`` seconds or ``batch_size`` records,
+    whichever comes first. When the queue is full, producers wait up to
+    ``backpressure_timeout`` for room before the record is dropped and counted.
+    """
+
+    def __init__(self, db: AsyncIOMotorClient, max_queue_size: int = 10000,
+                 batch_size: int = 200, flush_interval: float = 0.25,
+                 backpressure_timeout: float = 0.5):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.backpressure_timeout = backpressure_timeout
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self._worker_task = None
+        self._accepting = False
+        self._batch_hooks: List[Callable[[List[Dict[str, Any]]], Awaitable[None]]] = []
+        self.stats = {
+            "enqueued": 0,
+            "written": 0,
+            "dropped": 0,
+            "failed": 0,
+            "batches": 0,
+            "last_lag_ms": 0.0,
+            "max_lag_ms": 0.0
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._accepting
+
+    def add_batch_hook(self, hook: Callable[[List[Dict[str, Any]]], Awaitable[None]]):
+        """Register a coroutine called with each batch after it is written"""
+        self._batch_hooks.append(hook)
+
+    async def submit(self, activity: Dict[str, Any]) -> bool:
+        """Queue an activity for writing; returns False if it had to be dropped"""
+        item = (time.monotonic(), activity)
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            try:
+                await asyncio.wait_for(self._queue.put(item), timeout=self.backpressure_timeout)
+            except asyncio.TimeoutError:
+                self.stats["dropped"] += 1
+                return False
+
+        self.stats["enqueued"] += 1
+        return True
+
+    async def _next_batch(self) -> List[tuple]:
+        """Collect records until the batch is full or the flush interval passes"""
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _write_batch(self, batch: List[tuple]):
+        documents = [activity for _, activity in batch]
+        try:
+            await self.db.activities.insert_many(documents, ordered=False)
+        except Exception as e:
+            print(f"Error writing activity batch: {e}")
+            self.stats["failed"] += len(documents)
+            return
+
+        lag_ms = (time.monotonic() - batch[0][0]) * 1000
+        self.stats["written"] += len(documents)
+        self.stats["batches"] += 1
+        self.stats["last_lag_ms"] = round(lag_ms, 1)
+        self.stats["max_lag_ms"] = round(max(self.stats["max_lag_ms"], lag_ms), 1)
+
+        for hook in self._batch_hooks:
+            try:
+                await hook(documents)
+            except Exception as e:
+                print(f"Error in activity batch hook: {e}")
+
+    async def _run(self):
+        # Keep going after stop() until the queue is drained
+        while self._accepting or not self._queue.empty():
+            batch = await self._next_batch()
+            if batch:
+                await self._write_batch(batch)
+
+    async def start(self):
+        if self._worker_task is None:
+            self._accepting = True
+            self._worker_task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop accepting records and drain everything still queued"""
+        self._accepting = False
+        if self._worker_task:
+            await self._worker_task
+            self._worker_task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            "running": self.running
+        }
@@ -6,15 +6,34 @@ from motor.motor_asyncio import AsyncIOMotorClient
 import uuid
 
 from models.document import UserSession
+from services.message_bus import LocalMessageBus
+from services.session_activity_buffer import SessionActivityBuffer
 from utils.json_encoder import serialize_document
+from utils.ttl_cache import TTLCache
 
 class AuthService:
     """Simple authentication service - enhance with proper auth later"""
     
-    def __init__(self, db: AsyncIOMotorClient, secret_key: str = "your-secret-key"):
+    def __init__(self, db: AsyncIOMotorClient, secret_key: str = "your-secret-key",
+                 session_cache_ttl: float = 30.0,
+                 invalidation_bus: LocalMessageBus = None,
+                 activity_flush_interval: float = 60.0):
         self.db = db
         self.secret_key = secret_key
         self.algorithm = "HS256"
+        
+        # Short-lived session cache; the TTL bounds staleness if an invalidation is missed
+        self.session_cache = TTLCache(ttl=session_cache_ttl)
+        self.invalidation_bus = invalidation_bus or LocalMessageBus()
+        self.invalidation_bus.subscribe(self.session_cache.invalidate)
+        
+        # last_activity is written behind, coalesced per session per flush interval
+        self.activity_buffer = SessionActivityBuffer(db, activity_flush_interval)
+    
+    async def ensure_indexes(self):
+        """Create the session lookup index and the TTL index that expires sessions"""
+        await self.db.sessions.create_index("id", unique=True)
+        await self.db.sessions.create_index("expires_at", expireAfterSeconds=0)
     
     async def create_session(self, user_id: str, session_data: Dict[str, Any] = None) -> UserSession:
         """Create a new user session"""
@@ -32,28 +51,42 @@ class AuthService:
     
     async def get_session(self, session_id: str) -> Optional[UserSession]:
         """Get session by ID"""
+        session = self.session_cache.get(session_id)
+        if session is not None:
+            if session.expires_at < datetime.utcnow():
+                self._forget_session(session_id)
+                return None
+            
+            session.last_activity = datetime.utcnow()
+            self.activity_buffer.touch(session_id, session.last_activity)
+            return session
+        
+        # An invalidation while the read is in flight means it may return a deleted session
+        generation = self.session_cache.generation
         session_data = await self.db.sessions.find_one({"id": session_id})
         if session_data:
             # Serialize the document
             session_data = serialize_document(session_data)
             session = UserSession(**session_data)
             
-            # Check if session is expired
+            # Check if session is expired; the TTL index removes the record itself
             if session.expires_at < datetime.utcnow():
-                await self.delete_session(session_id)
+                self._forget_session(session_id)
                 return None
             
             # Update last activity
             session.last_activity = datetime.utcnow()
-            await self.db.sessions.update_one(
-                {"id": session_id},
-                {"$set": {"last_activity": session.last_activity}}
-            )
+            self.activity_buffer.touch(session_id, session.last_activity)
             
+            self.session_cache.set(session_id, session, if_generation=generation)
             return session
         
         return None
     
+    def _forget_session(self, session_id: str):
+        self.session_cache.invalidate(session_id)
+        self.activity_buffer.discard(session_id)
+    
     async def update_session(self, session_id: str, session_data: Dict[str, Any]) -> bool:
         """Update session data"""
         result = await self.db.sessions.update_one(
@@ -66,18 +99,29 @@ class AuthService:
             }
         )
         
+        await self.invalidation_bus.publish(session_id)
         return result.modified_count > 0
     
     async def delete_session(self, session_id: str) -> bool:
         """Delete a session"""
         result = await self.db.sessions.delete_one({"id": session_id})
+        self.activity_buffer.discard(session_id)
+        await self.invalidation_bus.publish(session_id)
         return result.deleted_count > 0
     
     async def cleanup_expired_sessions(self):
-        """Clean up expired sessions"""
-        result = await self.db.sessions.delete_many({
-            "expires_at": {"$lt": datetime.utcnow()}
-        })
+        """Clean up expired sessions and evict them from every worker's cache"""
+        expired = await self.db.sessions.find(
+            {"expires_at": {"$lt": datetime.utcnow()}}, {"id": 1}
+        ).to_list(None)
+        session_ids = [session["id"] for session in expired]
+        if not session_ids:
+            return 0
+        
+        result = await self.db.sessions.delete_many({"id": {"$in": session_ids}})
+        for session_id in session_ids:
+            self.activity_buffer.discard(session_id)
+            await self.invalidation_bus.publish(session_id)
         return result.deleted_count
     
     def generate_token(self, user_id: str, session_id: str) -> str:
@@ -0,0 +1,215 @@
+import bisect
+import difflib
+import hashlib
+import re
+import zlib
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+# Numbered clauses and section headings start a new passage even without a blank line
+HEADING = re.compile(r"^\s*(?:\d+(?:\.\d+)*[.)]?\s+\S|(?:section|article|clause|schedule|exhibit)\s+[\dIVXivx]+)", re.IGNORECASE)
+WORD = re.compile(r"\w+")
+TOKEN = re.compile(r"\S+")
+
+class CompareEngine:
+    """Structural diff of two document texts
+
+    Both texts are split into passages (paragraphs and numbered sections).
+    Identical passages are paired in order first; the rest are aligned by
+    cosine similarity of hashed term-frequency embeddings, keeping only
+    mutual best matches above ``match_threshold``. A word-level diff is then
+    run on the aligned pairs only, so the cost grows with the size of the
+    changes rather than with the product of the two document lengths.
+    Runs synchronously; call it from a worker thread.
+    """
+
+    def __init__(self, dim: int = 1024, max_passage_chars: int = 1500,
+                 match_threshold: float = 0.5, max_changes: int = 200, block_rows: int = 512):
+        self.dim = dim
+        self.max_passage_chars = max_passage_chars
+        self.match_threshold = match_threshold
+        self.max_changes = max_changes  # Changes listed in full; the summary always counts all of them
+        self.block_rows = block_rows  # Rows of the similarity matrix computed at a time
+
+    @property
+    def version(self) -> str:
+        """Identifies the settings that shape a result, for cache keys"""
+        return f"v1:{self.dim}:{self.max_passage_chars}:{self.match_threshold}:{self.max_changes}"
+
+    def split_passages(self, text: str) -> List[str]:
+        passages = []
+        for paragraph in PARAGRAPH_BREAK.split(text or ""):
+            current: List[str] = []
+            size = 0
+            for line in paragraph.splitlines():
+                if current and (HEADING.match(line) or size + len(line) > self.max_passage_chars):
+                    passages.append("\n".join(current))
+                    current, size = [], 0
+                current.append(line)
+                size += len(line) + 1
+            if current:
+                passages.append("\n".join(current))
+        return [passage.strip() for passage in passages if passage.strip()]
+
+    def _embed(self, passages: List[str]) -> np.ndarray:
+        """Unit-length vectors of hashed word and word-pair counts"""
+        matrix = np.zeros((len(passages), self.dim), dtype=np.float32)
+        for row, passage in enumerate(passages):
+            words = WORD.findall(passage.lower())
+            features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+            if features:
+                ids = [zlib.crc32(feature.encode("utf-8")) % self.dim for feature in features]
+                matrix[row] = np.log1p(np.bincount(ids, minlength=self.dim))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def _exact_pairs(self, a: List[str], b: List[str]) -> List[Tuple[int, int]]:
+        """Identical passages, paired in document order"""
+        hashes_a = [hashlib.sha1(passage.encode("utf-8")).digest() for passage in a]
+        hashes_b = [hashlib.sha1(passage.encode("utf-8")).digest() for passage in b]
+        matcher = difflib.SequenceMatcher(None, hashes_a, hashes_b, autojunk=False)
+        return [
+            (block.a + k, block.b + k)
+            for block in matcher.get_matching_blocks()
+            for k in range(block.size)
+        ]
+
+    def _similar_pairs(self, a: List[str], b: List[str], rows: List[int], cols: List[int]) -> List[Tuple[int, int, float]]:
+        """Mutual best matches by embedding similarity among the given passages"""
+        if not rows or not cols:
+            return []
+        vectors_a = self._embed([a[i] for i in rows])
+        vectors_b = self._embed([b[j] for j in cols])
+
+        row_best = np.empty(len(rows), dtype=np.int64)
+        row_score = np.empty(len(rows), dtype=np.float32)
+        col_best = np.zeros(len(cols), dtype=np.int64)
+        col_score = np.full(len(cols), -1.0, dtype=np.float32)
+
+        for start in range(0, len(rows), self.block_rows):
+            scores = vectors_a[start:start + self.block_rows] @ vectors_b.T
+            row_best[start:start + len(scores)] = scores.argmax(axis=1)
+            row_score[start:start + len(scores)] = scores.max(axis=1)
+            block_best = scores.argmax(axis=0)
+            block_score = scores[block_best, np.arange(len(cols))]
+            better = block_score > col_score
+            col_best[better] = block_best[better] + start
+            col_score[better] = block_score[better]
+
+        return [
+            (rows[r], cols[int(row_best[r])], float(row_score[r]))
+            for r in range(len(rows))
+            if row_score[r] >= self.match_threshold and col_best[row_best[r]] == r
+        ]
+
+    def _in_order(self, pairs: List[Tuple[int, int]]) -> set:
+        """Pairs on the longest run that keeps both documents' order; the rest moved"""
+        tails: List[int] = []  # Smallest b index ending an increasing run of each length
+        tail_pairs: List[int] = []
+        previous: List[Optional[int]] = []
+        for index, (_, j) in enumerate(pairs):
+            length = bisect.bisect_left(tails, j)
+            if length == len(tails):
+                tails.append(j)
+                tail_pairs.append(index)
+            else:
+                tails[length] = j
+                tail_pairs[length] = index
+            previous.append(tail_pairs[length - 1] if length else None)
+
+        ordered = set()
+        index = tail_pairs[-1] if tail_pairs else None
+        while index is not None:
+            ordered.add(pairs[index])
+            index = previous[index]
+        return ordered
+
+    def _diff(self, a: str, b: str) -> Tuple[float, List[Dict[str, str]]]:
+        tokens_a, tokens_b = TOKEN.findall(a), TOKEN.findall(b)
+        matcher = difflib.SequenceMatcher(None, tokens_a, tokens_b, autojunk=False)
+        ops = [
+            {"op": tag, "removed": " ".join(tokens_a[i1:i2]), "added": " ".join(tokens_b[j1:j2])}
+            for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+            if tag != "equal"
+        ]
+        return matcher.ratio(), ops
+
+    def compare(self, text_a: str, text_b: str) -> Dict[str, Any]:
+        """Compare two texts and describe how the second differs from the first"""
+        a, b = self.split_passages(text_a), self.split_passages(text_b)
+
+        exact = self._exact_pairs(a, b)
+        paired_a = {i for i, _ in exact}
+        paired_b = {j for _, j in exact}
+        similar = self._similar_pairs(
+            a, b,
+            [i for i in range(len(a)) if i not in paired_a],
+            [j for j in range(len(b)) if j not in paired_b]
+        )
+
+        pairs = sorted(exact + [(i, j) for i, j, _ in similar])
+        ordered = self._in_order(pairs)
+        exact = set(exact)
+
+        changes = []
+        weighted = 0.0
+        counts = {"unchanged": 0, "modified": 0, "moved": 0, "added": 0, "removed": 0}
+        for i, j in pairs:
+            size = len(a[i]) + len(b[j])
+            if (i, j) in exact:
+                weighted += size
+                if (i, j) in ordered:
+                    counts["unchanged"] += 1
+                    continue
+                ratio, ops = 1.0, []
+            else:
+                ratio, ops = self._diff(a[i], b[j])
+                weighted += ratio * size
+            kind = "modified" if (i, j) in ordered else "moved"
+            counts[kind] += 1
+            changes.append({
+                "type": kind, "a_index": i, "b_index": j, "position": j,
+                "heading": b[j].splitlines()[0][:120], "similarity": round(ratio, 3), "diff": ops
+            })
+
+        matched_a = {i for i, _ in pairs}
+        matched_b = {j for _, j in pairs}
+        b_after_a = dict(pairs)
+        last_b = -1
+        for i, passage in enumerate(a):
+            if i in b_after_a:
+                last_b = b_after_a[i]
+            elif i not in matched_a:
+                counts["removed"] += 1
+                changes.append({"type": "removed", "a_index": i, "position": last_b + 0.5,
+                                "heading": passage.splitlines()[0][:120], "text": passage})
+        for j, passage in enumerate(b):
+            if j not in matched_b:
+                counts["added"] += 1
+                changes.append({"type": "added", "b_index": j, "position": j,
+                                "heading": passage.splitlines()[0][:120], "text": passage})
+
+        changes.sort(key=lambda change: change["position"])
+        for change in changes:
+            del change["position"]
+        total = sum(len(p) for p in a) + sum(len(p) for p in b)
+        similarity = weighted / total if total else 1.0
+
+        return {
+            "similarity_score": round(similarity, 3),
+            "passages": {"a": len(a), "b": len(b)},
+            "summary": counts,
+            "changes": changes[:self.max_changes],
+            "truncated": len(changes) > self.max_changes
+        }
+
+def describe_comparison(comparison: Dict[str, Any]) -> str:
+    counts = comparison["summary"]
+    return (
+        f"Documents differ in {counts['modified']} modified, {counts['added']} added, "
+        f"{counts['removed']} removed and {counts['moved']} moved passages. "
+        f"Overall similarity: {round(comparison['similarity_score'] * 100)}%"
+    )
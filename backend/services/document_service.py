@@ -1,7 +1,7 @@
 import os
 import shutil
 import mimetypes
-from typing import List, Optional, Dict, Any
+from typing import AsyncIterator, List, Optional, Dict, Any
 from pathlib import Path
 from datetime import datetime
 import PyPDF2
@@ -15,7 +15,27 @@ from motor.motor_asyncio import AsyncIOMotorClient
 from models.document import DocumentMetadata, DocumentSearch, DocumentSearchResult
 from services.llm_service import LLMService
 from services.embedding_service import EmbeddingService
-from utils.json_encoder import serialize_document, serialize_documents
+from utils.document_keywords import CATEGORY_KEYWORDS, TAG_KEYWORDS
+from utils.json_encoder import CustomJSONEncoder, serialize_document, serialize_documents
+from utils.keyword_matcher import KeywordMatcher
+from utils.streaming_zip import StreamingZipWriter
+
+EXPORT_CHUNK_SIZE = 1024 * 1024
+# Already compressed formats are stored in export archives rather than deflated again
+PRECOMPRESSED_TYPES = {'pdf', 'docx', 'xlsx', 'xlsm', 'pptx', 'zip', 'png', 'jpg', 'jpeg', 'gif', 'mp3', 'mp4'}
+
+def _build_document_matcher() -> KeywordMatcher:
+    """Compile category and tag keywords into a single matcher"""
+    matcher = KeywordMatcher()
+    for category, keywords in CATEGORY_KEYWORDS.items():
+        for keyword in keywords:
+            matcher.add(keyword, ("category", category))
+    for tag, keywords in TAG_KEYWORDS.items():
+        for keyword in keywords:
+            matcher.add(keyword, ("tag", tag))
+    return matcher
+
+DOCUMENT_KEYWORD_MATCHER = _build_document_matcher()
 
 class DocumentService:
     def __init__(self, db: AsyncIOMotorClient, storage_path: str = "/app/backend/storage"):
@@ -47,13 +67,18 @@ class DocumentService:
             # Extract text content
             extracted_text = await self._extract_text(file_path, mime_type)
             
+            # Classify categories and tags in a single pass over the text
+            keyword_labels = None
+            if extracted_text and (auto_categorize or not tags):
+                keyword_labels = DOCUMENT_KEYWORD_MATCHER.find_labels(filename, extracted_text)
+            
             # Auto-categorize if requested
             if auto_categorize and extracted_text:
-                category = await self._auto_categorize(extracted_text, filename)
+                category = await self._auto_categorize(extracted_text, filename, keyword_labels)
             
             # Generate tags if not provided
             if not tags and extracted_text:
-                tags = await self._generate_tags(extracted_text, filename)
+                tags = await self._generate_tags(extracted_text, filename, keyword_labels)
             
             # Generate embeddings
             embedding = await self.embedding_service.generate_embedding(extracted_text or filename)
@@ -87,6 +112,38 @@ class DocumentService:
                 file_path.unlink()
             raise Exception(f"Failed to upload document: {str(e)}")
     
+    def allocate_storage_path(self, filename: str) -> tuple:
+        """Reserve a document id and storage path for a file produced on the server"""
+        doc_id = str(uuid.uuid4())
+        return doc_id, self.storage_path / f"{doc_id}{Path(filename).suffix.lower()}"
+    
+    async def register_document(self, doc_id: str, file_path: Path, filename: str, user_id: str,
+                                category: str = "general", tags: List[str] = None,
+                                extracted_text: Optional[str] = None,
+                                metadata: Dict[str, Any] = None) -> DocumentMetadata:
+        """Register a file already written to storage, such as a merge output, as a document"""
+        file_path = Path(file_path)
+        embedding = await self.embedding_service.generate_embedding(extracted_text or filename)
+        
+        document = DocumentMetadata(
+            id=doc_id,
+            filename=file_path.name,
+            original_filename=filename,
+            file_path=str(file_path),
+            file_size=file_path.stat().st_size,
+            file_type=file_path.suffix.lower().lstrip('.'),
+            mime_type=mimetypes.guess_type(filename)[0] or "application/octet-stream",
+            category=category,
+            tags=tags or [],
+            user_id=user_id,
+            extracted_text=extracted_text,
+            embedding=embedding,
+            metadata=metadata or {}
+        )
+        
+        await self.db.documents.insert_one(document.dict())
+        return document
+    
     async def _extract_text(self, file_path: Path, mime_type: str) -> Optional[str]:
         """Extract text content from various file types"""
         try:
@@ -147,44 +204,25 @@ class DocumentService:
             print(f"Error extracting Excel text: {e}")
             return ""
     
-    async def _auto_categorize(self, text: str, filename: str) -> str:
+    async def _auto_categorize(self, text: str, filename: str, keyword_labels: set = None) -> str:
         """Auto-categorize document based on content"""
         # Mock categorization logic - replace with LLM call
-        filename_lower = filename.lower()
-        text_lower = text.lower()
+        if keyword_labels is None:
+            keyword_labels = DOCUMENT_KEYWORD_MATCHER.find_labels(filename, text)
         
-        if any(word in filename_lower or word in text_lower for word in ['contract', 'agreement', 'terms']):
-            return 'contracts'
-        elif any(word in filename_lower or word in text_lower for word in ['invoice', 'bill', 'payment']):
-            return 'invoices'
-        elif any(word in filename_lower or word in text_lower for word in ['hr', 'employee', 'onboarding', 'hire']):
-            return 'hr'
-        elif any(word in filename_lower or word in text_lower for word in ['compliance', 'policy', 'regulation']):
-            return 'compliance'
-        else:
-            return 'general'
+        for category in CATEGORY_KEYWORDS:
+            if ("category", category) in keyword_labels:
+                return category
+        
+        return 'general'
     
-    async def _generate_tags(self, text: str, filename: str) -> List[str]:
+    async def _generate_tags(self, text: str, filename: str, keyword_labels: set = None) -> List[str]:
         """Generate tags for document"""
         # Mock tag generation - replace with LLM call
-        tags = []
-        text_lower = text.lower()
-        filename_lower = filename.lower()
-        
-        # Common business document tags
-        tag_keywords = {
-            'urgent': ['urgent', 'asap', 'immediate', 'priority'],
-            'signed': ['signed', 'signature', 'executed'],
-            'draft': ['draft', 'preliminary', 'version'],
-            'quarterly': ['quarterly', 'q1', 'q2', 'q3', 'q4'],
-            'annual': ['annual', 'yearly', 'year-end'],
-            'confidential': ['confidential', 'private', 'restricted'],
-            'review': ['review', 'approval', 'pending'],
-        }
+        if keyword_labels is None:
+            keyword_labels = DOCUMENT_KEYWORD_MATCHER.find_labels(filename, text)
         
-        for tag, keywords in tag_keywords.items():
-            if any(keyword in text_lower or keyword in filename_lower for keyword in keywords):
-                tags.append(tag)
+        tags = [tag for tag in TAG_KEYWORDS if ("tag", tag) in keyword_labels]
         
         return tags[:5]  # Limit to 5 tags
     
@@ -312,6 +350,30 @@ class DocumentService:
             print(f"Error getting document: {e}")
             return None
     
+    async def get_documents_by_ids(self, doc_ids: List[str], user_id: str,
+                                   include_text: bool = False) -> List[DocumentMetadata]:
+        """Get several of a user's documents with one query, in the order requested
+        
+        Ids that do not exist or belong to someone else are left out. Embeddings
+        are never loaded, and extracted text only when include_text is set.
+        """
+        if not doc_ids:
+            return []
+        
+        projection = {"_id": 0, "embedding": 0}
+        if not include_text:
+            projection["extracted_text"] = 0
+        
+        try:
+            documents = await self.db.documents.find(
+                {"id": {"$in": list(set(doc_ids))}, "user_id": user_id}, projection
+            ).to_list(None)
+            by_id = {doc["id"]: DocumentMetadata(**doc) for doc in serialize_documents(documents)}
+            return [by_id[doc_id] for doc_id in dict.fromkeys(doc_ids) if doc_id in by_id]
+        except Exception as e:
+            print(f"Error getting documents: {e}")
+            return []
+    
     async def get_user_documents(self, user_id: str, limit: int = 100) -> List[DocumentMetadata]:
         """Get all documents for a user"""
         try:
@@ -321,7 +383,115 @@ class DocumentService:
         except Exception as e:
             print(f"Error getting user documents: {e}")
             return []
-    
+
+    def _export_query(self, user_id: str, document_ids: Optional[List[str]], category: Optional[str]) -> Dict[str, Any]:
+        query = {"user_id": user_id}
+        if document_ids:
+            query["id"] = {"$in": list(set(document_ids))}
+        if category:
+            query["category"] = category
+        return query
+
+    async def has_export_documents(self, user_id: str, document_ids: Optional[List[str]] = None,
+                                   category: Optional[str] = None) -> bool:
+        """Check that an export selection matches at least one document"""
+        query = self._export_query(user_id, document_ids, category)
+        return await self.db.documents.find_one(query, {"_id": 1}) is not None
+
+    async def iter_export_documents(self, user_id: str, document_ids: Optional[List[str]] = None,
+                                    category: Optional[str] = None) -> AsyncIterator[DocumentMetadata]:
+        """Yield the documents selected for export without their text or embeddings
+
+        Explicit ids keep the requested order; a category is walked with a
+        cursor so large categories are never loaded at once.
+        """
+        if document_ids:
+            for document in await self.get_documents_by_ids(document_ids, user_id):
+                if not category or document.category == category:
+                    yield document
+            return
+
+        cursor = self.db.documents.find(
+            self._export_query(user_id, None, category),
+            {"_id": 0, "embedding": 0, "extracted_text": 0}
+        ).sort("created_at", 1)
+        async for doc in cursor:
+            yield DocumentMetadata(**serialize_document(doc))
+
+    async def export_archive(self, documents: AsyncIterator[DocumentMetadata],
+                             include_manifest: bool = True) -> AsyncIterator[bytes]:
+        """Stream a ZIP of the given documents as it is built
+
+        Files are read from storage in chunks and each chunk is compressed
+        and handed on before the next is read, so neither the archive nor a
+        whole file is ever held in memory or written to disk. Files missing
+        from storage are skipped and listed in the manifest.
+        """
+        writer = StreamingZipWriter()
+        names = set()
+        manifest = {"exported_at": datetime.utcnow(), "documents": [], "missing": []}
+
+        async for document in documents:
+            file_path = Path(document.file_path)
+            try:
+                source = await asyncio.to_thread(open, file_path, "rb")
+            except OSError:
+                manifest["missing"].append({"id": document.id, "original_filename": document.original_filename})
+                continue
+
+            try:
+                name = self._archive_name(document, names)
+                size = os.fstat(source.fileno()).st_size
+                compress = document.file_type.lower() not in PRECOMPRESSED_TYPES
+                entry = writer.open_entry(name, size, compress, self._archive_date(document.created_at))
+                while await asyncio.to_thread(self._copy_chunk, source, entry):
+                    yield writer.drain()
+                entry.close()
+            finally:
+                source.close()
+
+            yield writer.drain()
+            manifest["documents"].append({
+                "id": document.id,
+                "path": name,
+                "original_filename": document.original_filename,
+                "category": document.category,
+                "tags": document.tags,
+                "file_type": document.file_type,
+                "mime_type": document.mime_type,
+                "file_size": size,
+                "created_at": document.created_at,
+                "content_summary": document.content_summary
+            })
+
+        if include_manifest:
+            writer.write_entry("manifest.json", json.dumps(manifest, indent=2, cls=CustomJSONEncoder).encode("utf-8"))
+        yield writer.close()
+
+    def _copy_chunk(self, source, entry) -> bool:
+        """Move one chunk from a file into an archive entry; False once the file is exhausted"""
+        chunk = source.read(EXPORT_CHUNK_SIZE)
+        if not chunk:
+            return False
+        entry.write(chunk)
+        return True
+
+    def _archive_name(self, document: DocumentMetadata, names: set) -> str:
+        """Place a document under its category folder with a name unique in the archive"""
+        filename = (document.original_filename or document.filename).replace("/", "_").replace("\\", "_").lstrip(".") or document.id
+        folder = (document.category or "general").replace("/", "_").replace("\\", "_").lstrip(".") or "general"
+        stem, suffix = os.path.splitext(filename)
+        name, counter = f"{folder}/{filename}", 2
+        while name in names:
+            name = f"{folder}/{stem} ({counter}){suffix}"
+            counter += 1
+        names.add(name)
+        return name
+
+    def _archive_date(self, created_at: datetime):
+        # ZIP timestamps cannot go before 1980
+        return max(created_at.timetuple()[:6], (1980, 1, 1, 0, 0, 0))
+
     async def delete_document(self, doc_id: str, user_id: str) -> bool:
         """Delete a document"""
         try:
@@ -0,0 +1,233 @@
+import asyncio
+import math
+import re
+import time
+from typing import Dict, Any, Optional, Tuple
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from services.llm_service import LLMService
+from utils.document_keywords import CATEGORY_KEYWORDS
+
+VOICE_COMMAND_PREFIX = "Processed voice command: "
+
+# Words that carry no search terms in a spoken command
+COMMAND_STOPWORDS = {
+    "a", "about", "all", "an", "and", "any", "can", "could", "display", "document", "documents",
+    "file", "files", "find", "for", "from", "get", "give", "i", "in", "list", "look", "me", "my",
+    "need", "of", "on", "open", "please", "pull", "search", "show", "some", "the", "to", "up",
+    "want", "with", "you"
+}
+
+# Category names and their keywords, matched as whole words (optionally plural)
+CATEGORY_WORDS = {word: category for category, words in CATEGORY_KEYWORDS.items() for word in words}
+CATEGORY_WORDS.update({category: category for category in CATEGORY_KEYWORDS})
+CATEGORY_PATTERN = re.compile(
+    r"\b(" + "|".join(sorted(map(re.escape, CATEGORY_WORDS), key=len, reverse=True)) + r")s?\b",
+    re.IGNORECASE
+)
+
+# Intents the local tier can answer, with the reply built from the extracted parameters
+LOCAL_RESPONSES = {
+    "search_documents": "I'll look through your documents for {query}.",
+    "merge_documents": "I'll merge the recent documents in {category} for you. Please review the merged document.",
+    "summarize_documents": "I'll create a summary of the documents in {category}. This may take a moment."
+}
+INTENT_ACTIONS = {"merge_documents": "merge", "summarize_documents": "summarize"}
+
+class IntentClassifier:
+    """Lightweight nearest-centroid intent classifier over word n-gram features"""
+
+    def __init__(self):
+        self._sums: Dict[str, Dict[str, float]] = {}  # intent -> summed feature vector
+        self._centroids: Dict[str, Dict[str, float]] = {}  # intent -> normalized centroid
+
+    @staticmethod
+    def _features(text: str) -> Dict[str, float]:
+        """Build a normalized bag of word unigrams and bigrams"""
+        tokens = re.findall(r"\w+", text.lower())
+        features: Dict[str, float] = {}
+
+        for token in tokens:
+            features[token] = features.get(token, 0.0) + 1.0
+        for first, second in zip(tokens, tokens[1:]):
+            bigram = f"{first} {second}"
+            features[bigram] = features.get(bigram, 0.0) + 1.0
+
+        norm = math.sqrt(sum(value * value for value in features.values()))
+        if norm > 0:
+            features = {key: value / norm for key, value in features.items()}
+        return features
+
+    def add_example(self, command: str, intent: str):
+        """Add a labelled command to the centroid of its intent"""
+        features = self._features(command)
+        if not features:
+            return
+
+        total = self._sums.setdefault(intent, {})
+        for feature, value in features.items():
+            total[feature] = total.get(feature, 0.0) + value
+
+        norm = math.sqrt(sum(value * value for value in total.values()))
+        self._centroids[intent] = {feature: value / norm for feature, value in total.items()}
+
+    def classify(self, command: str) -> Optional[Tuple[str, float, float]]:
+        """Return the best intent with its cosine similarity and margin over the runner-up"""
+        features = self._features(command)
+        if not features or not self._centroids:
+            return None
+
+        scores = []
+        for intent, centroid in self._centroids.items():
+            score = sum(value * centroid.get(feature, 0.0) for feature, value in features.items())
+            scores.append((score, intent))
+
+        scores.sort(reverse=True)
+        best_score, best_intent = scores[0]
+        runner_up = scores[1][0] if len(scores) > 1 else 0.0
+
+        return best_intent, best_score, best_score - runner_up
+
+    def size(self) -> int:
+        return len(self._centroids)
+
+class IntentRouter:
+    """Two-tier voice intent router: local classifier first, LLM for ambiguous commands"""
+
+    def __init__(self, db: AsyncIOMotorClient, llm_service: LLMService,
+                 min_similarity: float = 0.6, min_margin: float = 0.15,
+                 training_limit: int = 5000):
+        self.db = db
+        self.llm_service = llm_service
+        self.min_similarity = min_similarity
+        self.min_margin = min_margin
+        self.training_limit = training_limit
+        self.classifier = IntentClassifier()
+        self._trained = False
+        self._training_lock = asyncio.Lock()
+        self.stats = {
+            "local": {"hits": 0, "total_ms": 0.0},
+            "llm": {"hits": 0, "total_ms": 0.0}
+        }
+
+        self._seed_from_llm_service()
+
+    def _seed_from_llm_service(self):
+        """Bootstrap the classifier with the canonical voice command phrases"""
+        for phrase, response in self.llm_service.mock_responses["voice_command"].items():
+            self.classifier.add_example(phrase, response["intent"])
+
+    @staticmethod
+    def extract_parameters(intent: str, command: str) -> Optional[Dict[str, Any]]:
+        """Fill an intent's parameters from the command itself; None when they cannot be"""
+        match = CATEGORY_PATTERN.search(command)
+        category = CATEGORY_WORDS[match.group(1).lower()] if match else None
+
+        if intent == "search_documents":
+            terms = [word for word in re.findall(r"\w+", command) if word.lower() not in COMMAND_STOPWORDS]
+            if not terms:
+                return None
+            parameters = {"query": " ".join(terms)}
+            if category:
+                parameters["category"] = category
+            return parameters
+
+        if intent in INTENT_ACTIONS and category:
+            return {"category": category, "action": INTENT_ACTIONS[intent]}
+
+        return None
+
+    async def train_from_activities(self) -> int:
+        """Train the classifier from logged voice_command activities resolved by the LLM"""
+        activities = await self.db.activities.find(
+            {
+                "activity_type": "voice_command",
+                "metadata.tier": {"$ne": "local"},
+                "metadata.parameters": {"$exists": True}
+            },
+            {"description": 1, "metadata": 1}
+        ).sort("created_at", -1).limit(self.training_limit).to_list(self.training_limit)
+
+        trained = 0
+        for activity in activities:
+            metadata = activity.get("metadata", {})
+            command = metadata.get("command")
+            if not command and activity.get("description", "").startswith(VOICE_COMMAND_PREFIX):
+                command = activity["description"][len(VOICE_COMMAND_PREFIX):]
+
+            if command and self._is_learnable(metadata):
+                self.classifier.add_example(command, metadata["intent"])
+                trained += 1
+
+        self._trained = True
+        return trained
+
+    @staticmethod
+    def _is_learnable(result: Dict[str, Any]) -> bool:
+        """Only confident, concrete intents are used as training examples"""
+        return (
+            result.get("intent") not in (None, "general_query")
+            and result.get("confidence", 0.0) >= 0.8
+            and "parameters" in result
+        )
+
+    async def route(self, command: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Resolve a voice command, tagging the result with the tier that answered it"""
+        if not self._trained:
+            async with self._training_lock:
+                # Concurrent first requests wait for one training run instead of each starting one
+                if not self._trained:
+                    try:
+                        await self.train_from_activities()
+                    except Exception as e:
+                        print(f"Error training intent classifier: {e}")
+                        self._trained = True
+
+        started = time.perf_counter()
+        match = self.classifier.classify(command)
+
+        if match:
+            intent, similarity, margin = match
+            # Only the intent is learned; parameters always come from this command
+            parameters = self.extract_parameters(intent, command) if intent in LOCAL_RESPONSES else None
+            if similarity >= self.min_similarity and margin >= self.min_margin and parameters is not None:
+                result = {
+                    "intent": intent,
+                    "parameters": parameters,
+                    "response": LOCAL_RESPONSES[intent].format(**parameters),
+                    "confidence": round(similarity, 2),
+                    "tier": "local"
+                }
+                self._record("local", started)
+                return result
+
+        result = await self.llm_service.process_voice_command(command, context)
+        result["tier"] = "llm"
+        self._record("llm", started)
+
+        # Learn online from confident LLM answers so repeat commands take the fast path
+        if self._is_learnable(result):
+            self.classifier.add_example(command, result["intent"])
+
+        return result
+
+    def _record(self, tier: str, started: float):
+        self.stats[tier]["hits"] += 1
+        self.stats[tier]["total_ms"] += (time.perf_counter() - started) * 1000
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-tier hit rates and average latency"""
+        total = sum(tier["hits"] for tier in self.stats.values())
+
+        return {
+            "total_commands": total,
+            "classes": self.classifier.size(),
+            "tiers": {
+                name: {
+                    "hits": tier["hits"],
+                    "hit_rate": round(tier["hits"] / total, 3) if total else 0.0,
+                    "avg_latency_ms": round(tier["total_ms"] / tier["hits"], 2) if tier["hits"] else 0.0
+                }
+                for name, tier in self.stats.items()
+            }
+        }
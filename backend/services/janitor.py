@@ -0,0 +1,137 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import BulkWriteError
+
+class Janitor:
+    """Background retention for data that TTL indexes do not cover
+
+    Sessions and finished tasks expire through TTL indexes. The janitor
+    applies the activity retention policy (optionally archiving first) and
+    removes legacy records written before their TTL fields existed. It works
+    in small batches, walked in order of the field each query filters on,
+    with a pause in between, so no single
+    delete holds locks or saturates the server for long. Running it in several
+    processes is safe because every batch is idempotent.
+    """
+
+    def __init__(self, db: AsyncIOMotorClient, interval: float = 3600.0,
+                 batch_size: int = 500, batch_pause: float = 0.05,
+                 activity_retention_days: Optional[int] = 90,
+                 archive_activities: bool = False,
+                 task_retention_days: int = 7):
+        self.db = db
+        self.interval = interval
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.activity_retention_days = activity_retention_days  # None keeps activities forever
+        self.archive_activities = archive_activities
+        self.task_retention_days = task_retention_days
+        self._loop_task = None
+        self.stats = {
+            "runs": 0,
+            "sessions_deleted": 0,
+            "tasks_deleted": 0,
+            "activities_deleted": 0,
+            "activities_archived": 0,
+            "last_run_at": None,
+            "last_duration_ms": 0.0
+        }
+
+    async def _delete_in_batches(self, collection, query: Dict[str, Any], sort_field: str, archive=None) -> int:
+        """Delete matching documents batch by batch, optionally copying them to an archive first
+
+        ``sort_field`` should be the indexed field the query filters on, so each
+        batch reads from the start of that index range instead of sorting it.
+        """
+        removed = 0
+        projection = None if archive is not None else {"_id": 1}
+        while True:
+            batch = await collection.find(query, projection).sort(sort_field, 1) \
+                .limit(self.batch_size).to_list(self.batch_size)
+            if not batch:
+                return removed
+
+            if archive is not None:
+                self.stats["activities_archived"] += await self._archive(archive, batch)
+
+            result = await collection.delete_many({"_id": {"$in": [doc["_id"] for doc in batch]}})
+            removed += result.deleted_count
+
+            if len(batch) < self.batch_size:
+                return removed
+            await asyncio.sleep(self.batch_pause)
+
+    async def _archive(self, archive, batch) -> int:
+        """Copy a batch to the archive; returns how many were newly archived
+
+        Documents already archived by an earlier, interrupted run are skipped.
+        Any other write error is raised, so the batch is not deleted.
+        """
+        try:
+            result = await archive.insert_many(batch, ordered=False)
+            return len(result.inserted_ids)
+        except BulkWriteError as e:
+            if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                raise
+            return e.details.get("nInserted", 0)
+
+    async def run_once(self) -> Dict[str, int]:
+        """Run one retention pass over sessions, tasks and activities"""
+        started = time.monotonic()
+        now = datetime.utcnow()
+
+        # Safety net for sessions the TTL monitor has not reached yet
+        sessions = await self._delete_in_batches(self.db.sessions, {"expires_at": {"$lt": now}}, "expires_at")
+
+        # Finished tasks from before tasks carried an expires_at field
+        tasks = await self._delete_in_batches(self.db.tasks, {
+            "status": {"$in": ["completed", "failed", "cancelled"]},
+            "expires_at": {"$exists": False},
+            "updated_at": {"$lt": now - timedelta(days=self.task_retention_days)}
+        }, "updated_at")
+
+        # Raw activities past retention; per-day counts survive in activity_rollups
+        activities = 0
+        if self.activity_retention_days is not None:
+            activities = await self._delete_in_batches(
+                self.db.activities,
+                {"created_at": {"$lt": now - timedelta(days=self.activity_retention_days)}},
+                "created_at",
+                archive=self.db.activities_archive if self.archive_activities else None
+            )
+
+        self.stats["runs"] += 1
+        self.stats["sessions_deleted"] += sessions
+        self.stats["tasks_deleted"] += tasks
+        self.stats["activities_deleted"] += activities
+        self.stats["last_run_at"] = now
+        self.stats["last_duration_ms"] = round((time.monotonic() - started) * 1000, 1)
+
+        return {"sessions": sessions, "tasks": tasks, "activities": activities}
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"Error in janitor run: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def start(self):
+        if self._loop_task is None:
+            self._loop_task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._loop_task:
+            self._loop_task.cancel()
+            try:
+                await self._loop_task
+            except asyncio.CancelledError:
+                pass
+            self._loop_task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "running": self._loop_task is not None}
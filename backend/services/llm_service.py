@@ -1,9 +1,13 @@
 import asyncio
 import json
 import random
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, AsyncIterator
 from datetime import datetime
 
+from services.compare_engine import CompareEngine, describe_comparison
+from services.redaction_engine import REDACTION_LABELS, describe_redactions, redact_text
+from utils.keyword_matcher import KeywordMatcher
+
 class LLMService:
     """Mock LLM service - replace with real OpenAI/Claude integration"""
     
@@ -41,16 +45,24 @@ class LLMService:
                 "extract": "Extracted key information: {data}"
             }
         }
+        
+        self.compare_engine = CompareEngine()
+        
+        # Compile all voice command keys into one matcher; dict order is the match priority
+        self._voice_command_keys = list(self.mock_responses["voice_command"].keys())
+        self._voice_command_matcher = KeywordMatcher(
+            {key: [key] for key in self._voice_command_keys}
+        )
     
     async def process_voice_command(self, command: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
         """Process voice command and return structured response"""
         await asyncio.sleep(0.5)  # Simulate processing time
         
-        command_lower = command.lower()
-        
         # Find matching mock response
-        for key, response in self.mock_responses["voice_command"].items():
-            if key in command_lower:
+        matched_keys = self._voice_command_matcher.find_labels(command)
+        for key in self._voice_command_keys:
+            if key in matched_keys:
+                response = self.mock_responses["voice_command"][key]
                 return {
                     "intent": response["intent"],
                     "parameters": response["parameters"],
@@ -71,8 +83,24 @@ class LLMService:
         """Process document action (summarize, compare, etc.)"""
         await asyncio.sleep(1.0)  # Simulate processing time
         
-        parameters = parameters or {}
+        # Redaction and comparison scan the whole text; keep them off the event loop
+        return await asyncio.to_thread(self._build_document_action_result, action, document_content, parameters or {})
+    
+    async def stream_document_action(self, action: str, document_content: str,
+                                     parameters: Dict[str, Any] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a document action as token events followed by the final result"""
+        await asyncio.sleep(0.1)  # Simulate time to first token
+        
+        result = await asyncio.to_thread(self._build_document_action_result, action, document_content, parameters or {})
+        
+        async for token in self._stream_tokens(result["result"]):
+            yield {"type": "token", "content": token}
         
+        yield {"type": "result", "result": result}
+    
+    def _build_document_action_result(self, action: str, document_content: str,
+                                      parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the mock result payload for a document action"""
         if action == "summarize":
             return {
                 "result": self._generate_mock_summary(document_content),
@@ -81,15 +109,15 @@ class LLMService:
             }
         
         elif action == "compare":
+            # Callers that already diffed the pair (e.g. through the comparison cache) pass it in
+            comparison = parameters.get("comparison") or self.compare_engine.compare(
+                document_content, parameters.get("other_content", "")
+            )
             return {
-                "result": "Documents show 3 key differences in pricing and 2 differences in terms. Overall similarity: 78%",
+                "result": describe_comparison(comparison),
                 "action": action,
                 "success": True,
-                "details": {
-                    "differences": 3,
-                    "similarities": 5,
-                    "similarity_score": 0.78
-                }
+                "details": comparison
             }
         
         elif action == "merge":
@@ -101,11 +129,14 @@ class LLMService:
             }
         
         elif action == "redact":
+            redacted_text, counts = redact_text(document_content)
             return {
-                "result": "Sensitive information (SSN, addresses, phone numbers) has been redacted.",
+                "result": describe_redactions(counts),
                 "action": action,
                 "success": True,
-                "redacted_items": ["SSN", "addresses", "phone numbers"]
+                "redacted_items": [REDACTION_LABELS[name] for name, count in counts.items() if count],
+                "redaction_counts": counts,
+                "redacted_text": redacted_text
             }
         
         elif action == "translate":
@@ -196,6 +227,25 @@ class LLMService:
         """Mock chat completion - replace with real LLM API call"""
         await asyncio.sleep(0.5)
         
+        return self._mock_chat_response(messages)
+    
+    async def stream_chat_completion(self, messages: List[Dict[str, str]],
+                                     model: str = "gpt-4", temperature: float = 0.7) -> AsyncIterator[str]:
+        """Mock streaming chat completion - yields response tokens as they are produced"""
+        await asyncio.sleep(0.1)  # Simulate time to first token
+        
+        async for token in self._stream_tokens(self._mock_chat_response(messages)):
+            yield token
+    
+    async def _stream_tokens(self, text: str, delay: float = 0.02) -> AsyncIterator[str]:
+        """Split text into word tokens (keeping whitespace) and yield them with a per-token delay"""
+        words = text.split(" ")
+        for i, word in enumerate(words):
+            yield word if i == len(words) - 1 else word + " "
+            await asyncio.sleep(delay)
+    
+    def _mock_chat_response(self, messages: List[Dict[str, str]]) -> str:
+        """Generate the mock chat response for the last user message"""
         # Extract the last user message
         user_message = ""
         for message in reversed(messages):
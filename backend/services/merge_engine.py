@@ -0,0 +1,145 @@
+import os
+import textwrap
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Any, Iterator, List
+
+import docx
+import openpyxl
+import PyPDF2
+
+from utils.streaming_pdf import StreamingPdfWriter
+
+PDF_TYPES = {"pdf"}
+DOCX_TYPES = {"docx"}
+SPREADSHEET_TYPES = {"xlsx", "xlsm"}
+TEXT_TYPES = {"txt", "md", "csv", "json", "log"}
+
+class MergeCancelled(Exception):
+    """Raised inside the merge thread when the task was cancelled"""
+
+class MergeEngine:
+    """Merges documents into one PDF, page by page
+
+    PDF inputs have their pages copied as-is; DOCX, XLSX and text inputs are
+    laid out as plain-text pages. Inputs are opened one at a time and every
+    page is written straight to the output file, so memory use does not grow
+    with the number or size of the inputs. Runs synchronously; call it from
+    a worker thread.
+    """
+
+    def __init__(self, line_width: int = 85, lines_per_page: int = 56, progress_every: int = 25):
+        self.line_width = line_width
+        self.lines_per_page = lines_per_page
+        self.progress_every = progress_every  # Pages between progress callbacks within an input
+
+    def input_kind(self, document: Dict[str, Any]) -> str:
+        file_type = (document.get("file_type") or Path(document.get("file_path", "")).suffix.lstrip(".")).lower()
+        mime_type = document.get("mime_type") or ""
+        if file_type in PDF_TYPES:
+            return "pdf"
+        if file_type in DOCX_TYPES:
+            return "docx"
+        if file_type in SPREADSHEET_TYPES:
+            return "spreadsheet"
+        if file_type in TEXT_TYPES or mime_type.startswith("text/"):
+            return "text"
+        raise ValueError(f"Cannot merge {document.get('original_filename')}: unsupported file type '{file_type}'")
+
+    def merge(self, documents: List[Dict[str, Any]], output_path: Path,
+              on_progress: Callable[[int, int, bool], None] = None,
+              cancelled: threading.Event = None) -> Dict[str, Any]:
+        """Merge documents into output_path and return per-input page counts
+
+        ``on_progress(input_index, pages_done, finished)`` is called every few
+        pages and once per finished input. The output is written to a
+        temporary file and only moved into place when the merge succeeds.
+        """
+        kinds = [self.input_kind(document) for document in documents]  # Reject unsupported inputs up front
+        partial_path = Path(f"{output_path}.part")
+        inputs = []
+
+        try:
+            with open(partial_path, "wb") as output:
+                writer = StreamingPdfWriter(output)
+
+                for index, (document, kind) in enumerate(zip(documents, kinds)):
+                    start = writer.page_count
+
+                    def on_page(pages_done: int):
+                        if cancelled is not None and cancelled.is_set():
+                            raise MergeCancelled()
+                        if on_progress and pages_done % self.progress_every == 0:
+                            on_progress(index, pages_done, False)
+
+                    if kind == "pdf":
+                        with open(document["file_path"], "rb") as source:
+                            reader = PyPDF2.PdfReader(source, strict=False)
+                            if reader.is_encrypted and not reader.decrypt(""):
+                                raise ValueError(f"Cannot merge {document.get('original_filename')}: file is encrypted")
+                            writer.copy_pages(reader.pages, on_page)
+                    else:
+                        for page_number, lines in enumerate(self._text_pages(self._lines(document, kind)), 1):
+                            writer.add_text_page(lines)
+                            on_page(page_number)
+
+                    pages = writer.page_count - start
+                    inputs.append({
+                        "document_id": document.get("id"),
+                        "filename": document.get("original_filename"),
+                        "kind": kind,
+                        "pages": pages
+                    })
+                    if on_progress:
+                        on_progress(index, pages, True)
+
+                writer.close()
+
+            os.replace(partial_path, output_path)
+        except BaseException:
+            partial_path.unlink(missing_ok=True)
+            raise
+
+        return {
+            "pages": sum(item["pages"] for item in inputs),
+            "file_size": output_path.stat().st_size,
+            "inputs": inputs
+        }
+
+    def _lines(self, document: Dict[str, Any], kind: str) -> Iterator[str]:
+        """Stream the text lines of a non-PDF input"""
+        file_path = document["file_path"]
+        yield document.get("original_filename") or Path(file_path).name
+        yield ""
+
+        if kind == "docx":
+            for paragraph in docx.Document(file_path).paragraphs:
+                yield paragraph.text
+        elif kind == "spreadsheet":
+            workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+            try:
+                for sheet in workbook.worksheets:
+                    yield f"[{sheet.title}]"
+                    for row in sheet.iter_rows(values_only=True):
+                        cells = ["" if cell is None else str(cell) for cell in row]
+                        if any(cells):
+                            yield " | ".join(cells)
+                    yield ""
+            finally:
+                workbook.close()
+        else:
+            with open(file_path, "r", encoding="utf-8", errors="replace") as source:
+                for line in source:
+                    yield line.rstrip("\r\n").expandtabs(4)
+
+    def _text_pages(self, lines: Iterator[str]) -> Iterator[List[str]]:
+        """Wrap lines to the page width and group them into pages"""
+        page = []
+        for line in lines:
+            for wrapped in textwrap.wrap(line, self.line_width) or [""]:
+                page.append(wrapped)
+                if len(page) == self.lines_per_page:
+                    yield page
+                    page = []
+        if page:
+            yield page
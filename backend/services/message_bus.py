@@ -0,0 +1,95 @@
+import asyncio
+from datetime import datetime
+from typing import Callable, List
+from motor.motor_asyncio import AsyncIOMotorClient
+
+class LocalMessageBus:
+    """In-process message bus - the stand-in for single-worker deployments and tests"""
+
+    def __init__(self):
+        self._subscribers: List[Callable[[str], None]] = []
+
+    def subscribe(self, callback: Callable[[str], None]):
+        """Register a callback invoked with every published message"""
+        self._subscribers.append(callback)
+
+    async def publish(self, message: str):
+        """Deliver a message to every subscriber"""
+        self._notify(message)
+
+    def _notify(self, message: str):
+        for callback in self._subscribers:
+            try:
+                callback(message)
+            except Exception as e:
+                print(f"Error in message bus subscriber: {e}")
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+class ChangeStreamMessageBus(LocalMessageBus):
+    """Cross-worker message bus backed by a MongoDB change stream
+
+    Publishing inserts a small message into a shared collection; every worker
+    watches that collection and delivers messages on its channel locally.
+    Requires MongoDB running as a replica set (change streams are unavailable
+    on standalone servers).
+    """
+
+    def __init__(self, db: AsyncIOMotorClient, channel: str, collection_name: str = "bus_messages",
+                 retention_seconds: int = 3600):
+        super().__init__()
+        self.collection = db[collection_name]
+        self.channel = channel
+        self.retention_seconds = retention_seconds
+        self._watch_task = None
+
+    async def publish(self, message: str):
+        # Deliver locally right away; remote workers pick it up from the change stream
+        self._notify(message)
+        await self.collection.insert_one({
+            "channel": self.channel,
+            "message": message,
+            "created_at": datetime.utcnow()
+        })
+
+    async def start(self):
+        await self.collection.create_index("created_at", expireAfterSeconds=self.retention_seconds)
+        self._watch_task = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if self._watch_task:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+            self._watch_task = None
+
+    async def _watch(self):
+        pipeline = [{"$match": {
+            "operationType": "insert",
+            "fullDocument.channel": self.channel
+        }}]
+
+        while True:
+            try:
+                async with self.collection.watch(pipeline) as stream:
+                    async for change in stream:
+                        self._notify(change["fullDocument"]["message"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Message bus change stream error, retrying: {e}")
+                await asyncio.sleep(5)
+
+def create_message_bus(kind: str, db: AsyncIOMotorClient, channel: str) -> LocalMessageBus:
+    """Create a message bus by name ("local" or "change_stream")"""
+    if kind == "local":
+        return LocalMessageBus()
+    if kind == "change_stream":
+        return ChangeStreamMessageBus(db, channel)
+    raise ValueError(f"Unknown message bus: {kind}")
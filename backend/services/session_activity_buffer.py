@@ -0,0 +1,79 @@
+import asyncio
+from datetime import datetime
+from typing import Dict
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+class SessionActivityBuffer:
+    """Write-behind buffer that coalesces session last_activity updates
+
+    Last-seen times are recorded in memory and flushed periodically with a
+    single unordered bulk_write, so each session is written at most once per
+    flush interval no matter how many requests it makes.
+    """
+
+    def __init__(self, db: AsyncIOMotorClient, flush_interval: float = 60.0):
+        self.db = db
+        self.flush_interval = flush_interval
+        self._pending: Dict[str, datetime] = {}  # session id -> latest activity
+        self._flush_task = None
+        self.flushed_updates = 0
+
+    def touch(self, session_id: str, timestamp: datetime = None):
+        """Record activity for a session; only the latest timestamp is kept"""
+        timestamp = timestamp or datetime.utcnow()
+        current = self._pending.get(session_id)
+        if current is None or timestamp > current:
+            self._pending[session_id] = timestamp
+
+    def discard(self, session_id: str):
+        """Drop pending activity for a deleted session"""
+        self._pending.pop(session_id, None)
+
+    async def flush(self) -> int:
+        """Write all pending last_activity values in one bulk operation"""
+        if not self._pending:
+            return 0
+
+        pending, self._pending = self._pending, {}
+        # $max keeps the newest value even if flushes from several workers interleave
+        operations = [
+            UpdateOne({"id": session_id}, {"$max": {"last_activity": timestamp}})
+            for session_id, timestamp in pending.items()
+        ]
+
+        try:
+            await self.db.sessions.bulk_write(operations, ordered=False)
+        except Exception as e:
+            print(f"Error flushing session activity: {e}")
+            # Re-queue so the next flush retries, without overwriting newer touches
+            for session_id, timestamp in pending.items():
+                self.touch(session_id, timestamp)
+            return 0
+
+        self.flushed_updates += len(operations)
+        return len(operations)
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def start(self):
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stop the periodic flush and write out anything still pending"""
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+
+        await self.flush()
+
+    def pending_count(self) -> int:
+        return len(self._pending)
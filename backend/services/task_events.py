@@ -0,0 +1,111 @@
+import asyncio
+import json
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Callable, Dict, Any, List, Optional, Set, Tuple
+
+from services.message_bus import LocalMessageBus
+from utils.json_encoder import CustomJSONEncoder
+
+TERMINAL_EVENTS = {"result", "error", "cancelled"}
+
+class TaskEventBus:
+    """In-process fan-out of task events, fed through a pluggable cross-worker broker
+
+    Every event gets a per-task, monotonically increasing id. A short history is
+    kept per task so reconnecting subscribers can resume after their
+    Last-Event-ID. Ids only increase per publishing process, since worker
+    clocks can drift, so duplicate deliveries from the broker are detected by
+    (origin, id) rather than by comparing ids across workers.
+    """
+
+    def __init__(self, broker: LocalMessageBus = None, history_size: int = 50,
+                 max_tracked_tasks: int = 1000, subscriber_queue_size: int = 100):
+        self.broker = broker or LocalMessageBus()
+        self.broker.subscribe(self._on_message)
+        self.history_size = history_size
+        self.max_tracked_tasks = max_tracked_tasks
+        self.subscriber_queue_size = subscriber_queue_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._history: "OrderedDict[str, deque]" = OrderedDict()
+        self._last_ids: Dict[str, int] = {}
+        self._seen: Dict[str, Dict[str, int]] = {}  # task id -> origin -> last delivered id
+        self.origin = uuid.uuid4().hex
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+
+    def add_listener(self, callback: Callable[[Dict[str, Any]], None]):
+        """Register a callback invoked with every event for any task"""
+        self._listeners.append(callback)
+
+    def _next_id(self, task_id: str) -> int:
+        # Microsecond clock keeps ids increasing even if the task moves to another worker
+        event_id = max(time.time_ns() // 1000, self._last_ids.get(task_id, 0) + 1)
+        self._last_ids[task_id] = event_id
+        return event_id
+
+    async def publish(self, task_id: str, event: str, data: Dict[str, Any]):
+        """Publish a task event to every subscriber on every worker"""
+        message = {"id": self._next_id(task_id), "origin": self.origin,
+                   "task_id": task_id, "event": event, "data": data}
+        await self.broker.publish(json.dumps(message, cls=CustomJSONEncoder))
+
+    def _on_message(self, raw: str):
+        message = json.loads(raw)
+        task_id = message["task_id"]
+
+        origin = message.get("origin", "")
+
+        history = self._history.get(task_id)
+        if history is None:
+            history = self._history[task_id] = deque(maxlen=self.history_size)
+            while len(self._history) > self.max_tracked_tasks:
+                evicted, _ = self._history.popitem(last=False)
+                self._last_ids.pop(evicted, None)
+                self._seen.pop(evicted, None)
+
+        seen = self._seen.setdefault(task_id, {})
+        if message["id"] <= seen.get(origin, 0):
+            return  # Duplicate delivery
+        seen[origin] = message["id"]
+
+        self._history.move_to_end(task_id)
+        self._last_ids[task_id] = max(self._last_ids.get(task_id, 0), message["id"])
+        history.append(message)
+
+        for queue in self._subscribers.get(task_id, ()):
+            if queue.full():
+                queue.get_nowait()  # Slow consumer: drop its oldest event
+            queue.put_nowait(message)
+
+        for callback in self._listeners:
+            try:
+                callback(message)
+            except Exception as e:
+                print(f"Error in task event listener: {e}")
+
+    def subscribe(self, task_id: str, last_event_id: Optional[int] = None) -> Tuple[asyncio.Queue, List[Dict[str, Any]]]:
+        """Subscribe to a task; returns the queue and any events newer than last_event_id"""
+        queue = asyncio.Queue(maxsize=self.subscriber_queue_size)
+        self._subscribers.setdefault(task_id, set()).add(queue)
+
+        replay = []
+        if last_event_id is not None:
+            history = list(self._history.get(task_id, ()))
+            positions = [index for index, event in enumerate(history) if event["id"] == last_event_id]
+            if positions:
+                # Everything delivered after the last seen event, whatever its id
+                replay = history[positions[-1] + 1:]
+            else:
+                replay = [event for event in history if event["id"] > last_event_id]
+        return queue, replay
+
+    def unsubscribe(self, task_id: str, queue: asyncio.Queue):
+        subscribers = self._subscribers.get(task_id)
+        if subscribers:
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[task_id]
+
+    def subscriber_count(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
@@ -0,0 +1,233 @@
+import asyncio
+import hashlib
+import json
+import re
+from datetime import datetime
+from typing import Dict, Any, List
+
+from utils.json_encoder import CustomJSONEncoder
+
+NODE_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# Ready-made pipelines; clients may also send their own node list
+PIPELINE_TEMPLATES = {
+    "document_intake": [
+        {"id": "extract", "op": "extract"},
+        {"id": "translate", "op": "translate"},
+        {"id": "summarize", "op": "summarize", "inputs": ["translate"]},
+        {"id": "tasks", "op": "generate_tasks", "inputs": ["summarize", "extract"]}
+    ],
+    "review": [
+        {"id": "summarize", "op": "summarize"},
+        {"id": "analyze", "op": "analyze"},
+        {"id": "tasks", "op": "generate_tasks", "inputs": ["summarize", "analyze"]}
+    ]
+}
+
+class PipelineRunner:
+    """Runs declarative DAGs of document steps as a single task
+
+    Each node names an operation and the nodes it depends on. The document is
+    loaded once, outputs are handed to downstream nodes in memory, and nodes
+    whose inputs are ready run concurrently. Completed node outputs are
+    memoized by a key chained from the document content, the node's
+    parameters and its inputs' keys, so re-running a pipeline only executes
+    nodes whose inputs changed.
+    """
+
+    def __init__(self, task_service, max_nodes: int = 20, result_ttl_days: int = 7):
+        self.task_service = task_service
+        self.db = task_service.db
+        self.llm_service = task_service.llm_service
+        self.max_nodes = max_nodes
+        self.result_ttl_days = result_ttl_days
+        self.operations = {
+            "extract": self._extract,
+            "translate": self._translate,
+            "summarize": self._summarize,
+            "analyze": self._analyze,
+            "generate_tasks": self._generate_tasks
+        }
+
+    async def ensure_indexes(self):
+        await self.db.pipeline_results.create_index("key", unique=True)
+        await self.db.pipeline_results.create_index(
+            "created_at", expireAfterSeconds=self.result_ttl_days * 86400
+        )
+
+    def resolve_nodes(self, template: str = None, nodes: List[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Expand a template or validate a node list; raises ValueError if it is not a valid DAG"""
+        if template:
+            if template not in PIPELINE_TEMPLATES:
+                raise ValueError(f"Unknown pipeline template: {template}")
+            nodes = PIPELINE_TEMPLATES[template]
+        if not nodes:
+            raise ValueError("Pipeline has no nodes")
+        if len(nodes) > self.max_nodes:
+            raise ValueError(f"Pipeline exceeds {self.max_nodes} nodes")
+
+        resolved = []
+        for node in nodes:
+            node = {"inputs": [], "params": {}, **node}
+            if not NODE_ID_PATTERN.match(str(node.get("id", ""))):
+                raise ValueError(f"Invalid pipeline node id: {node.get('id')!r}")
+            if node.get("op") not in self.operations:
+                raise ValueError(f"Unknown pipeline operation: {node.get('op')}")
+            resolved.append({key: node[key] for key in ("id", "op", "inputs", "params")})
+
+        ids = [node["id"] for node in resolved]
+        if len(set(ids)) != len(ids):
+            raise ValueError("Pipeline node ids must be unique")
+        for node in resolved:
+            missing = [dep for dep in node["inputs"] if dep not in ids]
+            if missing:
+                raise ValueError(f"Node {node['id']} depends on unknown nodes: {missing}")
+
+        self._topological_order(resolved)
+        return resolved
+
+    def _topological_order(self, nodes: List[Dict[str, Any]]) -> List[str]:
+        remaining = {node["id"]: set(node["inputs"]) for node in nodes}
+        order = []
+        while remaining:
+            ready = sorted(node_id for node_id, deps in remaining.items() if not deps)
+            if not ready:
+                raise ValueError("Pipeline contains a cycle")
+            for node_id in ready:
+                del remaining[node_id]
+                order.append(node_id)
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        return order
+
+    async def run(self, task, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """Execute a pipeline task, reporting per-node state as it goes"""
+        document_id = parameters.get("document_id")
+        user_id = parameters.get("user_id")
+        if not document_id or not user_id:
+            raise ValueError("Missing document_id or user_id")
+
+        nodes = self.resolve_nodes(parameters.get("template"), parameters.get("nodes"))
+        by_id = {node["id"]: node for node in nodes}
+
+        doc = await self.db.documents.find_one(
+            {"id": document_id, "user_id": user_id},
+            {"_id": 0, "id": 1, "original_filename": 1, "category": 1, "extracted_text": 1}
+        )
+        if not doc:
+            raise ValueError("Document not found")
+        text = doc.get("extracted_text") or ""
+        content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+        keys: Dict[str, str] = {}
+        for node_id in self._topological_order(nodes):
+            node = by_id[node_id]
+            keys[node_id] = self._memo_key(user_id, content_hash, node, [keys[dep] for dep in node["inputs"]])
+
+        outputs: Dict[str, Dict[str, Any]] = {}
+        states = {node_id: "pending" for node_id in by_id}
+        futures = {node_id: asyncio.get_running_loop().create_future() for node_id in by_id}
+
+        async def report(node_id: str, state: str):
+            states[node_id] = state
+            done = len([s for s in states.values() if s in ("completed", "cached")])
+            await self.task_service._report_progress(
+                task, done / len(states) * 100, {f"pipeline.nodes.{node_id}": state}
+            )
+            await self.task_service.events.publish(task.id, "node", {"node": node_id, "state": state})
+
+        async def run_node(node_id: str):
+            node = by_id[node_id]
+            try:
+                inputs = {dep: await futures[dep] for dep in node["inputs"]}
+                self.task_service._check_cancelled(task)
+
+                memo = await self.db.pipeline_results.find_one({"key": keys[node_id]}, {"_id": 0, "output": 1})
+                if memo is not None:
+                    output, state = memo["output"], "cached"
+                else:
+                    await report(node_id, "running")
+                    output = await self.operations[node["op"]](doc, text, inputs, node["params"])
+                    await self.db.pipeline_results.update_one(
+                        {"key": keys[node_id]},
+                        {"$set": {"output": output, "user_id": user_id, "document_id": document_id,
+                                  "op": node["op"], "created_at": datetime.utcnow()}},
+                        upsert=True
+                    )
+                    state = "completed"
+
+                outputs[node_id] = output
+                futures[node_id].set_result(output)
+                await report(node_id, state)
+            except asyncio.CancelledError:
+                futures[node_id].cancel()
+                raise
+            except Exception as e:
+                if not futures[node_id].done():
+                    futures[node_id].set_exception(e)
+                raise
+
+        runs = [asyncio.create_task(run_node(node_id)) for node_id in by_id]
+        try:
+            await asyncio.gather(*runs)
+        except BaseException:
+            # One branch failed or the task was cancelled: stop the other branches too
+            for run in runs:
+                run.cancel()
+            await asyncio.gather(*runs, return_exceptions=True)
+            raise
+        finally:
+            for future in futures.values():
+                if future.done() and not future.cancelled():
+                    future.exception()  # Mark exceptions of failed branches as retrieved
+
+        return {
+            "document_id": document_id,
+            "nodes": outputs,
+            "cached_nodes": [node_id for node_id, state in states.items() if state == "cached"]
+        }
+
+    def _memo_key(self, user_id: str, content_hash: str, node: Dict[str, Any], input_keys: List[str]) -> str:
+        source = json.dumps(
+            {"user_id": user_id, "content": content_hash, "op": node["op"],
+             "params": node["params"], "inputs": input_keys},
+            sort_keys=True, cls=CustomJSONEncoder
+        )
+        return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+    def _input_text(self, text: str, inputs: Dict[str, Dict[str, Any]]) -> str:
+        # Steps that rewrite the document (e.g. translate) hand their text downstream
+        for output in inputs.values():
+            if "text" in output:
+                return output["text"]
+        return text
+
+    async def _extract(self, doc, text, inputs, params) -> Dict[str, Any]:
+        result = await self.llm_service.process_document_action("extract", self._input_text(text, inputs), params)
+        return {"extracted_data": result.get("extracted_data", {})}
+
+    async def _translate(self, doc, text, inputs, params) -> Dict[str, Any]:
+        target_language = params.get("target_language", "Spanish")
+        source = self._input_text(text, inputs)
+        result = await self.llm_service.process_document_action("translate", source, {"language": target_language})
+        return {
+            "target_language": target_language,
+            "text": result.get("translated_text", source),
+            "message": result["result"]
+        }
+
+    async def _summarize(self, doc, text, inputs, params) -> Dict[str, Any]:
+        source = self._input_text(text, inputs)
+        result = await self.llm_service.process_document_action("summarize", source, params)
+        return {"summary": result["result"], "word_count": len(source.split())}
+
+    async def _analyze(self, doc, text, inputs, params) -> Dict[str, Any]:
+        analysis_type = params.get("analysis_type", "general")
+        result = await self.llm_service.process_document_action(
+            "extract", self._input_text(text, inputs), {"analysis_type": analysis_type}
+        )
+        return {"analysis_type": analysis_type, "extracted_data": result.get("extracted_data", {})}
+
+    async def _generate_tasks(self, doc, text, inputs, params) -> Dict[str, Any]:
+        tasks = await self.llm_service.generate_tasks_from_document(self._input_text(text, inputs), doc)
+        return {"tasks": tasks}
@@ -0,0 +1,104 @@
+from typing import Dict, Any, Iterable, Tuple
+
+PRIORITY_CLASSES = ("interactive", "normal", "bulk")
+
+# Default class per task type; callers may only lower it when creating a task
+TASK_TYPE_PRIORITIES = {
+    "document_summarization": "interactive",
+    "document_translation": "interactive",
+    "document_analysis": "interactive",
+    "document_merge": "normal",
+    "document_comparison": "normal",
+    "document_redaction": "normal",
+    "document_pipeline": "normal",
+    "batch_document_processing": "bulk"
+}
+
+def resolve_priority(task_type: str, requested: str = None) -> str:
+    """Scheduling class of a new task: the task type's default, or a lower class if requested
+
+    Clients may demote their own work but never promote it, so a large batch
+    cannot claim the interactive share. Raises ValueError for unknown classes.
+    """
+    default = TASK_TYPE_PRIORITIES.get(task_type, "normal")
+    if requested is None:
+        return default
+    if requested not in PRIORITY_CLASSES:
+        raise ValueError(f"Unknown priority class: {requested}")
+    return max(default, requested, key=PRIORITY_CLASSES.index)
+
+class FairScheduler:
+    """Weighted fair choice of the next task across priority classes and users
+
+    Uses stride scheduling: every class and every (class, user) pair has a
+    virtual "pass" that advances by 1/weight each time it is served, and the
+    runnable candidate with the smallest pass goes next. Higher classes get
+    proportionally more leases without starving bulk work. Within a class
+    users are weighted by ``user_weights``; every user not listed has weight
+    1, so by default users simply take turns regardless of how many tasks
+    each one has queued.
+    """
+
+    def __init__(self, class_weights: Dict[str, float] = None, user_weights: Dict[str, float] = None):
+        self.class_weights = class_weights or {"interactive": 16.0, "normal": 4.0, "bulk": 1.0}
+        self.user_weights = user_weights or {}
+        self._class_pass: Dict[str, float] = {}
+        self._user_pass: Dict[Tuple[str, str], float] = {}
+        self.wait_stats: Dict[str, Dict[str, float]] = {
+            priority: {"leased": 0, "total_wait_ms": 0.0, "max_wait_ms": 0.0, "last_wait_ms": 0.0}
+            for priority in self.class_weights
+        }
+
+    def _pass_of(self, passes: Dict, key, peers: Iterable) -> float:
+        # Newcomers start at the current minimum so they cannot claim past turns
+        if key not in passes:
+            known = [passes[peer] for peer in peers if peer in passes]
+            passes[key] = min(known) if known else 0.0
+        return passes[key]
+
+    def retain(self, candidates: Iterable[Tuple[str, str]]):
+        """Forget idle classes and users so they rejoin at the current minimum instead of bursting"""
+        candidates = set(candidates)
+        classes = {priority for priority, _ in candidates}
+        self._class_pass = {c: p for c, p in self._class_pass.items() if c in classes}
+        self._user_pass = {key: p for key, p in self._user_pass.items() if key in candidates}
+
+    def choose(self, candidates: Iterable[Tuple[str, str]]) -> Tuple[str, str]:
+        """Pick the (priority, user_id) pair to serve next from the runnable ones"""
+        by_class: Dict[str, list] = {}
+        for priority, user_id in candidates:
+            by_class.setdefault(priority, []).append(user_id)
+
+        priority = min(by_class, key=lambda c: (
+            self._pass_of(self._class_pass, c, by_class), -self.class_weights.get(c, 1.0), c
+        ))
+        users = [(priority, user_id) for user_id in by_class[priority]]
+        _, user_id = min(users, key=lambda key: (self._pass_of(self._user_pass, key, users), key[1]))
+        return priority, user_id
+
+    def charge(self, priority: str, user_id: str, wait_ms: float):
+        """Account for a task that was actually leased"""
+        weight = self.class_weights.get(priority, 1.0)
+        self._class_pass[priority] = self._class_pass.get(priority, 0.0) + 1.0 / weight
+        key = (priority, user_id)
+        self._user_pass[key] = self._user_pass.get(key, 0.0) + 1.0 / self.user_weights.get(user_id, 1.0)
+
+        stats = self.wait_stats.setdefault(
+            priority, {"leased": 0, "total_wait_ms": 0.0, "max_wait_ms": 0.0, "last_wait_ms": 0.0}
+        )
+        stats["leased"] += 1
+        stats["total_wait_ms"] += wait_ms
+        stats["last_wait_ms"] = round(wait_ms, 1)
+        stats["max_wait_ms"] = round(max(stats["max_wait_ms"], wait_ms), 1)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            priority: {
+                "weight": self.class_weights.get(priority, 1.0),
+                "leased": stats["leased"],
+                "avg_wait_ms": round(stats["total_wait_ms"] / stats["leased"], 1) if stats["leased"] else 0.0,
+                "max_wait_ms": stats["max_wait_ms"],
+                "last_wait_ms": stats["last_wait_ms"]
+            }
+            for priority, stats in self.wait_stats.items()
+        }
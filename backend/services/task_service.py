@@ -1,104 +1,450 @@
 import asyncio
+import hashlib
 import json
-from typing import Dict, Any, List, Optional
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional, Callable, Set, Tuple
 from datetime import datetime, timedelta
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 import uuid
 
 from models.document import TaskStatus, DocumentMetadata
 from services.llm_service import LLMService
-from utils.json_encoder import serialize_document, serialize_documents
+from services.compare_engine import CompareEngine, describe_comparison
+from services.merge_engine import MergeEngine, MergeCancelled
+from services.redaction_engine import RedactionEngine, describe_redactions
+from services.task_events import TaskEventBus
+from services.task_pipeline import PipelineRunner
+from services.task_scheduler import FairScheduler, PRIORITY_CLASSES, resolve_priority
+from utils.json_encoder import CustomJSONEncoder, serialize_document, serialize_documents
+from utils.ttl_cache import TTLCache
+
+# Status reads skip the stored inputs and resume state, which can be large
+STATUS_PROJECTION = {"parameters": 0, "checkpoint": 0}
 
 class TaskService:
     """Service for managing asynchronous tasks and background processing"""
     
-    def __init__(self, db: AsyncIOMotorClient):
+    def __init__(self, db: AsyncIOMotorClient, events: TaskEventBus = None,
+                 max_attempts: int = 3, batch_concurrency: int = 8,
+                 retention_days: int = 7, document_service=None,
+                 redaction_workers: int = None):
         self.db = db
         self.llm_service = LLMService()
-        self.active_tasks = {}  # In-memory task tracking
+        self.document_service = document_service  # Registers documents produced by tasks
+        self.merge_engine = MergeEngine()
+        self.redaction_engine = RedactionEngine(max_workers=redaction_workers)
+        self.compare_engine = CompareEngine()
+        self.compare_result_ttl_days = retention_days  # Cached comparisons expire with finished tasks
+        self.redaction_batch_size = 50  # Documents whose text is loaded and scanned together
+        self.events = events or TaskEventBus()
+        self.max_attempts = max_attempts
+        self.batch_concurrency = batch_concurrency  # Documents processed in parallel per batch task
+        self.retention = timedelta(days=retention_days)  # Finished tasks are removed by a TTL index after this
+        self.checkpoint_batch_size = 10  # Batch results persisted per checkpoint write
+        self.progress_interval = 1.0  # Seconds between progress writes for long batches
+        self.task_handles: Dict[str, asyncio.Task] = {}  # Running executions, cancellable by task id; removed when they end
+        self._aborted: Set[str] = set()  # Tasks whose execution was stopped on purpose
+        self.stats_cache = TTLCache(ttl=5.0)  # Short-lived cache for dashboard polling
+        self.queue_listeners: List[Callable[[], None]] = []  # Notified when a task is enqueued
+        self.scheduler = FairScheduler()  # Picks which priority class and user is leased next
+        self.candidate_refresh_interval = 2.0  # Seconds between full scans for runnable (class, user) pairs
+        self._candidates: Set[Tuple[str, str]] = set()
+        self._candidates_refreshed_at = 0.0
+        self.dedup_result_ttl = 600.0  # Seconds a finished task is returned for identical submissions
+        self.dedup_hits = 0
+        
+        self.pipelines = PipelineRunner(self)
+        
+        # Cancellations are broadcast as task events, so every worker sees them
+        self.events.add_listener(self._on_task_event)
+    
+    async def ensure_indexes(self):
+        """Create indexes used by task lookups, statistics and queue leasing"""
+        await self.db.tasks.create_index("id", unique=True)
+        await self.db.tasks.create_index([("user_id", 1), ("status", 1), ("task_type", 1)])
+        await self.db.tasks.create_index([("status", 1), ("available_at", 1)])
+        await self.db.tasks.create_index([("user_id", 1), ("created_at", -1)])
+        await self.db.tasks.create_index([("status", 1), ("priority", 1), ("user_id", 1), ("available_at", 1)])
+        await self.db.tasks.create_index([("dedup_key", 1), ("created_at", -1)], sparse=True)
+        # At most one pending or running task per submission key; the field is removed when it finishes
+        await self.db.tasks.create_index(
+            "active_dedup_key", unique=True,
+            partialFilterExpression={"active_dedup_key": {"$exists": True}}
+        )
+        await self.db.compare_results.create_index("key", unique=True)
+        await self.db.compare_results.create_index(
+            "created_at", expireAfterSeconds=self.compare_result_ttl_days * 86400
+        )
+        await self.pipelines.ensure_indexes()
+        await self.db.tasks.create_index([("status", 1), ("lease_expires_at", 1)])
+        # Only finished tasks carry expires_at, so queued and running ones never expire
+        await self.db.tasks.create_index("expires_at", expireAfterSeconds=0)
     
     async def create_task(self, task_type: str, user_id: str, 
-                         parameters: Dict[str, Any] = None) -> TaskStatus:
-        """Create a new background task"""
+                         parameters: Dict[str, Any] = None, priority: str = None,
+                         dedup_key: str = None) -> TaskStatus:
+        """Enqueue a new background task in the persistent task queue"""
+        priority = resolve_priority(task_type, priority)
+        
         task = TaskStatus(
             task_type=task_type,
             user_id=user_id,
-            status="pending"
+            status="pending",
+            priority=priority
         )
         
-        # Store task in database
+        # Store task in database together with its queue bookkeeping
         task_dict = task.dict()
+        task_dict.update({
+            "parameters": parameters or {},
+            "attempts": 0,
+            "max_attempts": self.max_attempts,
+            "available_at": task.created_at,
+            "lease_owner": None,
+            "lease_expires_at": None
+        })
+        if dedup_key:
+            task_dict.update({"dedup_key": dedup_key, "active_dedup_key": dedup_key})
         await self.db.tasks.insert_one(task_dict)
+        self.stats_cache.invalidate(user_id)
+        self._candidates.add((priority, user_id))
         
-        # Add to active tasks
-        self.active_tasks[task.id] = task
-        
-        # Start task processing in background
-        asyncio.create_task(self._process_task(task.id, parameters or {}))
+        # Wake up any in-process worker instead of waiting for its next poll
+        for listener in self.queue_listeners:
+            listener()
         
         return task
     
-    async def _process_task(self, task_id: str, parameters: Dict[str, Any]):
-        """Process a task in the background"""
-        try:
-            task = self.active_tasks.get(task_id)
-            if not task:
-                return
+    async def submit_task(self, task_type: str, user_id: str, parameters: Dict[str, Any] = None,
+                          priority: str = None, idempotency_key: str = None) -> Tuple[TaskStatus, bool]:
+        """Enqueue a task unless an identical one is running or recently finished
+        
+        Returns the task and whether it was newly created. Submissions are
+        identified by the caller's idempotency key if given, otherwise by the
+        task type, user and parameters.
+        """
+        parameters = parameters or {}
+        dedup_key = self._dedup_key(task_type, user_id, parameters, idempotency_key)
+        include_failed = idempotency_key is not None  # An explicit key always replays its outcome
+        
+        existing = await self._find_duplicate(dedup_key, include_failed)
+        if existing is None:
+            try:
+                return await self.create_task(task_type, user_id, parameters, priority, dedup_key), True
+            except DuplicateKeyError:
+                # An identical submission was inserted concurrently
+                existing = await self._find_duplicate(dedup_key, include_failed)
+                if existing is None:
+                    raise
+        
+        self.dedup_hits += 1
+        return existing, False
+    
+    def _dedup_key(self, task_type: str, user_id: str, parameters: Dict[str, Any],
+                   idempotency_key: str = None) -> str:
+        if idempotency_key:
+            source = json.dumps({"user_id": user_id, "idempotency_key": idempotency_key})
+        else:
+            if "documents" in parameters:
+                # Snapshots can carry megabytes of text; their ids and content hashes identify them
+                parameters = {
+                    **parameters,
+                    "documents": [self._document_fingerprint(doc) for doc in parameters["documents"]]
+                }
+            source = json.dumps(
+                {"task_type": task_type, "user_id": user_id, "parameters": parameters},
+                sort_keys=True, cls=CustomJSONEncoder
+            )
+        return hashlib.sha256(source.encode("utf-8")).hexdigest()
+    
+    @staticmethod
+    def _document_fingerprint(doc: Dict[str, Any]) -> Dict[str, Any]:
+        text = doc.get("extracted_text")
+        return {
+            "id": doc.get("id"),
+            "content": hashlib.sha256(text.encode("utf-8")).hexdigest() if text is not None else None
+        }
+    
+    async def _find_duplicate(self, dedup_key: str, include_failed: bool = False) -> Optional[TaskStatus]:
+        finished = ["completed", "failed", "cancelled"] if include_failed else ["completed"]
+        cutoff = datetime.utcnow() - timedelta(seconds=self.dedup_result_ttl)
+        
+        task_data = await self.db.tasks.find_one(
+            {"dedup_key": dedup_key, "$or": [
+                {"status": {"$in": ["pending", "processing"]}},
+                {"status": {"$in": finished}, "updated_at": {"$gte": cutoff}}
+            ]},
+            STATUS_PROJECTION,
+            sort=[("created_at", -1)]
+        )
+        return TaskStatus(**serialize_document(task_data)) if task_data else None
+    
+    def _runnable_filter(self, now: datetime) -> Dict[str, Any]:
+        """Tasks that are due, including ones whose worker lost its lease"""
+        return {"$or": [
+            {"status": "pending", "available_at": {"$lte": now}},
+            {"status": "processing", "lease_expires_at": {"$lt": now}}
+        ]}
+    
+    async def lease_next_task(self, worker_id: str, visibility_timeout: float,
+                              exclude_classes: Iterable[str] = None) -> Optional[Dict[str, Any]]:
+        """Atomically lease the next runnable task chosen by the fair scheduler
+        
+        Priority classes in ``exclude_classes`` are skipped, e.g. bulk work
+        while a worker's bulk slots are all busy. The runnable (class, user)
+        pairs are kept between leases and rescanned every
+        ``candidate_refresh_interval`` seconds, or when none are left, so a
+        lease is one indexed find_one_and_update rather than a pass over the
+        whole queue. Work from a (class, user) pair new to this process is
+        therefore considered within one refresh interval.
+        """
+        now = datetime.utcnow()
+        runnable = self._runnable_filter(now)
+        
+        if not self._candidates or time.monotonic() - self._candidates_refreshed_at >= self.candidate_refresh_interval:
+            await self._refresh_candidates(runnable)
+        candidates = {key for key in self._candidates if key[0] not in (exclude_classes or ())}
+        
+        while candidates:
+            priority, user_id = self.scheduler.choose(candidates)
+            # Tasks created before priorities existed count as normal
+            priority_filter = {"$in": [priority, None]} if priority == "normal" else priority
             
-            # Update task status
-            task.status = "processing"
-            task.updated_at = datetime.utcnow()
-            await self._update_task_in_db(task)
+            task_doc = await self.db.tasks.find_one_and_update(
+                {"$and": [runnable, {"priority": priority_filter, "user_id": user_id}]},
+                {
+                    "$set": {
+                        "status": "processing",
+                        "lease_owner": worker_id,
+                        "lease_expires_at": now + timedelta(seconds=visibility_timeout),
+                        "heartbeat_at": now,
+                        "updated_at": now
+                    },
+                    "$inc": {"attempts": 1}
+                },
+                sort=[("available_at", 1)],
+                return_document=ReturnDocument.AFTER
+            )
+            if task_doc is not None:
+                wait_ms = (now - (task_doc.get("available_at") or now)).total_seconds() * 1000
+                self.scheduler.charge(priority, user_id, max(wait_ms, 0.0))
+                return task_doc
             
-            # Process based on task type
-            if task.task_type == "document_summarization":
-                result = await self._process_document_summarization(parameters)
-            elif task.task_type == "document_merge":
-                result = await self._process_document_merge(parameters)
-            elif task.task_type == "document_translation":
-                result = await self._process_document_translation(parameters)
-            elif task.task_type == "document_analysis":
-                result = await self._process_document_analysis(parameters)
-            elif task.task_type == "batch_document_processing":
-                result = await self._process_batch_documents(parameters)
-            else:
-                result = await self._process_generic_task(parameters)
+            # Nothing runnable left for this user in this class; try the next candidate
+            candidates.discard((priority, user_id))
+            self._candidates.discard((priority, user_id))
+        
+        return None
+    
+    async def _refresh_candidates(self, runnable: Dict[str, Any]):
+        """Rescan the queue for the (priority class, user) pairs that have runnable work"""
+        heads = await self.db.tasks.aggregate([
+            {"$match": runnable},
+            {"$group": {"_id": {
+                "priority": {"$ifNull": ["$priority", "normal"]},
+                "user_id": "$user_id"
+            }}}
+        ]).to_list(None)
+        self._candidates = {(row["_id"]["priority"], row["_id"]["user_id"]) for row in heads}
+        self._candidates_refreshed_at = time.monotonic()
+        self.scheduler.retain(self._candidates)
+    
+    async def extend_lease(self, task_id: str, worker_id: str, visibility_timeout: float) -> bool:
+        """Heartbeat: push the lease deadline out while the worker is still running the task"""
+        now = datetime.utcnow()
+        result = await self.db.tasks.update_one(
+            {"id": task_id, "lease_owner": worker_id, "status": "processing"},
+            {"$set": {
+                "lease_expires_at": now + timedelta(seconds=visibility_timeout),
+                "heartbeat_at": now
+            }}
+        )
+        return result.matched_count > 0
+    
+    async def run_leased_task(self, task_doc: Dict[str, Any], worker_id: str):
+        """Run a task leased by a worker and record its outcome"""
+        parameters = task_doc.get("parameters") or {}
+        attempts = task_doc.get("attempts", 1)
+        max_attempts = task_doc.get("max_attempts", self.max_attempts)
+        task = TaskStatus(**serialize_document(dict(task_doc)))
+        
+        try:
+            await self._publish_task_event(task)
             
-            # Update task as completed
-            task.status = "completed"
-            task.progress = 100.0
-            task.result = result
-            task.updated_at = datetime.utcnow()
+            if attempts > max_attempts:
+                # The task kept losing its lease, e.g. because it crashed its worker
+                task.status = "failed"
+                task.error = f"Task abandoned after {max_attempts} attempts"
+            else:
+                execution = asyncio.create_task(self._execute_task(task, parameters))
+                self.task_handles[task.id] = execution
+                try:
+                    result = await execution
+                    
+                    task.status = "completed"
+                    task.progress = 100.0
+                    task.result = result
+                
+                except asyncio.CancelledError:
+                    if task.id not in self._aborted:
+                        raise  # The worker itself is shutting down
+                    # Cancelled by the user or taken over by another worker;
+                    # whoever did that has already recorded the new state
+                    return
+                
+                except ValueError as e:
+                    # Invalid input - retrying will not help
+                    task.status = "failed"
+                    task.error = str(e)
+                
+                except Exception as e:
+                    if attempts < max_attempts:
+                        await self._retry_leased_task(task, worker_id, str(e), attempts)
+                        return
+                    task.status = "failed"
+                    task.error = str(e)
             
-        except Exception as e:
-            # Update task as failed
-            task.status = "failed"
-            task.error = str(e)
             task.updated_at = datetime.utcnow()
+            await self._finish_leased_task(task, worker_id)
         
         finally:
-            # Update in database
-            await self._update_task_in_db(task)
-            
-            # Remove from active tasks after delay
-            await asyncio.sleep(300)  # Keep for 5 minutes
-            self.active_tasks.pop(task_id, None)
+            self.task_handles.pop(task.id, None)
+            self._aborted.discard(task.id)
     
-    async def _process_document_summarization(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
-        """Process document summarization task"""
-        document_id = parameters.get("document_id")
-        user_id = parameters.get("user_id")
-        
-        if not document_id or not user_id:
-            raise ValueError("Missing document_id or user_id")
+    def abort_task(self, task_id: str) -> bool:
+        """Stop a task running in this process; returns False if it is not running here"""
+        execution = self.task_handles.get(task_id)
+        if execution is None or execution.done():
+            return False
+        
+        self._aborted.add(task_id)
+        execution.cancel()
+        return True
+    
+    def _on_task_event(self, message: Dict[str, Any]):
+        if message.get("event") == "cancelled":
+            self.abort_task(message["task_id"])
+    
+    def _check_cancelled(self, task: TaskStatus):
+        """Cancellation checkpoint between stages of a running task"""
+        if task.id in self._aborted:
+            raise asyncio.CancelledError()
+    
+    async def _execute_task(self, task: TaskStatus, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """Dispatch a task to its handler based on task type"""
+        if task.task_type == "document_summarization":
+            return await self._process_document_summarization(parameters)
+        elif task.task_type == "document_merge":
+            return await self._process_document_merge(task, parameters)
+        elif task.task_type == "document_translation":
+            return await self._process_document_translation(parameters)
+        elif task.task_type == "document_analysis":
+            return await self._process_document_analysis(parameters)
+        elif task.task_type == "document_comparison":
+            return await self._process_document_comparison(task, parameters)
+        elif task.task_type == "document_redaction":
+            return await self._process_document_redaction(task, parameters)
+        elif task.task_type == "batch_document_processing":
+            return await self._process_batch_documents(task, parameters)
+        elif task.task_type == "document_pipeline":
+            return await self.pipelines.run(task, parameters)
+        else:
+            return await self._process_generic_task(parameters)
+    
+    async def _finish_leased_task(self, task: TaskStatus, worker_id: str) -> bool:
+        """Persist a final status, but only while this worker still owns the lease"""
+        result = await self.db.tasks.update_one(
+            {"id": task.id, "lease_owner": worker_id, "status": "processing"},
+            {
+                "$set": {
+                    **task.dict(),
+                    "lease_owner": None,
+                    "lease_expires_at": None,
+                    "expires_at": task.updated_at + self.retention
+                },
+                "$unset": {"checkpoint": "", "active_dedup_key": ""}
+            }
+        )
+        if result.matched_count == 0:
+            # Cancelled or re-leased by another worker in the meantime
+            return False
         
-        # Get document from database
-        doc = await self.db.documents.find_one({"id": document_id, "user_id": user_id})
-        if not doc:
-            raise ValueError("Document not found")
+        self.stats_cache.invalidate(task.user_id)
+        await self._publish_task_event(task)
+        return True
+    
+    async def _retry_leased_task(self, task: TaskStatus, worker_id: str, error: str, attempts: int):
+        """Release a failed task back to the queue with exponential backoff"""
+        now = datetime.utcnow()
+        task.status = "pending"
+        task.error = error
+        task.updated_at = now
+        
+        result = await self.db.tasks.update_one(
+            {"id": task.id, "lease_owner": worker_id, "status": "processing"},
+            {"$set": {
+                "status": "pending",
+                "error": error,
+                "updated_at": now,
+                "available_at": now + timedelta(seconds=min(2 ** attempts, 60)),
+                "lease_owner": None,
+                "lease_expires_at": None
+            }}
+        )
+        if result.matched_count > 0:
+            await self._publish_task_event(task)
+    
+    def _task_document_ids(self, parameters: Dict[str, Any]) -> List[str]:
+        # Single-document tasks accept either document_id or a document_ids list
+        if parameters.get("document_id"):
+            return [parameters["document_id"]]
+        return list(dict.fromkeys(parameters.get("document_ids") or []))
+    
+    def _task_option(self, parameters: Dict[str, Any], name: str, default: Any = None) -> Any:
+        # Options are given top-level or nested under "parameters" by /documents/action
+        return parameters.get(name, (parameters.get("parameters") or {}).get(name, default))
+    
+    async def _fetch_documents(self, document_ids: List[str], user_id: str,
+                               snapshots: List[Dict[str, Any]] = None,
+                               include_text: bool = True) -> Dict[str, Dict[str, Any]]:
+        """Documents by id, using snapshots handed over at submission and one $in query for the rest"""
+        docs = {doc["id"]: doc for doc in snapshots or [] if doc.get("id") in document_ids}
+        missing = [
+            doc_id for doc_id in document_ids
+            if doc_id not in docs or (include_text and "extracted_text" not in docs[doc_id])
+        ]
+        if missing:
+            projection = {"_id": 0, "embedding": 0}
+            if not include_text:
+                projection["extracted_text"] = 0
+            async for doc in self.db.documents.find({"id": {"$in": missing}, "user_id": user_id}, projection):
+                docs[doc["id"]] = doc
+        return docs
+    
+    async def _load_documents(self, parameters: Dict[str, Any], include_text: bool = True) -> List[Dict[str, Any]]:
+        """All documents of a task in order; raises ValueError if any is missing"""
+        document_ids = self._task_document_ids(parameters)
+        user_id = parameters.get("user_id")
         
-        doc = serialize_document(doc)
+        if not document_ids or not user_id:
+            raise ValueError("Missing document_ids or user_id")
         
+        docs = await self._fetch_documents(document_ids, user_id, parameters.get("documents"), include_text)
+        if len(docs) != len(document_ids):
+            raise ValueError("Some documents not found" if len(document_ids) > 1 else "Document not found")
+        return [docs[doc_id] for doc_id in document_ids]
+    
+    async def _process_document_summarization(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """Process document summarization task"""
+        docs = await self._load_documents(parameters)
+        return await self._summarize_document(docs[0], parameters)
+    
+    async def _summarize_document(self, doc: Dict[str, Any], parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """Summarize an already loaded document and store the summary"""
         # Generate summary using LLM service
         summary_result = await self.llm_service.process_document_action(
             "summarize", 
@@ -108,66 +454,110 @@ class TaskService:
         
         # Update document with summary
         await self.db.documents.update_one(
-            {"id": document_id},
+            {"id": doc["id"]},
             {"$set": {"content_summary": summary_result["result"]}}
         )
         
         return {
-            "document_id": document_id,
+            "document_id": doc["id"],
             "summary": summary_result["result"],
             "word_count": len(doc.get("extracted_text", "").split())
         }
     
-    async def _process_document_merge(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
-        """Process document merge task"""
-        document_ids = parameters.get("document_ids", [])
-        user_id = parameters.get("user_id")
-        
-        if not document_ids or not user_id:
-            raise ValueError("Missing document_ids or user_id")
-        
-        # Get documents from database
-        docs = await self.db.documents.find({
-            "id": {"$in": document_ids},
-            "user_id": user_id
-        }).to_list(len(document_ids))
-        
-        if len(docs) != len(document_ids):
-            raise ValueError("Some documents not found")
-        
-        docs = serialize_documents(docs)
-        
-        # Simulate merge processing
-        await asyncio.sleep(2.0)
+    async def _process_document_merge(self, task: TaskStatus, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """Merge documents into a new PDF document"""
+        docs = await self._load_documents(parameters, include_text=False)
+        if len(docs) < 2:
+            raise ValueError("Select at least two documents to merge")
+        if self.document_service is None:
+            raise ValueError("Merging requires document storage")
+        for doc in docs:
+            self.merge_engine.input_kind(doc)  # Fail fast on unsupported inputs
+        
+        user_id = parameters["user_id"]
+        output_name = self._task_option(parameters, "output_filename") or \
+            f"merged_document_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.pdf"
+        if not output_name.lower().endswith(".pdf"):
+            output_name += ".pdf"
+        doc_id, output_path = self.document_service.allocate_storage_path(output_name)
+        
+        # The merge runs in a thread; progress comes back through a queue
+        loop = asyncio.get_running_loop()
+        progress: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+        
+        def on_progress(index: int, pages: int, finished: bool):
+            loop.call_soon_threadsafe(progress.put_nowait, (index, pages, finished))
+        
+        reporter = asyncio.create_task(self._report_merge_progress(task, docs, progress))
+        try:
+            summary = await loop.run_in_executor(
+                None, self.merge_engine.merge, docs, output_path, on_progress, stop
+            )
+        except MergeCancelled:
+            raise asyncio.CancelledError()
+        except BaseException:
+            stop.set()  # Stops the merge thread at its next page
+            raise
+        finally:
+            reporter.cancel()
         
-        # Generate merge result
-        merge_result = await self.llm_service.process_document_action(
-            "merge",
-            "",
-            {"count": len(docs), "filenames": [doc["original_filename"] for doc in docs]}
-        )
+        try:
+            self._check_cancelled(task)
+            
+            # Searchable text of the merged document is the inputs' text in order
+            texts = await self._fetch_documents([doc["id"] for doc in docs], user_id)
+            merged = await self.document_service.register_document(
+                doc_id,
+                output_path,
+                output_name,
+                user_id,
+                category=self._task_option(parameters, "category") or docs[0].get("category") or "general",
+                tags=["merged"],
+                extracted_text="\n\n".join(
+                    texts[doc["id"]].get("extracted_text") or "" for doc in docs if doc["id"] in texts
+                ) or None,
+                metadata={"merged_from": [doc["id"] for doc in docs], "pages": summary["pages"]}
+            )
+        except BaseException:
+            output_path.unlink(missing_ok=True)
+            raise
         
         return {
             "merged_documents": len(docs),
-            "output_file": merge_result.get("output_file"),
-            "original_files": [doc["original_filename"] for doc in docs]
+            "document_id": merged.id,
+            "output_file": output_name,
+            "original_files": [doc["original_filename"] for doc in docs],
+            "pages": summary["pages"],
+            "file_size": summary["file_size"],
+            "inputs": summary["inputs"]
         }
     
+    async def _report_merge_progress(self, task: TaskStatus, docs: List[Dict[str, Any]], progress: asyncio.Queue):
+        """Publish per-input merge progress received from the merge thread"""
+        while True:
+            index, pages, finished = await progress.get()
+            try:
+                # Reserve the last few percent for registering the output
+                await self._report_progress(task, (index + (1 if finished else 0.5)) / len(docs) * 95)
+                await self.events.publish(task.id, "input", {
+                    "index": index,
+                    "document_id": docs[index]["id"],
+                    "filename": docs[index].get("original_filename"),
+                    "pages": pages,
+                    "status": "merged" if finished else "merging"
+                })
+            except asyncio.CancelledError:
+                if task.id in self._aborted:
+                    self.abort_task(task.id)  # Cancelled in the database: stop the merge too
+                raise
+            except Exception as e:
+                print(f"Error reporting merge progress: {e}")
+    
     async def _process_document_translation(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
         """Process document translation task"""
-        document_id = parameters.get("document_id")
-        user_id = parameters.get("user_id")
-        target_language = parameters.get("target_language", "Spanish")
-        
-        if not document_id or not user_id:
-            raise ValueError("Missing document_id or user_id")
-        
-        # Get document from database
-        doc = await self.db.documents.find_one({"id": document_id, "user_id": user_id})
-        if not doc:
-            raise ValueError("Document not found")
-        
-        doc = serialize_document(doc)
+        target_language = self._task_option(parameters, "target_language", "Spanish")
+        doc = (await self._load_documents(parameters))[0]
         
         # Simulate translation processing
         await asyncio.sleep(3.0)
@@ -180,7 +570,7 @@ class TaskService:
         )
         
         return {
-            "document_id": document_id,
+            "document_id": doc["id"],
             "target_language": target_language,
             "original_length": len(doc.get("extracted_text", "")),
             "translated_length": len(doc.get("extracted_text", ""))  # Mock same length
@@ -188,20 +578,12 @@ class TaskService:
     
     async def _process_document_analysis(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
         """Process document analysis task"""
-        document_id = parameters.get("document_id")
-        user_id = parameters.get("user_id")
-        analysis_type = parameters.get("analysis_type", "general")
-        
-        if not document_id or not user_id:
-            raise ValueError("Missing document_id or user_id")
-        
-        # Get document from database
-        doc = await self.db.documents.find_one({"id": document_id, "user_id": user_id})
-        if not doc:
-            raise ValueError("Document not found")
-        
-        doc = serialize_document(doc)
-        
+        analysis_type = self._task_option(parameters, "analysis_type", "general")
+        doc = (await self._load_documents(parameters))[0]
+        return await self._analyze_document(doc, analysis_type)
+    
+    async def _analyze_document(self, doc: Dict[str, Any], analysis_type: str = "general") -> Dict[str, Any]:
+        """Analyze an already loaded document"""
         # Simulate analysis processing
         await asyncio.sleep(2.5)
         
@@ -213,54 +595,217 @@ class TaskService:
         )
         
         return {
-            "document_id": document_id,
+            "document_id": doc["id"],
             "analysis_type": analysis_type,
             "extracted_data": analysis_result.get("extracted_data", {}),
             "insights": f"Analysis completed for {analysis_type} type"
         }
     
-    async def _process_batch_documents(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
-        """Process multiple documents in batch"""
-        document_ids = parameters.get("document_ids", [])
-        user_id = parameters.get("user_id")
-        operation = parameters.get("operation", "summarize")
+    async def compare_texts(self, text_a: str, text_b: str,
+                            task: Optional[TaskStatus] = None) -> Tuple[Dict[str, Any], bool]:
+        """Diff two texts through the compare_results cache
+        
+        Returns the comparison and whether it was served from the cache.
+        """
+        # Keyed by content, so renamed or re-uploaded copies hit the same entry
+        key = hashlib.sha256("|".join([
+            self.compare_engine.version,
+            hashlib.sha256(text_a.encode("utf-8")).hexdigest(),
+            hashlib.sha256(text_b.encode("utf-8")).hexdigest()
+        ]).encode("utf-8")).hexdigest()
+        
+        cached = await self.db.compare_results.find_one({"key": key}, {"_id": 0, "comparison": 1})
+        if cached is not None:
+            return cached["comparison"], True
+        
+        if task is not None:
+            await self._report_progress(task, 10)
+        comparison = await asyncio.get_running_loop().run_in_executor(
+            None, self.compare_engine.compare, text_a, text_b
+        )
+        if task is not None:
+            self._check_cancelled(task)
+        await self.db.compare_results.update_one(
+            {"key": key},
+            {"$set": {"comparison": comparison, "created_at": datetime.utcnow()}},
+            upsert=True
+        )
+        return comparison, False
+    
+    async def _process_document_comparison(self, task: TaskStatus, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """Diff two documents, reusing the stored result for the same pair of texts"""
+        docs = await self._load_documents(parameters)
+        if len(docs) != 2:
+            raise ValueError("Select exactly two documents to compare")
+        base, other = docs
+        comparison, cached = await self.compare_texts(
+            base.get("extracted_text") or "", other.get("extracted_text") or "", task
+        )
         
+        return {
+            "message": describe_comparison(comparison),
+            "document_ids": [base["id"], other["id"]],
+            "original_files": [base.get("original_filename"), other.get("original_filename")],
+            "cached": cached,
+            **comparison
+        }
+    
+    async def _process_document_redaction(self, task: TaskStatus, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """Redact PII from documents and store each redacted copy as a new document
+        
+        Documents are loaded and scanned in groups so a large corpus never has
+        all of its text in memory; each group is spread over the redaction
+        engine's process pool.
+        """
+        document_ids = self._task_document_ids(parameters)
+        user_id = parameters.get("user_id")
         if not document_ids or not user_id:
             raise ValueError("Missing document_ids or user_id")
+        if self.document_service is None:
+            raise ValueError("Redaction requires document storage")
         
         results = []
-        
-        for doc_id in document_ids:
-            try:
-                # Process each document
-                if operation == "summarize":
-                    result = await self._process_document_summarization({
-                        "document_id": doc_id,
-                        "user_id": user_id
-                    })
-                elif operation == "analyze":
-                    result = await self._process_document_analysis({
-                        "document_id": doc_id,
-                        "user_id": user_id
-                    })
-                else:
-                    result = {"document_id": doc_id, "status": "processed"}
+        totals: Dict[str, int] = {}
+        scanned, scan_seconds = 0, 0.0
+        
+        for start in range(0, len(document_ids), self.redaction_batch_size):
+            self._check_cancelled(task)
+            group = document_ids[start:start + self.redaction_batch_size]
+            docs = await self._fetch_documents(group, user_id, parameters.get("documents"))
+            if len(docs) != len(group):
+                raise ValueError("Some documents not found" if len(document_ids) > 1 else "Document not found")
+            docs = [docs[doc_id] for doc_id in group]
+            
+            outcome = await self.redaction_engine.redact([doc.get("extracted_text") or "" for doc in docs])
+            scanned += outcome["bytes_scanned"]
+            scan_seconds += outcome["elapsed_ms"] / 1000
+            self._check_cancelled(task)
+            
+            for doc, text, counts in zip(docs, outcome["texts"], outcome["counts"]):
+                if not doc.get("extracted_text"):
+                    results.append({"document_id": doc["id"], "error": "No extracted text to redact"})
+                    continue
+                for name, count in counts.items():
+                    totals[name] = totals.get(name, 0) + count
                 
-                results.append(result)
+                # The redacted copy is plain text: the original layout may still contain the PII
+                output_name = f"{Path(doc.get('original_filename') or doc['id']).stem}_redacted.txt"
+                doc_id, output_path = self.document_service.allocate_storage_path(output_name)
+                await asyncio.to_thread(output_path.write_text, text, encoding="utf-8")
+                try:
+                    redacted = await self.document_service.register_document(
+                        doc_id, output_path, output_name, user_id,
+                        category=doc.get("category") or "general",
+                        tags=["redacted"],
+                        extracted_text=text,
+                        metadata={"redacted_from": doc["id"], "redactions": counts}
+                    )
+                except BaseException:
+                    output_path.unlink(missing_ok=True)
+                    raise
                 
-            except Exception as e:
                 results.append({
-                    "document_id": doc_id,
-                    "error": str(e),
-                    "status": "failed"
+                    "document_id": doc["id"],
+                    "redacted_document_id": redacted.id,
+                    "output_file": output_name,
+                    "redactions": counts
                 })
+            
+            await self._report_progress(task, len(results) / len(document_ids) * 100)
         
+        return {
+            "message": describe_redactions(totals),
+            "total_documents": len(document_ids),
+            "redacted": len([r for r in results if "error" not in r]),
+            "redactions": totals,
+            "results": results,
+            "bytes_scanned": scanned,
+            "throughput_mb_s": round(scanned / 1024 / 1024 / scan_seconds, 2) if scan_seconds > 0 else 0.0
+        }
+    
+    async def _process_batch_documents(self, task: TaskStatus, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """Process multiple documents in batch with bounded concurrency
+        
+        All documents are prefetched with one query and processed in parallel
+        under a semaphore. Successful per-document results are checkpointed
+        into the task record together with progress, so a batch that is
+        re-leased after a crash only processes what is still missing.
+        """
+        document_ids = list(dict.fromkeys(parameters.get("document_ids", [])))
+        user_id = parameters.get("user_id")
+        operation = parameters.get("operation", "summarize")
+        analysis_type = self._task_option(parameters, "analysis_type", "general")
+        concurrency = max(1, min(int(parameters.get("concurrency", self.batch_concurrency)), 32))
+        
+        if not document_ids or not user_id:
+            raise ValueError("Missing document_ids or user_id")
+        
+        # Resume from results checkpointed by an earlier attempt
+        task_doc = await self.db.tasks.find_one({"id": task.id}, {"checkpoint": 1})
+        results = dict(((task_doc or {}).get("checkpoint") or {}).get("results") or {})
+        remaining = [doc_id for doc_id in document_ids if doc_id not in results]
+        
+        # Prefetch every remaining document in a single round trip, unless handed over already
+        docs = {}
+        if remaining:
+            docs = await self._fetch_documents(remaining, user_id, parameters.get("documents"))
+        
+        semaphore = asyncio.Semaphore(concurrency)
+        unsaved: Dict[str, Any] = {}
+        last_flush = time.monotonic()
+        
+        async def flush():
+            nonlocal unsaved, last_flush
+            checkpoint, unsaved = unsaved, {}
+            last_flush = time.monotonic()
+            await self._report_progress(
+                task,
+                len(results) / len(document_ids) * 100,
+                {f"checkpoint.results.{doc_id}": result for doc_id, result in checkpoint.items()}
+            )
+        
+        async def process(doc_id: str):
+            async with semaphore:
+                self._check_cancelled(task)
+                try:
+                    doc = docs.get(doc_id)
+                    if doc is None:
+                        raise ValueError("Document not found")
+                    if operation == "summarize":
+                        result = await self._summarize_document(doc, {"user_id": user_id})
+                    elif operation == "analyze":
+                        result = await self._analyze_document(doc, analysis_type)
+                    else:
+                        result = {"document_id": doc_id, "status": "processed"}
+                    unsaved[doc_id] = result
+                except Exception as e:
+                    # Failures are not checkpointed so a resumed batch retries them
+                    result = {"document_id": doc_id, "error": str(e), "status": "failed"}
+            
+            results[doc_id] = result
+            self._check_cancelled(task)
+            if len(unsaved) >= self.checkpoint_batch_size or time.monotonic() - last_flush >= self.progress_interval:
+                await flush()
+        
+        runs = [asyncio.create_task(process(doc_id)) for doc_id in remaining]
+        try:
+            await asyncio.gather(*runs)
+        except BaseException:
+            # Cancelled or a progress write failed: stop the other documents before returning
+            for run in runs:
+                run.cancel()
+            await asyncio.gather(*runs, return_exceptions=True)
+            raise
+        if unsaved:
+            await flush()
+        
+        ordered = [results[doc_id] for doc_id in document_ids]
         return {
             "operation": operation,
             "total_documents": len(document_ids),
-            "successful": len([r for r in results if "error" not in r]),
-            "failed": len([r for r in results if "error" in r]),
-            "results": results
+            "successful": len([r for r in ordered if "error" not in r]),
+            "failed": len([r for r in ordered if "error" in r]),
+            "results": ordered
         }
     
     async def _process_generic_task(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
@@ -273,37 +818,89 @@ class TaskService:
             "timestamp": datetime.utcnow().isoformat()
         }
     
-    async def _update_task_in_db(self, task: TaskStatus):
-        """Update task in database"""
-        task_dict = task.dict()
-        await self.db.tasks.update_one(
-            {"id": task.id},
-            {"$set": task_dict}
+    async def _report_progress(self, task: TaskStatus, progress: float, extra: Dict[str, Any] = None):
+        """Persist incremental progress of a running task and notify subscribers"""
+        task.progress = round(progress, 1)
+        task.updated_at = datetime.utcnow()
+        
+        result = await self.db.tasks.update_one(
+            {"id": task.id, "status": "processing"},
+            {"$set": {"progress": task.progress, "updated_at": task.updated_at, **(extra or {})}}
         )
+        if result.matched_count == 0:
+            # Cancelled in the database, possibly from a process without a shared broker
+            self._aborted.add(task.id)
+            raise asyncio.CancelledError()
+        
+        try:
+            await self.events.publish(task.id, "progress", {
+                "progress": task.progress,
+                "updated_at": task.updated_at
+            })
+        except Exception as e:
+            print(f"Error publishing task event: {e}")
+    
+    async def _publish_task_event(self, task: TaskStatus):
+        """Push a task state change to event stream subscribers"""
+        try:
+            await self.events.publish(task.id, "status", {
+                "status": task.status,
+                "progress": task.progress,
+                "updated_at": task.updated_at
+            })
+            
+            if task.status == "completed":
+                await self.events.publish(task.id, "result", {"result": task.result})
+            elif task.status == "failed":
+                await self.events.publish(task.id, "error", {"error": task.error})
+            elif task.status == "cancelled":
+                await self.events.publish(task.id, "cancelled", {})
+        except Exception as e:
+            print(f"Error publishing task event: {e}")
     
     async def get_task_status(self, task_id: str, user_id: str) -> Optional[TaskStatus]:
         """Get task status"""
-        task_data = await self.db.tasks.find_one({"id": task_id, "user_id": user_id})
+        task_data = await self.db.tasks.find_one({"id": task_id, "user_id": user_id}, STATUS_PROJECTION)
         if task_data:
             task_data = serialize_document(task_data)
             return TaskStatus(**task_data)
         return None
     
     async def get_user_tasks(self, user_id: str, limit: int = 50) -> List[TaskStatus]:
-        """Get all tasks for a user"""
-        tasks = await self.db.tasks.find({"user_id": user_id}).limit(limit).to_list(limit)
+        """Get a user's most recent tasks, newest first"""
+        tasks = await self.db.tasks.find({"user_id": user_id}, STATUS_PROJECTION) \
+            .sort("created_at", -1).limit(limit).to_list(limit)
         tasks = serialize_documents(tasks)
         return [TaskStatus(**task) for task in tasks]
     
     async def cancel_task(self, task_id: str, user_id: str) -> bool:
-        """Cancel a task"""
-        task = self.active_tasks.get(task_id)
-        if task and task.user_id == user_id:
-            task.status = "cancelled"
-            task.updated_at = datetime.utcnow()
-            await self._update_task_in_db(task)
-            return True
-        return False
+        """Cancel a pending or running task"""
+        now = datetime.utcnow()
+        result = await self.db.tasks.update_one(
+            {"id": task_id, "user_id": user_id, "status": {"$in": ["pending", "processing"]}},
+            {
+                "$set": {
+                    "status": "cancelled",
+                    "updated_at": now,
+                    "lease_owner": None,
+                    "lease_expires_at": None,
+                    "expires_at": now + self.retention
+                },
+                "$unset": {"active_dedup_key": ""}
+            }
+        )
+        if result.matched_count == 0:
+            return False
+        
+        # Stop the work right away if it runs here; other workers stop on the cancelled event
+        self.abort_task(task_id)
+        
+        task = await self.get_task_status(task_id, user_id)
+        
+        self.stats_cache.invalidate(user_id)
+        if task:
+            await self._publish_task_event(task)
+        return True
     
     async def cleanup_old_tasks(self, days_old: int = 7):
         """Clean up old completed tasks"""
@@ -314,4 +911,74 @@ class TaskService:
             "updated_at": {"$lt": cutoff_date}
         })
         
-        return result.deleted_count
\ No newline at end of file
+        return result.deleted_count
+    
+    async def get_queue_stats(self) -> Dict[str, Any]:
+        """Queue depth and wait times per priority class"""
+        now = datetime.utcnow()
+        pipeline = [
+            {"$match": {"status": "pending"}},
+            {"$group": {
+                "_id": {"$ifNull": ["$priority", "normal"]},
+                "depth": {"$sum": 1},
+                "due": {"$sum": {"$cond": [{"$lte": ["$available_at", now]}, 1, 0]}},
+                "oldest_available_at": {"$min": "$available_at"}
+            }}
+        ]
+        
+        queued = {row["_id"]: row async for row in self.db.tasks.aggregate(pipeline)}
+        leased = self.scheduler.get_stats()
+        
+        stats = {}
+        for priority in PRIORITY_CLASSES:
+            row = queued.get(priority, {})
+            oldest = row.get("oldest_available_at")
+            stats[priority] = {
+                "depth": row.get("depth", 0),
+                "due": row.get("due", 0),
+                "oldest_wait_ms": round(max((now - oldest).total_seconds() * 1000, 0.0), 1) if oldest else 0.0,
+                **leased.get(priority, {})
+            }
+        return stats
+    
+    async def get_task_stats(self, user_id: str) -> Dict[str, Any]:
+        """Get task statistics computed server-side with a $group aggregation"""
+        cached = self.stats_cache.get(user_id)
+        if cached is not None:
+            return cached
+        
+        pipeline = [
+            {"$match": {"user_id": user_id}},
+            {"$group": {
+                "_id": {"status": "$status", "task_type": "$task_type"},
+                "count": {"$sum": 1}
+            }}
+        ]
+        
+        total_tasks = 0
+        status_counts = {}
+        type_counts = {}
+        
+        async for row in self.db.tasks.aggregate(pipeline):
+            count = row["count"]
+            status = row["_id"].get("status")
+            task_type = row["_id"].get("task_type")
+            
+            total_tasks += count
+            status_counts[status] = status_counts.get(status, 0) + count
+            type_counts[task_type] = type_counts.get(task_type, 0) + count
+        
+        # Calculate completion rate
+        completed = status_counts.get("completed", 0)
+        completion_rate = (completed / total_tasks * 100) if total_tasks > 0 else 0
+        
+        stats = {
+            "total_tasks": total_tasks,
+            "completion_rate": round(completion_rate, 1),
+            "status_breakdown": status_counts,
+            "type_breakdown": type_counts,
+            "active_tasks": status_counts.get("processing", 0) + status_counts.get("pending", 0)
+        }
+        
+        self.stats_cache.set(user_id, stats)
+        return stats
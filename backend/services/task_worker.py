@@ -0,0 +1,116 @@
+import asyncio
+import os
+import socket
+import uuid
+from typing import Dict, Any, Set
+
+from services.task_service import TaskService
+
+class TaskWorker:
+    """Runs tasks from the persistent Mongo task queue
+
+    Tasks are leased atomically with find_one_and_update. While a task runs its
+    lease is extended by a heartbeat; if the worker dies, the lease expires
+    after ``visibility_timeout`` and another worker picks the task up again.
+    Bulk tasks may occupy at most ``concurrency - reserved_slots`` slots, so
+    interactive and normal work always finds a free slot.
+    """
+
+    def __init__(self, task_service: TaskService, concurrency: int = 4,
+                 visibility_timeout: float = 60.0, poll_interval: float = 1.0,
+                 worker_id: str = None, reserved_slots: int = 1):
+        self.task_service = task_service
+        self.concurrency = concurrency
+        self.visibility_timeout = visibility_timeout
+        self.poll_interval = poll_interval
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._slots = asyncio.Semaphore(concurrency)
+        self._wakeup = asyncio.Event()
+        self.bulk_limit = max(1, concurrency - reserved_slots)
+        self._running: Dict[str, asyncio.Task] = {}
+        self._bulk_running: Set[str] = set()
+        self._loop_task = None
+        self._stopping = False
+
+    def notify(self):
+        """Signal that a task was enqueued so the worker polls immediately"""
+        self._wakeup.set()
+
+    async def start(self):
+        if self._loop_task is None:
+            self._stopping = False
+            self._loop_task = asyncio.create_task(self._run())
+
+    async def stop(self, grace_period: float = 30.0):
+        """Stop leasing new tasks and give running ones a grace period to finish"""
+        self._stopping = True
+        if self._loop_task:
+            self._loop_task.cancel()
+            try:
+                await self._loop_task
+            except asyncio.CancelledError:
+                pass
+            self._loop_task = None
+
+        if self._running:
+            # Unfinished tasks keep their lease until it expires and are then re-run elsewhere
+            await asyncio.wait(list(self._running.values()), timeout=grace_period)
+
+    async def _run(self):
+        while not self._stopping:
+            await self._slots.acquire()
+            self._wakeup.clear()
+            try:
+                exclude = {"bulk"} if len(self._bulk_running) >= self.bulk_limit else None
+                task_doc = await self.task_service.lease_next_task(
+                    self.worker_id, self.visibility_timeout, exclude
+                )
+            except Exception as e:
+                print(f"Error leasing task: {e}")
+                task_doc = None
+
+            if task_doc is None:
+                self._slots.release()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            if task_doc.get("priority") == "bulk":
+                self._bulk_running.add(task_doc["id"])
+            self._running[task_doc["id"]] = asyncio.create_task(self._execute(task_doc))
+
+    async def _execute(self, task_doc):
+        task_id = task_doc["id"]
+        heartbeat = asyncio.create_task(self._heartbeat(task_id))
+        try:
+            await self.task_service.run_leased_task(task_doc, self.worker_id)
+        except Exception as e:
+            print(f"Error running task {task_id}: {e}")
+        finally:
+            heartbeat.cancel()
+            self._running.pop(task_id, None)
+            self._bulk_running.discard(task_id)
+            self._slots.release()
+
+    async def _heartbeat(self, task_id: str):
+        while True:
+            await asyncio.sleep(self.visibility_timeout / 3)
+            try:
+                if not await self.task_service.extend_lease(task_id, self.worker_id, self.visibility_timeout):
+                    # Lease lost: the task was cancelled or taken over by another worker
+                    self.task_service.abort_task(task_id)
+                    return
+            except Exception as e:
+                print(f"Error extending lease for task {task_id}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "worker_id": self.worker_id,
+            "concurrency": self.concurrency,
+            "running": len(self._running),
+            "bulk_running": len(self._bulk_running),
+            "bulk_limit": self.bulk_limit,
+            "executions": len(self.task_service.task_handles)
+        }
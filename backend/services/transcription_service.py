@@ -0,0 +1,101 @@
+import hashlib
+import time
+from typing import Dict, Any, Optional, List
+
+class TranscriptionStream:
+    """Incremental transcription of a single utterance"""
+
+    async def feed(self, chunk: bytes) -> Optional[str]:
+        """Consume an audio frame and return the updated partial transcript, if it changed"""
+        raise NotImplementedError
+
+    async def finish(self) -> Dict[str, Any]:
+        """Close the utterance and return the final transcription"""
+        raise NotImplementedError
+
+class TranscriptionBackend:
+    """Pluggable speech-to-text backend - replace with Whisper or a streaming STT provider"""
+
+    name = "base"
+
+    def open_stream(self, language: str = "en") -> TranscriptionStream:
+        """Start transcribing a new utterance"""
+        raise NotImplementedError
+
+    async def transcribe(self, audio: bytes, language: str = "en") -> Dict[str, Any]:
+        """Transcribe a complete audio file by feeding it through a stream"""
+        started = time.perf_counter()
+        stream = self.open_stream(language)
+        await stream.feed(audio)
+        result = await stream.finish()
+        result["processing_time"] = round(time.perf_counter() - started, 3)
+        return result
+
+class MockTranscriptionStream(TranscriptionStream):
+    """Deterministic local stand-in: reveals a canned phrase as audio bytes arrive"""
+
+    def __init__(self, phrases: List[str], language: str, bytes_per_word: int, bytes_per_second: int):
+        self.phrases = phrases
+        self.language = language
+        self.bytes_per_word = bytes_per_word
+        self.bytes_per_second = bytes_per_second
+        self._words: List[str] = []
+        self._received = 0
+        self._revealed = 0
+
+    async def feed(self, chunk: bytes) -> Optional[str]:
+        if not chunk:
+            return None
+
+        # Pick the phrase from the first frame so the same audio always yields the same text
+        if not self._words:
+            index = int(hashlib.sha256(chunk).hexdigest(), 16) % len(self.phrases)
+            self._words = self.phrases[index].split()
+
+        self._received += len(chunk)
+        revealed = min(len(self._words), max(1, self._received // self.bytes_per_word))
+        if revealed == self._revealed:
+            return None
+
+        self._revealed = revealed
+        return " ".join(self._words[:revealed])
+
+    async def finish(self) -> Dict[str, Any]:
+        return {
+            "transcription": " ".join(self._words),
+            "confidence": 0.92 if self._words else 0.0,
+            "language": self.language,
+            "duration": round(self._received / self.bytes_per_second, 1)
+        }
+
+class MockTranscriptionBackend(TranscriptionBackend):
+    """Local transcription backend used for development and tests"""
+
+    name = "mock"
+
+    def __init__(self, bytes_per_word: int = 8000, bytes_per_second: int = 32000):
+        # Defaults assume 16 kHz 16-bit mono PCM, roughly two words per second
+        self.bytes_per_word = bytes_per_word
+        self.bytes_per_second = bytes_per_second
+        self.phrases = [
+            "Find the signed contract from last October for ACME Corp",
+            "Merge the three most recent invoices from Vendor A into one PDF",
+            "Summarize all HR onboarding forms signed this month",
+            "Show me all compliance documents that need review",
+            "Convert this document to PDF format",
+            "Send the quarterly report to the team"
+        ]
+
+    def open_stream(self, language: str = "en") -> TranscriptionStream:
+        return MockTranscriptionStream(self.phrases, language, self.bytes_per_word, self.bytes_per_second)
+
+TRANSCRIPTION_BACKENDS = {
+    "mock": MockTranscriptionBackend
+}
+
+def create_transcription_backend(name: str = "mock") -> TranscriptionBackend:
+    """Create a transcription backend by name"""
+    backend_class = TRANSCRIPTION_BACKENDS.get(name)
+    if backend_class is None:
+        raise ValueError(f"Unknown transcription backend: {name}")
+    return backend_class()
@@ -0,0 +1,182 @@
+import asyncio
+import hashlib
+import io
+import math
+import os
+import re
+import wave
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+AUDIO_ID_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+class MockSpeechSynthesizer:
+    """Mock speech synthesizer - replace with a real TTS provider
+
+    Produces a quiet tone as 16-bit mono WAV, so the cache and streaming path
+    serve real audio bytes.
+    """
+
+    audio_format = "wav"
+    media_type = "audio/wav"
+    sample_rate = 16000
+
+    def duration_for(self, text: str) -> float:
+        return max(0.5, len(text) * 0.05)  # Rough estimate, matches the old API
+
+    def synthesize(self, text: str, voice: str, language: str) -> bytes:
+        duration = self.duration_for(text)
+        frequency = 220.0 + (int(hashlib.md5(voice.encode()).hexdigest(), 16) % 200)
+
+        samples = np.arange(int(duration * self.sample_rate)) / self.sample_rate
+        tone = (0.1 * 32767 * np.sin(2 * math.pi * frequency * samples)).astype("<i2")
+
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(self.sample_rate)
+            wav.writeframes(tone.tobytes())
+
+        return buffer.getvalue()
+
+class TTSService:
+    """Content-addressed text-to-speech audio store with LRU eviction by total bytes
+
+    The directory on disk is the source of truth, so several server processes
+    can share one store: a file written by another process is adopted on
+    lookup, each hit touches the file's mtime to record recency, and the index
+    is rebuilt from disk before evicting so the byte budget covers every
+    process's files.
+    """
+
+    def __init__(self, storage_path: str, max_bytes: int = 256 * 1024 * 1024,
+                 synthesizer: MockSpeechSynthesizer = None):
+        self.storage_path = Path(storage_path)
+        self.storage_path.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.synthesizer = synthesizer or MockSpeechSynthesizer()
+        self._index: "OrderedDict[str, int]" = OrderedDict()  # audio id -> size, LRU order
+        self._total_bytes = 0
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._load_index()
+
+    def _load_index(self):
+        self._set_index(self._scan_disk())
+
+    def _set_index(self, index: "OrderedDict[str, int]"):
+        self._index = index
+        self._total_bytes = sum(index.values())
+
+    def _scan_disk(self) -> "OrderedDict[str, int]":
+        """Sizes of the audio files on disk, least recently used first"""
+        files = []
+        for path in self.storage_path.glob(f"*.{self.synthesizer.audio_format}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue  # Evicted by another process while listing
+            files.append((stat.st_mtime, path.stem, stat.st_size))
+
+        return OrderedDict((audio_id, size) for _, audio_id, size in sorted(files))
+
+    @staticmethod
+    def audio_id_for(text: str, voice: str, language: str) -> str:
+        """Stable content hash of everything that affects the synthesized audio"""
+        key = "\0".join([text, voice, language])
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def get_audio_path(self, audio_id: str) -> Optional[Path]:
+        """Return the cached file for an audio id and mark it as recently used
+
+        Falls back to the file on disk when another process synthesized it.
+        """
+        if not AUDIO_ID_PATTERN.match(audio_id):
+            return None
+
+        path = self._path_for(audio_id)
+        try:
+            os.utime(path)  # Recency shared with the other processes
+            size = path.stat().st_size
+        except FileNotFoundError:
+            self._forget(audio_id)
+            return None
+
+        if audio_id not in self._index:
+            self._index[audio_id] = size
+            self._total_bytes += size
+        self._index.move_to_end(audio_id)
+        return path
+
+    async def synthesize(self, text: str, voice: str = "default", language: str = "en") -> Dict[str, Any]:
+        """Return cached audio for (text, voice, language), generating it at most once"""
+        audio_id = self.audio_id_for(text, voice, language)
+
+        cached = self.get_audio_path(audio_id) is not None
+        if not cached:
+            # Single-flight: concurrent requests for the same phrase share one synthesis
+            future = self._in_flight.get(audio_id)
+            if future is None:
+                future = asyncio.get_running_loop().create_future()
+                self._in_flight[audio_id] = future
+                try:
+                    await self._generate(audio_id, text, voice, language)
+                    future.set_result(None)
+                except Exception as e:
+                    future.set_exception(e)
+                    raise
+                finally:
+                    self._in_flight.pop(audio_id, None)
+            else:
+                await future
+
+        size = self._index.get(audio_id, 0)
+        return {
+            "audio_id": audio_id,
+            "format": self.synthesizer.audio_format,
+            "media_type": self.synthesizer.media_type,
+            "size": size,
+            "duration": round(self.synthesizer.duration_for(text), 2),
+            "cached": cached
+        }
+
+    async def _generate(self, audio_id: str, text: str, voice: str, language: str):
+        audio = await asyncio.to_thread(self.synthesizer.synthesize, text, voice, language)
+        await asyncio.to_thread(self._write_atomic, self._path_for(audio_id), audio)
+
+        # Pick up files other processes added or evicted before applying the budget
+        self._set_index(await asyncio.to_thread(self._scan_disk))
+        if audio_id in self._index:
+            self._index.move_to_end(audio_id)  # Never evict what was just written
+        self._evict()
+
+    @staticmethod
+    def _write_atomic(path: Path, data: bytes):
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _evict(self):
+        """Drop least recently used entries until the store fits in max_bytes"""
+        while self._total_bytes > self.max_bytes and len(self._index) > 1:
+            audio_id = next(iter(self._index))
+            self._path_for(audio_id).unlink(missing_ok=True)
+            self._forget(audio_id)
+
+    def _forget(self, audio_id: str):
+        size = self._index.pop(audio_id, 0)
+        self._total_bytes -= size
+
+    def _path_for(self, audio_id: str) -> Path:
+        return self.storage_path / f"{audio_id}.{self.synthesizer.audio_format}"
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._index),
+            "total_bytes": self._total_bytes,
+            "max_bytes": self.max_bytes
+        }
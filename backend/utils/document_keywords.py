@@ -0,0 +1,18 @@
+# Category keywords in priority order - the first category with a hit wins
+CATEGORY_KEYWORDS = {
+    'contracts': ['contract', 'agreement', 'terms'],
+    'invoices': ['invoice', 'bill', 'payment'],
+    'hr': ['hr', 'employee', 'onboarding', 'hire'],
+    'compliance': ['compliance', 'policy', 'regulation'],
+}
+
+# Common business document tags
+TAG_KEYWORDS = {
+    'urgent': ['urgent', 'asap', 'immediate', 'priority'],
+    'signed': ['signed', 'signature', 'executed'],
+    'draft': ['draft', 'preliminary', 'version'],
+    'quarterly': ['quarterly', 'q1', 'q2', 'q3', 'q4'],
+    'annual': ['annual', 'yearly', 'year-end'],
+    'confidential': ['confidential', 'private', 'restricted'],
+    'review': ['review', 'approval', 'pending'],
+}
@@ -0,0 +1,80 @@
+from collections import deque
+from typing import Dict, Hashable, Iterable, List, Set
+
+class KeywordMatcher:
+    """Multi-pattern substring matcher (Aho-Corasick automaton)
+
+    Every keyword is compiled into a single automaton, so a scan is one pass over
+    the text regardless of how many keywords are registered. Matching is
+    case-insensitive and has the same semantics as ``keyword in text``.
+    """
+
+    def __init__(self, keyword_labels: Dict[str, Iterable[Hashable]] = None):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Set[Hashable]] = [set()]
+        self._compiled = False
+
+        for keyword, labels in (keyword_labels or {}).items():
+            for label in labels:
+                self.add(keyword, label)
+
+    def add(self, keyword: str, label: Hashable):
+        """Register a keyword that reports ``label`` when found"""
+        if not keyword:
+            raise ValueError("Keyword must not be empty")
+
+        state = 0
+        for char in keyword.lower():
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(set())
+                self._goto[state][char] = next_state
+            state = next_state
+
+        self._output[state].add(label)
+        self._compiled = False
+
+    def _compile(self):
+        """Compute failure links breadth-first and merge outputs along them"""
+        queue = deque()
+        for state in self._goto[0].values():
+            self._fail[state] = 0
+            queue.append(state)
+
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] |= self._output[self._fail[next_state]]
+
+        self._compiled = True
+
+    def find_labels(self, *texts: str) -> Set[Hashable]:
+        """Return every label whose keyword occurs in any of the given texts"""
+        if not self._compiled:
+            self._compile()
+
+        goto, fail, output = self._goto, self._fail, self._output
+        labels = set()
+
+        for text in texts:
+            if not text:
+                continue
+
+            state = 0
+            for char in text.lower():
+                while state and char not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(char, 0)
+                if output[state]:
+                    labels |= output[state]
+
+        return labels
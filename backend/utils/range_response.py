@@ -0,0 +1,67 @@
+import os
+import re
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+from fastapi import HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+CHUNK_SIZE = 64 * 1024
+
+def _iter_file(path: Path, start: int, length: int) -> Iterator[bytes]:
+    """Read a byte range from disk in fixed-size chunks"""
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+def range_file_response(request: Request, path: Path, media_type: str,
+                        etag: Optional[str] = None,
+                        headers: Optional[Dict[str, str]] = None) -> Response:
+    """Serve a file with HTTP Range and conditional (ETag) request support"""
+    file_size = os.path.getsize(path)
+    response_headers = {"Accept-Ranges": "bytes", **(headers or {})}
+    if etag:
+        response_headers["ETag"] = f'"{etag}"'
+        if request.headers.get("if-none-match") == response_headers["ETag"]:
+            return Response(status_code=304, headers=response_headers)
+
+    range_header = request.headers.get("range")
+    if not range_header:
+        response_headers["Content-Length"] = str(file_size)
+        return StreamingResponse(
+            _iter_file(path, 0, file_size), media_type=media_type, headers=response_headers
+        )
+
+    match = RANGE_PATTERN.match(range_header.strip())
+    if not match or match.groups() == ("", ""):
+        raise HTTPException(status_code=416, detail="Invalid range",
+                            headers={"Content-Range": f"bytes */{file_size}"})
+
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), file_size - 1) if last else file_size - 1
+    else:
+        # Suffix range: the last N bytes
+        start = max(0, file_size - int(last))
+        end = file_size - 1
+
+    if start >= file_size or start > end:
+        raise HTTPException(status_code=416, detail="Range not satisfiable",
+                            headers={"Content-Range": f"bytes */{file_size}"})
+
+    length = end - start + 1
+    response_headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+    response_headers["Content-Length"] = str(length)
+
+    return StreamingResponse(
+        _iter_file(path, start, length), status_code=206,
+        media_type=media_type, headers=response_headers
+    )
@@ -0,0 +1,24 @@
+import json
+from typing import Any, Optional
+
+from utils.json_encoder import CustomJSONEncoder
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no"  # Disable proxy buffering so events are flushed immediately
+}
+
+def format_sse(data: Any, event: Optional[str] = None, event_id: Optional[str] = None) -> str:
+    """Format a payload as a Server-Sent Events message"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    
+    payload = data if isinstance(data, str) else json.dumps(data, cls=CustomJSONEncoder)
+    for line in payload.splitlines() or [""]:
+        lines.append(f"data: {line}")
+    
+    return "\n".join(lines) + "\n\n"
@@ -0,0 +1,166 @@
+import io
+from typing import BinaryIO, Callable, Dict, Iterable, List, Optional
+
+from PyPDF2.generic import (
+    ArrayObject, DictionaryObject, IndirectObject, NameObject, StreamObject
+)
+
+LETTER = (612, 792)
+
+def _pdf_string(text: str) -> bytes:
+    data = text.encode("cp1252", errors="replace")
+    return b"(" + data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+class StreamingPdfWriter:
+    """Writes a PDF object by object, so pages never accumulate in memory
+
+    Only the byte offset of each object and the list of page object numbers
+    are kept until close(), which writes the page tree, catalog and xref table.
+    """
+
+    CATALOG = 1
+    PAGES = 2
+
+    def __init__(self, fileobj: BinaryIO):
+        self.file = fileobj
+        self._offsets: Dict[int, int] = {}
+        self._next_number = 3
+        self._kids: List[int] = []
+        self._text_font: Optional[int] = None
+        self.file.write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+
+    @property
+    def page_count(self) -> int:
+        return len(self._kids)
+
+    def reserve(self) -> int:
+        number = self._next_number
+        self._next_number += 1
+        return number
+
+    def write_object(self, number: int, body: bytes):
+        self._offsets[number] = self.file.tell()
+        self.file.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+
+    def write_stream(self, number: int, dictionary: bytes, data: bytes):
+        """Write a stream object; ``dictionary`` holds the entries other than /Length"""
+        self.write_object(
+            number,
+            b"<<" + dictionary + b" /Length %d>>\nstream\n" % len(data) + data + b"\nendstream"
+        )
+
+    def write_page(self, number: int, entries: bytes):
+        """Write a page object and add it to the page tree"""
+        self.write_object(number, b"<</Type /Page /Parent %d 0 R " % self.PAGES + entries + b">>")
+        self._kids.append(number)
+
+    def copy_pages(self, pages: Iterable[DictionaryObject],
+                   on_page: Callable[[int], None] = None):
+        """Append all pages of one input read with PyPDF2, copying what they reference
+
+        Objects shared between the pages (fonts, images) are written once.
+        References to other pages or the source page tree are dropped so
+        they do not drag the whole input along.
+        """
+        refs: Dict[int, int] = {}
+        for index, page in enumerate(pages):
+            self._copy_page(page, refs)
+            if on_page:
+                on_page(index + 1)
+
+    def _copy_page(self, page: DictionaryObject, refs: Dict[int, int]):
+        page_number = self.reserve()
+        source_page = getattr(page, "indirect_reference", None)
+        if source_page is not None:
+            refs[source_page.idnum] = page_number
+
+        pending = []
+
+        def ref(indirect: IndirectObject) -> bytes:
+            number = refs.get(indirect.idnum)
+            if number is None:
+                target = indirect.get_object()
+                if isinstance(target, DictionaryObject) and target.get("/Type") in ("/Page", "/Pages"):
+                    return b"null"  # Links to other pages or the source page tree
+                number = refs[indirect.idnum] = self.reserve()
+                pending.append((number, target))
+            return b"%d 0 R" % number
+
+        entries = b" ".join(
+            self._serialize(NameObject(key), ref) + b" " + self._serialize(value, ref)
+            for key, value in page.items()
+            if key not in ("/Type", "/Parent")
+        )
+        self.write_page(page_number, entries)
+
+        while pending:
+            number, target = pending.pop()
+            if isinstance(target, StreamObject):
+                dictionary = b" ".join(
+                    self._serialize(NameObject(key), ref) + b" " + self._serialize(value, ref)
+                    for key, value in target.items()
+                    if key != "/Length"
+                )
+                self.write_stream(number, dictionary, target._data)
+            else:
+                self.write_object(number, self._serialize(target, ref))
+
+    def _serialize(self, obj, ref: Callable[[IndirectObject], bytes]) -> bytes:
+        if isinstance(obj, IndirectObject):
+            return ref(obj)
+        if isinstance(obj, DictionaryObject):
+            return b"<<" + b" ".join(
+                self._serialize(NameObject(key), ref) + b" " + self._serialize(value, ref)
+                for key, value in obj.items()
+            ) + b">>"
+        if isinstance(obj, ArrayObject):
+            return b"[" + b" ".join(self._serialize(item, ref) for item in obj) + b"]"
+
+        buffer = io.BytesIO()
+        obj.write_to_stream(buffer, None)
+        return buffer.getvalue()
+
+    def add_text_page(self, lines: List[str], font_size: int = 10, margin: int = 50):
+        """Append a page of plain text set in Courier"""
+        if self._text_font is None:
+            self._text_font = self.reserve()
+            self.write_object(
+                self._text_font,
+                b"<</Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding>>"
+            )
+
+        width, height = LETTER
+        leading = font_size * 1.2
+        content = [b"BT /F1 %d Tf %.1f TL %d %d Td" % (font_size, leading, margin, height - margin - font_size)]
+        for line in lines:
+            content.append(_pdf_string(line) + b" Tj T*")
+        content.append(b"ET")
+
+        stream_number = self.reserve()
+        self.write_stream(stream_number, b"", b"\n".join(content))
+        self.write_page(
+            self.reserve(),
+            b"/MediaBox [0 0 %d %d] /Resources <</Font <</F1 %d 0 R>>>> /Contents %d 0 R"
+            % (width, height, self._text_font, stream_number)
+        )
+
+    def close(self):
+        """Write the page tree, catalog, cross-reference table and trailer"""
+        kids = b" ".join(b"%d 0 R" % number for number in self._kids)
+        self.write_object(self.PAGES, b"<</Type /Pages /Kids [" + kids + b"] /Count %d>>" % len(self._kids))
+        self.write_object(self.CATALOG, b"<</Type /Catalog /Pages %d 0 R>>" % self.PAGES)
+
+        xref_offset = self.file.tell()
+        size = self._next_number
+        self.file.write(b"xref\n0 %d\n" % size)
+        self.file.write(b"0000000000 65535 f \n")
+        for number in range(1, size):
+            offset = self._offsets.get(number)
+            if offset is None:
+                self.file.write(b"0000000000 65535 f \n")  # Reserved but never written
+            else:
+                self.file.write(b"%010d 00000 n \n" % offset)
+        self.file.write(
+            b"trailer\n<</Size %d /Root %d 0 R>>\nstartxref\n%d\n%%%%EOF\n"
+            % (size, self.CATALOG, xref_offset)
+        )
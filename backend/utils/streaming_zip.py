@@ -0,0 +1,55 @@
+import io
+import time
+import zipfile
+from typing import BinaryIO, Optional, Tuple
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, non-seekable target that collects bytes until drained"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+class StreamingZipWriter:
+    """Builds a ZIP archive incrementally without a seekable target
+
+    Entries are written with data descriptors, so sizes and CRCs are computed
+    while the content passes through. Call drain() after each write to take
+    the bytes produced so far; only those bytes and the central directory
+    entries are ever held in memory.
+    """
+
+    def __init__(self):
+        self._sink = _ChunkSink()
+        self._zip = zipfile.ZipFile(self._sink, mode="w")
+
+    def open_entry(self, name: str, size: int = 0, compress: bool = True,
+                   date_time: Optional[Tuple[int, int, int, int, int, int]] = None) -> BinaryIO:
+        """Open an entry for writing; ``size`` decides whether ZIP64 fields are needed"""
+        info = zipfile.ZipInfo(name, date_time=date_time or time.localtime(time.time())[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+        info.file_size = size
+        return self._zip.open(info, mode="w")
+
+    def write_entry(self, name: str, data: bytes, compress: bool = True):
+        with self.open_entry(name, len(data), compress) as entry:
+            entry.write(data)
+
+    def drain(self) -> bytes:
+        return self._sink.drain()
+
+    def close(self) -> bytes:
+        """Write the central directory and return the remaining bytes"""
+        self._zip.close()
+        return self.drain()
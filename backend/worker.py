@@ -0,0 +1,99 @@
+"""Standalone task worker
+
+Runs tasks from the persistent task queue outside the API process. Start
+several processes to spread document work over separate cores:
+
+    python worker.py --processes 4 --concurrency 8
+
+Set TASK_EMBEDDED_WORKER=false on the API so it only enqueues tasks, and
+TASK_EVENT_BROKER=change_stream so task events reach API subscribers.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from services.document_service import DocumentService
+from services.message_bus import create_message_bus
+from services.task_events import TaskEventBus
+from services.task_service import TaskService
+from services.task_worker import TaskWorker
+
+async def run_worker(concurrency: int, visibility_timeout: float):
+    """Run one worker until SIGINT/SIGTERM"""
+    client = AsyncIOMotorClient(os.environ.get('MONGO_URL', 'mongodb://localhost:27017'))
+    db = client[os.environ.get('DB_NAME', 'fileclerk_ai')]
+    
+    events = TaskEventBus(create_message_bus(
+        os.environ.get('TASK_EVENT_BROKER', 'local'), db, "task_events"
+    ))
+    task_service = TaskService(
+        db, events,
+        batch_concurrency=int(os.environ.get('TASK_BATCH_CONCURRENCY', 8)),
+        retention_days=int(os.environ.get('TASK_RETENTION_DAYS', 7)),
+        document_service=DocumentService(db, str(ROOT_DIR / "storage")),
+        redaction_workers=int(os.environ['REDACTION_WORKERS']) if os.environ.get('REDACTION_WORKERS') else None
+    )
+    worker = TaskWorker(
+        task_service, concurrency=concurrency, visibility_timeout=visibility_timeout,
+        reserved_slots=int(os.environ.get('TASK_RESERVED_SLOTS', 1))
+    )
+    
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
+    
+    await task_service.ensure_indexes()
+    await events.broker.start()
+    await worker.start()
+    print(f"Task worker {worker.worker_id} started (concurrency={concurrency})")
+    
+    await stop_event.wait()
+    
+    print(f"Task worker {worker.worker_id} shutting down...")
+    await worker.stop()
+    await events.broker.stop()
+    task_service.redaction_engine.shutdown()
+    client.close()
+
+def _worker_process(concurrency: int, visibility_timeout: float):
+    asyncio.run(run_worker(concurrency, visibility_timeout))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run FileClerkAI task workers")
+    parser.add_argument("--processes", type=int, default=1, help="Number of worker processes")
+    parser.add_argument("--concurrency", type=int,
+                        default=int(os.environ.get('TASK_WORKER_CONCURRENCY', 4)),
+                        help="Concurrent tasks per process")
+    parser.add_argument("--visibility-timeout", type=float,
+                        default=float(os.environ.get('TASK_VISIBILITY_TIMEOUT', 60)),
+                        help="Seconds before an unheartbeated lease can be taken over")
+    args = parser.parse_args()
+    
+    if args.processes == 1:
+        _worker_process(args.concurrency, args.visibility_timeout)
+    else:
+        processes = [
+            multiprocessing.Process(target=_worker_process, args=(args.concurrency, args.visibility_timeout))
+            for _ in range(args.processes)
+        ]
+        for process in processes:
+            process.start()
+        
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            # Children received the same SIGINT and shut down on their own
+            for process in processes:
+                process.join()
@@ -94,6 +94,29 @@ export const useTasks = () => {
   }, []);
 
   const pollTaskStatus = useCallback(async (taskId, onUpdate) => {
+    // Prefer the server-pushed event stream; fall back to polling without EventSource
+    if (typeof EventSource !== 'undefined') {
+      const source = new EventSource(tasksAPI.eventsUrl(taskId));
+      let task = { id: taskId };
+
+      const handleEvent = (updates, done = false) => {
+        task = { ...task, ...updates };
+        onUpdate(task);
+        if (done) source.close();
+      };
+
+      source.addEventListener('status', (e) => handleEvent(JSON.parse(e.data)));
+      source.addEventListener('progress', (e) => handleEvent(JSON.parse(e.data)));
+      source.addEventListener('result', (e) => handleEvent({ status: 'completed', ...JSON.parse(e.data) }, true));
+      source.addEventListener('cancelled', () => handleEvent({ status: 'cancelled' }, true));
+      source.addEventListener('error', (e) => {
+        // Task failures carry data; connection errors do not and EventSource reconnects itself
+        if (e.data) handleEvent({ status: 'failed', ...JSON.parse(e.data) }, true);
+      });
+
+      return () => source.close();
+    }
+
     const pollInterval = setInterval(async () => {
       try {
         const task = await tasksAPI.getById(taskId);
@@ -110,7 +133,7 @@ export const useTasks = () => {
       }
     }, 2000); // Poll every 2 seconds
     
-    return pollInterval;
+    return () => clearInterval(pollInterval);
   }, []);
 
   // Load tasks on mount
@@ -221,6 +221,9 @@ export const tasksAPI = {
     return response.data;
   },
 
+  // EventSource cannot send headers, so the token travels as a query parameter
+  eventsUrl: (taskId) => `${API_BASE}/tasks/${taskId}/events?token=${encodeURIComponent(authToken || '')}`,
+
   cancel: async (taskId) => {
     const response = await api.post(`/tasks/${taskId}/cancel`);
     return response.data;
@@ -0,0 +1,14 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Backend modules import each other as top-level packages (services, utils, models)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+
+@pytest.fixture
+def db():
+    """In-memory stand-in for the Motor database"""
+    from mongomock_motor import AsyncMongoMockClient
+    return AsyncMongoMockClient()["fileclerk_test"]
@@ -0,0 +1,130 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from services.activity_sink import ActivitySink
+
+
+class FakeActivities:
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    async def insert_many(self, documents, ordered=True):
+        if self.fail:
+            raise RuntimeError("write failed")
+        self.batches.append(list(documents))
+
+
+def make_sink(fail=False, **kwargs):
+    activities = FakeActivities(fail)
+    return ActivitySink(SimpleNamespace(activities=activities), **kwargs), activities
+
+
+def test_full_batches_flush_without_waiting_for_the_interval():
+    async def scenario():
+        sink, activities = make_sink(batch_size=3, flush_interval=0.5)
+        await sink.start()
+        started = time.monotonic()
+        for i in range(6):
+            await sink.submit({"n": i})
+        while sink.stats["written"] < 6:
+            await asyncio.sleep(0.001)
+        assert time.monotonic() - started < 0.4
+        assert [[doc["n"] for doc in batch] for batch in activities.batches] == [[0, 1, 2], [3, 4, 5]]
+        await sink.stop()
+
+    asyncio.run(scenario())
+
+
+def test_partial_batch_flushes_after_the_interval():
+    async def scenario():
+        sink, activities = make_sink(batch_size=100, flush_interval=0.02)
+        await sink.start()
+        await sink.submit({"n": 1})
+        await asyncio.sleep(0.1)
+        assert activities.batches == [[{"n": 1}]]
+        assert sink.stats["batches"] == 1
+        await sink.stop()
+
+    asyncio.run(scenario())
+
+
+def test_stop_drains_the_queue():
+    async def scenario():
+        sink, activities = make_sink(batch_size=2, flush_interval=0.05)
+        await sink.start()
+        for i in range(5):
+            await sink.submit({"n": i})
+        await sink.stop()
+        assert sum(len(batch) for batch in activities.batches) == 5
+        assert not sink.running and sink.get_stats()["queue_depth"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_drops_after_backpressure_timeout():
+    async def scenario():
+        sink, activities = make_sink(max_queue_size=2, backpressure_timeout=0.01)
+        assert await sink.submit({"n": 1}) and await sink.submit({"n": 2})
+        assert await sink.submit({"n": 3}) is False  # No writer running, so no room frees up
+        assert sink.stats["dropped"] == 1 and sink.stats["enqueued"] == 2
+
+        await sink.start()
+        await sink.stop()
+        assert activities.batches == [[{"n": 1}, {"n": 2}]]
+
+    asyncio.run(scenario())
+
+
+def test_producer_waits_for_room_instead_of_dropping():
+    async def scenario():
+        sink, activities = make_sink(max_queue_size=1, batch_size=1, flush_interval=0.01,
+                                     backpressure_timeout=1)
+        await sink.submit({"n": 1})
+        await sink.start()
+        assert await sink.submit({"n": 2})
+        await sink.stop()
+        assert sink.stats["dropped"] == 0 and sink.stats["written"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_failed_writes_are_counted_and_hooks_skipped():
+    hooked = []
+
+    async def hook(documents):
+        hooked.append(documents)
+
+    async def scenario():
+        sink, _ = make_sink(fail=True, flush_interval=0.01)
+        sink.add_batch_hook(hook)
+        await sink.start()
+        await sink.submit({"n": 1})
+        await sink.stop()
+        assert sink.stats["failed"] == 1 and sink.stats["written"] == 0
+
+    asyncio.run(scenario())
+    assert hooked == []
+
+
+def test_hooks_see_each_written_batch_and_errors_are_contained():
+    seen = []
+
+    async def broken(documents):
+        raise RuntimeError("hook failed")
+
+    async def record(documents):
+        seen.append([doc["n"] for doc in documents])
+
+    async def scenario():
+        sink, _ = make_sink(batch_size=2, flush_interval=0.01)
+        sink.add_batch_hook(broken)
+        sink.add_batch_hook(record)
+        await sink.start()
+        for i in range(3):
+            await sink.submit({"n": i})
+        await sink.stop()
+
+    asyncio.run(scenario())
+    assert seen == [[0, 1], [2]]
@@ -0,0 +1,89 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from services.auth_service import AuthService
+
+
+class FakeSessions:
+    """Minimal sessions collection; find_one can be held until released"""
+
+    def __init__(self, *sessions):
+        self.docs = {session["id"]: session for session in sessions}
+        self.hold = None
+
+    async def find_one(self, query):
+        doc = self.docs.get(query["id"])
+        if self.hold is not None:
+            await self.hold.wait()
+        return dict(doc) if doc else None
+
+    def find(self, query, projection=None):
+        cutoff = query["expires_at"]["$lt"]
+        docs = [{"id": doc["id"]} for doc in self.docs.values() if doc["expires_at"] < cutoff]
+        return SimpleNamespace(to_list=lambda length: asyncio.sleep(0, docs))
+
+    async def delete_one(self, query):
+        deleted = self.docs.pop(query["id"], None)
+        return SimpleNamespace(deleted_count=int(deleted is not None))
+
+    async def delete_many(self, query):
+        ids = [session_id for session_id in query["id"]["$in"] if session_id in self.docs]
+        for session_id in ids:
+            del self.docs[session_id]
+        return SimpleNamespace(deleted_count=len(ids))
+
+
+def session_doc(session_id, expires_in=timedelta(hours=1)):
+    now = datetime.utcnow()
+    return {"id": session_id, "user_id": "u1", "session_data": {}, "created_at": now,
+            "last_activity": now, "expires_at": now + expires_in}
+
+
+def make_service(*sessions):
+    sessions = FakeSessions(*sessions)
+    return AuthService(SimpleNamespace(sessions=sessions), session_cache_ttl=60), sessions
+
+
+def test_session_is_cached_after_first_read():
+    service, sessions = make_service(session_doc("s1"))
+
+    async def scenario():
+        assert (await service.get_session("s1")).id == "s1"
+        del sessions.docs["s1"]  # Served from cache from now on
+        assert (await service.get_session("s1")).id == "s1"
+
+    asyncio.run(scenario())
+
+
+def test_delete_during_cache_miss_is_not_cached():
+    service, sessions = make_service(session_doc("s1"))
+
+    async def scenario():
+        sessions.hold = asyncio.Event()
+        read = asyncio.create_task(service.get_session("s1"))
+        await asyncio.sleep(0)
+        await service.delete_session("s1")
+        sessions.hold.set()
+        await read  # Loaded before the delete landed; must not be cached
+
+        sessions.hold = None
+        assert await service.get_session("s1") is None
+
+    asyncio.run(scenario())
+
+
+def test_cleanup_invalidates_expired_sessions():
+    service, sessions = make_service(session_doc("old", timedelta(seconds=-1)), session_doc("live"))
+    invalidated = []
+    service.invalidation_bus.subscribe(invalidated.append)
+
+    async def scenario():
+        service.activity_buffer.touch("old")
+        assert await service.cleanup_expired_sessions() == 1
+        assert await service.cleanup_expired_sessions() == 0
+
+    asyncio.run(scenario())
+    assert invalidated == ["old"]
+    assert list(sessions.docs) == ["live"]
+    assert service.activity_buffer.pending_count() == 0
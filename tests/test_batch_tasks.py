@@ -0,0 +1,204 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.task_service import TaskService
+
+DOC_IDS = [f"d{i}" for i in range(1, 6)]
+
+
+@pytest.fixture
+def service(db):
+    service = TaskService(db)
+    service.checkpoint_batch_size = 1
+    return service
+
+
+async def seed(service):
+    await service.db.documents.insert_many([
+        {"id": doc_id, "user_id": "u1", "original_filename": f"{doc_id}.txt", "extracted_text": doc_id}
+        for doc_id in DOC_IDS
+    ])
+    return await service.create_task(
+        "batch_document_processing", "u1",
+        {"document_ids": DOC_IDS, "user_id": "u1", "operation": "summarize", "concurrency": 1}
+    )
+
+
+def stub_summaries(service, hang_on=None):
+    """Record summarized ids; optionally block forever on one document"""
+    calls = []
+
+    async def summarize(doc, parameters):
+        calls.append(doc["id"])
+        if doc["id"] == hang_on:
+            await asyncio.Event().wait()
+        return {"document_id": doc["id"], "summary": f"summary of {doc['id']}"}
+
+    service._summarize_document = summarize
+    return calls
+
+
+def test_batch_resumes_from_checkpoint_after_a_crash(service):
+    async def scenario():
+        task = await seed(service)
+
+        # First worker dies while working on d4
+        calls = stub_summaries(service, hang_on="d4")
+        run = asyncio.create_task(service.run_leased_task(await service.lease_next_task("w1", 30), "w1"))
+        while "d4" not in calls:
+            await asyncio.sleep(0.001)
+        run.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await run
+
+        doc = await service.db.tasks.find_one({"id": task.id})
+        assert sorted(doc["checkpoint"]["results"]) == ["d1", "d2", "d3"]
+        assert doc["progress"] == 60.0
+
+        # Its lease expires and another worker picks the batch up
+        await service.db.tasks.update_one(
+            {"id": task.id}, {"$set": {"lease_expires_at": datetime.utcnow() - timedelta(seconds=1)}}
+        )
+        calls = stub_summaries(service)
+        await service.run_leased_task(await service.lease_next_task("w2", 30), "w2")
+        assert calls == ["d4", "d5"]
+
+        status = await service.get_task_status(task.id, "u1")
+        assert status.status == "completed"
+        assert [r["document_id"] for r in status.result["results"]] == DOC_IDS
+        assert status.result["successful"] == 5
+        assert "checkpoint" not in await service.db.tasks.find_one({"id": task.id})
+
+    asyncio.run(scenario())
+
+
+def test_failed_documents_are_reported_and_not_checkpointed(service):
+    async def scenario():
+        task = await seed(service)
+        await service.db.documents.delete_one({"id": "d2"})
+        stub_summaries(service)
+
+        checkpoints = []
+        report = service._report_progress
+
+        async def spy(task, progress, extra=None):
+            checkpoints.extend(extra or {})
+            await report(task, progress, extra)
+
+        service._report_progress = spy
+        await service.run_leased_task(await service.lease_next_task("w1", 30), "w1")
+
+        status = await service.get_task_status(task.id, "u1")
+        assert status.result["successful"] == 4 and status.result["failed"] == 1
+        assert status.result["results"][1] == {"document_id": "d2", "error": "Document not found", "status": "failed"}
+        assert "checkpoint.results.d2" not in checkpoints
+
+    asyncio.run(scenario())
+
+
+def test_cancelling_a_batch_stops_every_document(service):
+    """A cancel noticed by one document must stop the others, not orphan them"""
+    DOCS = [f"c{i}" for i in range(40)]
+
+    async def scenario():
+        await service.db.documents.insert_many([
+            {"id": doc_id, "user_id": "u1", "extracted_text": doc_id} for doc_id in DOCS
+        ])
+        task = await service.create_task(
+            "batch_document_processing", "u1",
+            {"document_ids": DOCS, "user_id": "u1", "operation": "summarize", "concurrency": 4}
+        )
+        calls = []
+
+        async def summarize(doc, parameters):
+            calls.append(doc["id"])
+            await asyncio.sleep(0.005)
+            return {"document_id": doc["id"]}
+
+        service._summarize_document = summarize
+        run = asyncio.create_task(service.run_leased_task(await service.lease_next_task("w1", 30), "w1"))
+        while len(calls) < 8:
+            await asyncio.sleep(0.001)
+
+        # Cancelled from a process without a shared broker: only the database knows
+        await service.db.tasks.update_one({"id": task.id}, {"$set": {"status": "cancelled"}})
+        await run
+        processed = len(calls)
+        await asyncio.sleep(0.1)
+
+        assert len(calls) == processed < len(DOCS)
+        assert task.id not in service._aborted and task.id not in service.task_handles
+        assert (await service.db.tasks.find_one({"id": task.id}))["status"] == "cancelled"
+
+    asyncio.run(scenario())
+
+
+def test_user_cancel_stops_a_running_batch(service):
+    DOCS = [f"c{i}" for i in range(40)]
+
+    async def scenario():
+        await service.db.documents.insert_many([
+            {"id": doc_id, "user_id": "u1", "extracted_text": doc_id} for doc_id in DOCS
+        ])
+        task = await service.create_task(
+            "batch_document_processing", "u1",
+            {"document_ids": DOCS, "user_id": "u1", "operation": "summarize", "concurrency": 4}
+        )
+        calls = []
+
+        async def summarize(doc, parameters):
+            calls.append(doc["id"])
+            await asyncio.sleep(0.005)
+            return {"document_id": doc["id"]}
+
+        service._summarize_document = summarize
+        run = asyncio.create_task(service.run_leased_task(await service.lease_next_task("w1", 30), "w1"))
+        while len(calls) < 8:
+            await asyncio.sleep(0.001)
+
+        assert await service.cancel_task(task.id, "u1")
+        await run
+        processed = len(calls)
+        await asyncio.sleep(0.1)
+
+        assert len(calls) == processed < len(DOCS)
+        assert not service._aborted and not service.task_handles
+        assert (await service.get_task_status(task.id, "u1")).status == "cancelled"
+
+    asyncio.run(scenario())
+
+
+def test_failed_progress_write_stops_the_batch_before_retrying(service):
+    DOCS = [f"c{i}" for i in range(40)]
+
+    async def scenario():
+        await service.db.documents.insert_many([
+            {"id": doc_id, "user_id": "u1", "extracted_text": doc_id} for doc_id in DOCS
+        ])
+        task = await service.create_task(
+            "batch_document_processing", "u1",
+            {"document_ids": DOCS, "user_id": "u1", "operation": "summarize", "concurrency": 4}
+        )
+        calls = []
+
+        async def summarize(doc, parameters):
+            calls.append(doc["id"])
+            await asyncio.sleep(0.005)
+            return {"document_id": doc["id"]}
+
+        async def broken_report(task, progress, extra=None):
+            if len(calls) >= 8:
+                raise RuntimeError("primary stepped down")
+
+        service._summarize_document = summarize
+        service._report_progress = broken_report
+        await service.run_leased_task(await service.lease_next_task("w1", 30), "w1")
+        processed = len(calls)
+        await asyncio.sleep(0.1)
+
+        assert len(calls) == processed < len(DOCS)
+        assert (await service.db.tasks.find_one({"id": task.id}))["status"] == "pending"  # Queued for retry
+
+    asyncio.run(scenario())
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from services.llm_service import LLMService
+from services.task_service import TaskService
+
+
+@pytest.fixture
+def service(db):
+    return TaskService(db)
+
+
+def count_compares(monkeypatch, engine):
+    calls = []
+    compare = engine.compare
+
+    def spy(text_a, text_b):
+        calls.append((text_a, text_b))
+        return compare(text_a, text_b)
+
+    monkeypatch.setattr(engine, "compare", spy)
+    return calls
+
+
+def test_same_texts_are_diffed_once(service, monkeypatch):
+    calls = count_compares(monkeypatch, service.compare_engine)
+
+    async def scenario():
+        first = await service.compare_texts("alpha beta", "alpha gamma")
+        second = await service.compare_texts("alpha beta", "alpha gamma")
+        stored = await service.db.compare_results.count_documents({})
+        return first, second, stored
+
+    (first, first_cached), (second, second_cached), stored = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert not first_cached and second_cached
+    assert second == first
+    assert stored == 1
+
+
+def test_compare_task_and_stream_share_the_cache(service, monkeypatch):
+    calls = count_compares(monkeypatch, service.compare_engine)
+    docs = [
+        {"id": "d1", "original_filename": "a.txt", "extracted_text": "one two three"},
+        {"id": "d2", "original_filename": "b.txt", "extracted_text": "one two four"}
+    ]
+
+    async def scenario():
+        # The streaming route diffs through the cache and hands the result to the LLM service
+        comparison, cached = await service.compare_texts("one two three", "one two four")
+        llm = LLMService()
+        llm_calls = count_compares(monkeypatch, llm.compare_engine)
+        events = [event async for event in llm.stream_document_action(
+            "compare", "one two three", {"comparison": comparison}
+        )]
+        parameters = {"user_id": "u1", "document_ids": ["d1", "d2"], "documents": docs}
+        task, _ = await service.submit_task("document_comparison", "u1", parameters)
+        result = await service._process_document_comparison(task, parameters)
+        return cached, events[-1]["result"], result, llm_calls
+
+    cached, streamed, result, llm_calls = asyncio.run(scenario())
+    assert not cached and result["cached"]
+    assert len(calls) == 1 and llm_calls == []
+    assert streamed["details"] == {key: result[key] for key in streamed["details"]}
@@ -0,0 +1,78 @@
+from services.compare_engine import CompareEngine, describe_comparison
+
+BASE = [
+    "1. Definitions. Terms used in this agreement have the meanings set out below.",
+    "2. Payment. The customer pays all invoices within thirty days of receipt.",
+    "3. Confidentiality. Each party keeps the other party's information confidential.",
+    "4. Termination. Either party may terminate with ninety days written notice.",
+]
+
+
+def text(*passages):
+    return "\n\n".join(passages)
+
+
+def types(result):
+    return [change["type"] for change in result["changes"]]
+
+
+def test_identical_texts():
+    result = CompareEngine().compare(text(*BASE), text(*BASE))
+    assert result["similarity_score"] == 1.0
+    assert result["changes"] == []
+    assert result["summary"]["unchanged"] == 4
+
+
+def test_split_passages_on_blank_lines_and_headings():
+    engine = CompareEngine()
+    passages = engine.split_passages("Intro line\n\n1. First\ncontinued\n2. Second\nSection 3 Third")
+    assert passages == ["Intro line", "1. First\ncontinued", "2. Second", "Section 3 Third"]
+
+
+def test_modified_passage_is_diffed_word_by_word():
+    changed = BASE[1].replace("thirty", "sixty")
+    result = CompareEngine().compare(text(*BASE), text(BASE[0], changed, *BASE[2:]))
+    assert types(result) == ["modified"]
+    change = result["changes"][0]
+    assert (change["a_index"], change["b_index"]) == (1, 1)
+    assert change["diff"] == [{"op": "replace", "removed": "thirty", "added": "sixty"}]
+    assert 0.9 < result["similarity_score"] < 1.0
+
+
+def test_added_and_removed_passages():
+    added = "5. Governing law. This agreement is governed by the laws of Delaware."
+    result = CompareEngine().compare(text(*BASE), text(BASE[0], BASE[1], BASE[3], added))
+    assert types(result) == ["removed", "added"]
+    removed, new = result["changes"]
+    assert removed["a_index"] == 2 and removed["text"] == BASE[2]
+    assert new["b_index"] == 3 and new["text"] == added
+    assert result["summary"]["unchanged"] == 3
+
+
+def test_moved_passage():
+    result = CompareEngine().compare(text(*BASE), text(BASE[0], BASE[2], BASE[3], BASE[1]))
+    assert types(result) == ["moved"]
+    assert (result["changes"][0]["a_index"], result["changes"][0]["b_index"]) == (1, 3)
+    assert result["summary"]["moved"] == 1 and result["summary"]["unchanged"] == 3
+
+
+def test_block_rows_do_not_change_alignment():
+    a = [f"Clause {i}. The supplier delivers item {i} by day {i * 3}." for i in range(1, 30)]
+    b = [p.replace("delivers", "ships") for p in reversed(a)]
+    full = CompareEngine().compare(text(*a), text(*b))
+    blocked = CompareEngine(block_rows=4).compare(text(*a), text(*b))
+    assert full == blocked
+
+
+def test_changes_are_capped_but_counted():
+    a = [f"Item {i}: quantity {i} units of part {i}." for i in range(10)]
+    result = CompareEngine(max_changes=3).compare(text(*a), "")
+    assert result["summary"]["removed"] == 10
+    assert len(result["changes"]) == 3 and result["truncated"]
+
+
+def test_describe_comparison():
+    result = CompareEngine().compare(text(*BASE), text(BASE[0], BASE[2], BASE[3], BASE[1]))
+    assert describe_comparison(result) == (
+        "Documents differ in 0 modified, 0 added, 0 removed and 1 moved passages. Overall similarity: 100%"
+    )
@@ -0,0 +1,78 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from services.document_service import DocumentService
+from services.task_service import TaskService
+
+
+def document(doc_id, user_id="u1", **fields):
+    return {
+        "id": doc_id, "filename": f"{doc_id}.txt", "original_filename": f"{doc_id}.txt",
+        "file_path": f"/storage/{doc_id}.txt", "file_size": 10, "file_type": "txt",
+        "mime_type": "text/plain", "category": "general", "user_id": user_id,
+        "created_at": datetime(2026, 1, 1), "extracted_text": f"text of {doc_id}",
+        "embedding": [0.1, 0.2], **fields
+    }
+
+
+@pytest.fixture
+def documents(db, tmp_path):
+    asyncio.run(db.documents.insert_many([
+        document("d1"), document("d2"), document("d3"), document("theirs", user_id="u2")
+    ]))
+    return DocumentService(db, str(tmp_path))
+
+
+def test_returns_requested_order_once_each(documents):
+    found = asyncio.run(documents.get_documents_by_ids(["d3", "d1", "d3", "missing", "theirs"], "u1"))
+    assert [doc.id for doc in found] == ["d3", "d1"]
+
+
+def test_never_loads_embeddings_and_text_only_on_request(documents):
+    without = asyncio.run(documents.get_documents_by_ids(["d1"], "u1"))
+    with_text = asyncio.run(documents.get_documents_by_ids(["d1"], "u1", include_text=True))
+    assert without[0].extracted_text is None and without[0].embedding is None
+    assert with_text[0].extracted_text == "text of d1" and with_text[0].embedding is None
+
+
+def test_empty_request_skips_the_query(documents):
+    assert asyncio.run(documents.get_documents_by_ids([], "u1")) == []
+
+
+def test_tasks_use_snapshots_and_fetch_only_what_is_missing(db, monkeypatch):
+    service = TaskService(db)
+    queries = []
+    collection = type(db.documents)
+    find = collection.find
+
+    def spy(self, query=None, *args, **kwargs):
+        queries.append(query)
+        return find(self, query, *args, **kwargs)
+
+    async def scenario():
+        await db.documents.insert_many([document("d1"), document("d2")])
+        monkeypatch.setattr(collection, "find", spy)
+        parameters = {
+            "user_id": "u1", "document_ids": ["d2", "d1"],
+            "documents": [{"id": "d1", "original_filename": "d1.txt", "extracted_text": "snapshot text"}]
+        }
+        return await service._load_documents(parameters)
+
+    docs = asyncio.run(scenario())
+    assert [doc["id"] for doc in docs] == ["d2", "d1"]
+    assert docs[1]["extracted_text"] == "snapshot text"
+    assert "embedding" not in docs[0]
+    assert queries == [{"id": {"$in": ["d2"]}, "user_id": "u1"}]
+
+
+def test_tasks_reject_missing_documents(db):
+    service = TaskService(db)
+
+    async def scenario():
+        await db.documents.insert_one(document("d1"))
+        await service._load_documents({"user_id": "u1", "document_ids": ["d1", "gone"]})
+
+    with pytest.raises(ValueError, match="Some documents not found"):
+        asyncio.run(scenario())
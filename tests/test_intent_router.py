@@ -0,0 +1,105 @@
+import asyncio
+
+from services.intent_router import IntentClassifier, IntentRouter
+from services.llm_service import LLMService
+
+
+class RecordingLLM(LLMService):
+    """LLM stub that records which commands reached the slow tier"""
+
+    def __init__(self):
+        super().__init__()
+        self.commands = []
+
+    async def process_voice_command(self, command, context=None):
+        self.commands.append(command)
+        return {"intent": "general_query", "parameters": {"query": command},
+                "response": "llm answer", "confidence": 0.6}
+
+
+def make_router():
+    router = IntentRouter(None, RecordingLLM())
+    router._trained = True  # No activity log to train from
+    return router
+
+
+def route(router, command):
+    return asyncio.run(router.route(command))
+
+
+def test_classifier_reports_similarity_and_margin():
+    classifier = IntentClassifier()
+    classifier.add_example("merge the invoices", "merge_documents")
+    classifier.add_example("summarize hr files", "summarize_documents")
+
+    intent, similarity, margin = classifier.classify("merge invoices")
+    assert intent == "merge_documents"
+    assert 0 < margin <= similarity <= 1
+
+
+def test_classifier_keys_classes_on_intent_only():
+    classifier = IntentClassifier()
+    classifier.add_example("find the contract for ACME", "search_documents")
+    classifier.add_example("find the invoice for Globex", "search_documents")
+    assert classifier.size() == 1
+
+
+def test_local_route_does_not_replay_parameters_of_learned_example():
+    router = make_router()
+    for command in ("find the contract for ACME from march",
+                    "find the contract for Initech from april",
+                    "find the contract for Umbrella from may"):
+        router.classifier.add_example(command, "search_documents")
+
+    result = route(router, "find the contract for Globex from march")
+
+    assert result["tier"] == "local"
+    assert result["intent"] == "search_documents"
+    assert result["parameters"] == {"query": "contract Globex march", "category": "contracts"}
+    assert "ACME" not in result["response"]
+    assert "Globex" in result["response"]
+    assert router.llm_service.commands == []
+
+
+def test_command_without_extractable_parameters_goes_to_llm():
+    router = make_router()
+    router.classifier.add_example("merge the documents", "merge_documents")
+
+    result = route(router, "merge the documents")
+
+    assert result["tier"] == "llm"
+    assert router.llm_service.commands == ["merge the documents"]
+
+
+def test_category_is_taken_from_the_command():
+    router = make_router()
+    result = route(router, "merge invoices")
+    assert result["tier"] == "local"
+    assert result["parameters"] == {"category": "invoices", "action": "merge"}
+
+
+def test_extract_parameters_matches_whole_words():
+    # "three" contains "hr" but is not the HR category
+    assert IntentRouter.extract_parameters("summarize_documents", "summarize three reports") is None
+    assert IntentRouter.extract_parameters("summarize_documents", "summarize employee reports") == {
+        "category": "hr", "action": "summarize"
+    }
+
+
+def test_concurrent_first_requests_train_once():
+    router = IntentRouter(None, RecordingLLM())
+    runs = []
+
+    async def train():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        router._trained = True
+        return 0
+
+    router.train_from_activities = train
+
+    async def scenario():
+        await asyncio.gather(*(router.route("merge the invoices") for _ in range(5)))
+
+    asyncio.run(scenario())
+    assert len(runs) == 1
@@ -0,0 +1,107 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+from services.janitor import Janitor
+
+NOW = datetime.utcnow()
+
+
+def activity(n, days_old):
+    return {"_id": n, "user_id": "u1", "created_at": NOW - timedelta(days=days_old)}
+
+
+@pytest.fixture
+def janitor(db):
+    return Janitor(db, batch_size=2, batch_pause=0, activity_retention_days=30, archive_activities=True)
+
+
+def test_archives_then_deletes_expired_activities(janitor, db):
+    async def scenario():
+        await db.activities.insert_many([activity(n, 40 + n) for n in range(5)] + [activity(9, 1)])
+        result = await janitor.run_once()
+        assert result["activities"] == 5
+        assert sorted(doc["_id"] for doc in await db.activities_archive.find().to_list(None)) == [0, 1, 2, 3, 4]
+        assert [doc["_id"] for doc in await db.activities.find().to_list(None)] == [9]
+
+    asyncio.run(scenario())
+    assert janitor.stats["activities_archived"] == 5
+
+
+def test_already_archived_activities_are_not_counted_again(janitor, db):
+    async def scenario():
+        await db.activities.insert_many([activity(n, 40) for n in range(3)])
+        await db.activities_archive.insert_one(activity(0, 40))  # From an interrupted run
+        await janitor.run_once()
+        assert await db.activities.count_documents({}) == 0
+        assert await db.activities_archive.count_documents({}) == 3
+
+    asyncio.run(scenario())
+    assert janitor.stats["activities_archived"] == 2
+
+
+class FailingArchive:
+    async def insert_many(self, documents, ordered=True):
+        raise BulkWriteError({"writeErrors": [{"index": 0, "code": 121, "errmsg": "Document failed validation"}],
+                              "nInserted": len(documents) - 1})
+
+
+def test_archive_failure_keeps_the_activities(janitor, db):
+    async def scenario():
+        await db.activities.insert_many([activity(n, 40) for n in range(3)])
+        with pytest.raises(BulkWriteError):
+            await janitor._delete_in_batches(db.activities, {}, "created_at", archive=FailingArchive())
+        assert await db.activities.count_documents({}) == 3
+
+    asyncio.run(scenario())
+    assert janitor.stats["activities_archived"] == 0
+
+
+def test_batches_walk_the_filtered_field_in_order(janitor, db):
+    sorts = []
+
+    class Recording:
+        def __init__(self, collection):
+            self.collection = collection
+
+        def find(self, query, projection=None):
+            cursor = self.collection.find(query, projection)
+            sort = cursor.sort
+
+            def record(field, direction):
+                sorts.append(field)
+                return sort(field, direction)
+
+            cursor.sort = record
+            return cursor
+
+        def __getattr__(self, name):
+            return getattr(self.collection, name)
+
+    async def scenario():
+        await db.sessions.insert_many([{"_id": n, "expires_at": NOW - timedelta(minutes=n + 1)} for n in range(3)])
+        return await janitor._delete_in_batches(Recording(db.sessions), {"expires_at": {"$lt": NOW}}, "expires_at")
+
+    assert asyncio.run(scenario()) == 3
+    assert sorts and set(sorts) == {"expires_at"}
+
+
+def test_legacy_finished_tasks_and_expired_sessions_are_removed(janitor, db):
+    async def scenario():
+        old = NOW - timedelta(days=30)
+        await db.tasks.insert_many([
+            {"id": "legacy", "status": "completed", "updated_at": old},
+            {"id": "ttl", "status": "completed", "updated_at": old, "expires_at": NOW + timedelta(days=1)},
+            {"id": "running", "status": "processing", "updated_at": old},
+        ])
+        await db.sessions.insert_many([
+            {"id": "gone", "expires_at": NOW - timedelta(seconds=1)},
+            {"id": "live", "expires_at": NOW + timedelta(hours=1)},
+        ])
+        result = await janitor.run_once()
+        assert result["tasks"] == 1 and result["sessions"] == 1
+        assert sorted(doc["id"] for doc in await db.tasks.find().to_list(None)) == ["running", "ttl"]
+
+    asyncio.run(scenario())
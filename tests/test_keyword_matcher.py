@@ -0,0 +1,40 @@
+import pytest
+
+from utils.keyword_matcher import KeywordMatcher
+
+
+def test_finds_all_labels_in_one_pass():
+    matcher = KeywordMatcher({"contract": ["contracts"], "invoice": ["invoices"], "hr": ["hr"]})
+    assert matcher.find_labels("Signed CONTRACT and the Invoice") == {"contracts", "invoices"}
+
+
+def test_matches_like_substring_containment():
+    matcher = KeywordMatcher({"he": ["he"], "she": ["she"], "hers": ["hers"], "his": ["his"]})
+    text = "ushers"
+    expected = {kw for kw in ("he", "she", "hers", "his") if kw in text}
+    assert matcher.find_labels(text) == expected
+
+
+def test_overlapping_keywords_share_failure_links():
+    matcher = KeywordMatcher()
+    matcher.add("abcd", "long")
+    matcher.add("bc", "inner")
+    assert matcher.find_labels("xabcx") == {"inner"}
+    assert matcher.find_labels("abcd") == {"long", "inner"}
+
+
+def test_scans_several_texts_and_skips_empty():
+    matcher = KeywordMatcher({"urgent": ["urgent"], "draft": ["draft"]})
+    assert matcher.find_labels("urgent_note.pdf", None, "", "first draft") == {"urgent", "draft"}
+
+
+def test_adding_keywords_after_a_scan_recompiles():
+    matcher = KeywordMatcher({"policy": ["compliance"]})
+    assert matcher.find_labels("new hire") == set()
+    matcher.add("hire", "hr")
+    assert matcher.find_labels("new hire policy") == {"hr", "compliance"}
+
+
+def test_rejects_empty_keyword():
+    with pytest.raises(ValueError):
+        KeywordMatcher().add("", "label")
@@ -0,0 +1,61 @@
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from utils.range_response import range_file_response
+
+DATA = bytes(range(256)) * 4
+
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / "audio.wav"
+    path.write_bytes(DATA)
+    app = FastAPI()
+
+    @app.get("/file")
+    async def serve(request: Request):
+        return range_file_response(request, path, "audio/wav", etag="abc")
+
+    return TestClient(app)
+
+
+def get(client, **headers):
+    return client.get("/file", headers=headers)
+
+
+def test_full_response(client):
+    response = get(client)
+    assert response.status_code == 200
+    assert response.content == DATA
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["etag"] == '"abc"'
+
+
+@pytest.mark.parametrize("header, start, end", [
+    ("bytes=0-99", 0, 99),
+    ("bytes=1000-", 1000, 1023),
+    ("bytes=1000-5000", 1000, 1023),
+    ("bytes=-24", 1000, 1023),
+    ("bytes=-5000", 0, 1023),
+    (" bytes=5-5 ", 5, 5),
+])
+def test_partial_content(client, header, start, end):
+    response = get(client, range=header)
+    assert response.status_code == 206
+    assert response.content == DATA[start:end + 1]
+    assert response.headers["content-range"] == f"bytes {start}-{end}/{len(DATA)}"
+    assert response.headers["content-length"] == str(end - start + 1)
+
+
+@pytest.mark.parametrize("header", ["bytes=1024-", "bytes=10-5", "bytes=-", "items=0-5", "bytes=0-1,5-6"])
+def test_unsatisfiable_ranges(client, header):
+    response = get(client, range=header)
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(DATA)}"
+
+
+def test_matching_etag_is_not_modified(client):
+    response = get(client, **{"if-none-match": '"abc"'})
+    assert response.status_code == 304
+    assert response.content == b""
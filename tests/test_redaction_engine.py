@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from services.redaction_engine import RedactionEngine, describe_redactions, redact_text
+
+
+@pytest.mark.parametrize("text, kind", [
+    ("Contact jane.doe+hr@example.co.uk today", "email"),
+    ("SSN 123-45-6789 on file", "ssn"),
+    ("SSN 123 45 6789 on file", "ssn"),
+    ("Call (555) 123-4567", "phone"),
+    ("Call +1 555.123.4567", "phone"),
+    ("Call 555-123-4567", "phone"),
+    ("Ship to 742 Evergreen Terrace, Springfield, IL 62704", "address"),
+    ("Office at 1600 Pennsylvania Ave NW, Suite 200", "address"),
+])
+def test_detects_each_kind(text, kind):
+    redacted, counts = redact_text(text)
+    assert f"[REDACTED:{kind.upper()}]" in redacted
+    assert counts[kind] == 1
+    assert sum(counts.values()) == 1
+
+
+@pytest.mark.parametrize("text", [
+    "Invalid SSNs 000-12-3456, 666-12-3456, 900-12-3456, 123-00-4567 and 123-45-0000",
+    "Mixed separators 123-45 6789",
+    "Invoice 12345678901 and order 2024-01-15",
+    "Part no. AB555-123-4567 is not a phone",
+    "We have 3 documents and 12 pages",
+    "no-at-sign.example.com",
+])
+def test_ignores_lookalikes(text):
+    redacted, counts = redact_text(text)
+    assert redacted == text
+    assert not any(counts.values())
+
+
+def test_ssn_wins_over_phone():
+    redacted, counts = redact_text("ID 123-45-6789")
+    assert redacted == "ID [REDACTED:SSN]"
+    assert counts["phone"] == 0
+
+
+def test_redacts_everything_in_one_pass():
+    text = "a@b.io, b@c.io, 555-123-4567 and 078-05-1120"
+    redacted, counts = redact_text(text)
+    assert redacted == "[REDACTED:EMAIL], [REDACTED:EMAIL], [REDACTED:PHONE] and [REDACTED:SSN]"
+    assert counts == {"email": 2, "ssn": 1, "phone": 1, "address": 0}
+
+
+def test_handles_empty_text():
+    assert redact_text(None) == ("", {"email": 0, "ssn": 0, "phone": 0, "address": 0})
+
+
+def test_describe_redactions():
+    assert describe_redactions({"ssn": 1, "email": 2, "phone": 0, "address": 0}) == "Redacted 1 SSN, 2 email addresses."
+    assert describe_redactions({"ssn": 0}) == "No sensitive information found."
+
+
+def test_engine_keeps_order_across_batches():
+    texts = [f"row {i}: user{i}@example.com" for i in range(20)]
+    engine = RedactionEngine(max_workers=2, batch_bytes=100, inline_bytes=0)
+    try:
+        result = asyncio.run(engine.redact(texts))
+    finally:
+        engine.shutdown()
+    assert result["texts"] == [f"row {i}: [REDACTED:EMAIL]" for i in range(20)]
+    assert result["bytes_scanned"] == sum(len(text) for text in texts)
@@ -0,0 +1,83 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from services.session_activity_buffer import SessionActivityBuffer
+
+T0 = datetime(2026, 1, 1, 12, 0, 0)
+
+
+class FakeSessions:
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+
+    async def bulk_write(self, operations, ordered=True):
+        await asyncio.sleep(0)
+        if self.fail:
+            raise RuntimeError("primary unavailable")
+        self.calls.append(([(op._filter["id"], op._doc["$max"]["last_activity"]) for op in operations], ordered))
+
+
+def make_buffer(fail=False):
+    sessions = FakeSessions(fail)
+    return SessionActivityBuffer(SimpleNamespace(sessions=sessions), flush_interval=0.01), sessions
+
+
+def test_touches_coalesce_to_latest_timestamp():
+    buffer, sessions = make_buffer()
+    buffer.touch("s1", T0)
+    buffer.touch("s1", T0 + timedelta(seconds=5))
+    buffer.touch("s1", T0 + timedelta(seconds=2))  # Out of order; ignored
+    buffer.touch("s2", T0)
+    assert buffer.pending_count() == 2
+
+    assert asyncio.run(buffer.flush()) == 2
+    assert sessions.calls == [([("s1", T0 + timedelta(seconds=5)), ("s2", T0)], False)]
+    assert buffer.pending_count() == 0 and buffer.flushed_updates == 2
+
+
+def test_empty_flush_writes_nothing():
+    buffer, sessions = make_buffer()
+    assert asyncio.run(buffer.flush()) == 0
+    assert sessions.calls == []
+
+
+def test_discard_drops_pending_activity():
+    buffer, sessions = make_buffer()
+    buffer.touch("s1", T0)
+    buffer.discard("s1")
+    assert asyncio.run(buffer.flush()) == 0
+
+
+def test_failed_flush_requeues_without_overwriting_newer_touches():
+    buffer, sessions = make_buffer(fail=True)
+    buffer.touch("s1", T0)
+
+    async def scenario():
+        flush = asyncio.create_task(buffer.flush())
+        await asyncio.sleep(0)
+        assert buffer.pending_count() == 0
+        buffer.touch("s1", T0 + timedelta(seconds=9))  # Arrives while the write is in flight
+        assert await flush == 0
+
+    asyncio.run(scenario())
+    assert buffer._pending == {"s1": T0 + timedelta(seconds=9)}
+    sessions.fail = False
+    assert asyncio.run(buffer.flush()) == 1
+
+
+def test_periodic_flush_and_final_flush_on_stop():
+    buffer, sessions = make_buffer()
+
+    async def scenario():
+        await buffer.start()
+        buffer.touch("s1", T0)
+        await asyncio.sleep(0.05)
+        assert sessions.calls  # Flushed by the loop
+        buffer.touch("s2", T0)
+        buffer.flush_interval = 60
+        await buffer.stop()
+
+    asyncio.run(scenario())
+    assert sessions.calls[-1][0] == [("s2", T0)]
@@ -0,0 +1,66 @@
+import io
+import warnings
+
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore", DeprecationWarning)
+    from PyPDF2 import PdfReader
+
+from utils.streaming_pdf import StreamingPdfWriter
+
+
+def text_pdf(*pages):
+    buffer = io.BytesIO()
+    writer = StreamingPdfWriter(buffer)
+    for lines in pages:
+        writer.add_text_page(lines)
+    writer.close()
+    buffer.seek(0)
+    return buffer
+
+
+def test_text_pages_are_readable():
+    reader = PdfReader(text_pdf(["First page", "(with parens) and \\ slash"], ["Second page"]))
+    assert len(reader.pages) == 2
+    assert "First page" in reader.pages[0].extract_text()
+    assert "(with parens) and \\ slash" in reader.pages[0].extract_text()
+    assert "Second page" in reader.pages[1].extract_text()
+
+
+def test_xref_offsets_point_at_objects():
+    data = text_pdf(["Only page"]).getvalue()
+    xref = data[data.rindex(b"startxref") + len(b"startxref"):].split()[0]
+    table = data[int(xref):].split(b"\n")
+    size = int(table[1].split()[1])
+    for number, entry in enumerate(table[2:2 + size]):
+        offset, _, kind = entry.split()
+        if kind == b"n":
+            assert data[int(offset):].startswith(b"%d 0 obj" % number)
+
+
+def test_copies_pages_from_several_inputs():
+    first = PdfReader(text_pdf(["Alpha one"], ["Alpha two"]))
+    second = PdfReader(text_pdf(["Beta one"]))
+
+    buffer = io.BytesIO()
+    writer = StreamingPdfWriter(buffer)
+    progress = []
+    writer.copy_pages(first.pages, on_page=progress.append)
+    writer.copy_pages(second.pages)
+    writer.add_text_page(["Appendix"])
+    writer.close()
+    buffer.seek(0)
+
+    assert progress == [1, 2]
+    assert writer.page_count == 4
+    merged = PdfReader(buffer)
+    texts = [page.extract_text() for page in merged.pages]
+    assert [text.strip() for text in texts] == ["Alpha one", "Alpha two", "Beta one", "Appendix"]
+
+
+def test_shared_resources_are_copied_once():
+    source = PdfReader(text_pdf(["One"], ["Two"], ["Three"]))
+    buffer = io.BytesIO()
+    writer = StreamingPdfWriter(buffer)
+    writer.copy_pages(source.pages)
+    writer.close()
+    assert buffer.getvalue().count(b"/BaseFont /Courier") == 1
@@ -0,0 +1,90 @@
+import asyncio
+import io
+import json
+import zipfile
+from datetime import datetime
+
+from models.document import DocumentMetadata
+from services.document_service import DocumentService
+from utils.streaming_zip import StreamingZipWriter
+
+
+def test_entries_round_trip_through_zipfile():
+    writer = StreamingZipWriter()
+    chunks = []
+    writer.write_entry("notes/a.txt", b"hello " * 1000)
+    chunks.append(writer.drain())
+    with writer.open_entry("scan.pdf", 5, compress=False, date_time=(1999, 12, 31, 23, 59, 58)) as entry:
+        entry.write(b"%PDF-")
+    chunks.append(writer.drain())
+    chunks.append(writer.close())
+
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+    assert archive.testzip() is None
+    assert archive.namelist() == ["notes/a.txt", "scan.pdf"]
+    assert archive.read("notes/a.txt") == b"hello " * 1000
+    assert archive.getinfo("notes/a.txt").compress_type == zipfile.ZIP_DEFLATED
+    assert archive.getinfo("scan.pdf").compress_type == zipfile.ZIP_STORED
+    assert archive.getinfo("scan.pdf").date_time == (1999, 12, 31, 23, 59, 58)
+
+
+def test_drain_hands_over_bytes_once():
+    writer = StreamingZipWriter()
+    writer.write_entry("a.txt", b"abc")
+    first = writer.drain()
+    assert first and writer.drain() == b""
+    assert zipfile.ZipFile(io.BytesIO(first + writer.close())).read("a.txt") == b"abc"
+
+
+def make_document(tmp_path, name, category, data=None, file_type="txt"):
+    path = tmp_path / name
+    if data is not None:
+        path.write_bytes(data)
+    return DocumentMetadata(
+        filename=name, original_filename=name, file_path=str(path), file_size=len(data or b""),
+        file_type=file_type, mime_type="text/plain", category=category, user_id="u1",
+        created_at=datetime(1975, 1, 1)
+    )
+
+
+def export(service, documents, include_manifest=True):
+    async def source():
+        for document in documents:
+            yield document
+
+    async def collect():
+        return b"".join([chunk async for chunk in service.export_archive(source(), include_manifest)])
+
+    return zipfile.ZipFile(io.BytesIO(asyncio.run(collect())))
+
+
+def test_export_archive_with_manifest(tmp_path):
+    service = DocumentService(None, str(tmp_path / "storage"))
+    big = bytes(range(256)) * 4096
+    documents = [
+        make_document(tmp_path, "report.txt", "contracts", b"first"),
+        make_document(tmp_path, "big.pdf", "contracts", big, file_type="pdf"),
+        make_document(tmp_path, "gone.txt", "invoices"),
+    ]
+    (tmp_path / "dup").mkdir()
+    documents.append(make_document(tmp_path / "dup", "report.txt", "contracts", b"second"))
+
+    archive = export(service, documents)
+    assert archive.namelist() == [
+        "contracts/report.txt", "contracts/big.pdf", "contracts/report (2).txt", "manifest.json"
+    ]
+    assert archive.read("contracts/report.txt") == b"first"
+    assert archive.read("contracts/report (2).txt") == b"second"
+    assert archive.read("contracts/big.pdf") == big
+    assert archive.getinfo("contracts/big.pdf").compress_type == zipfile.ZIP_STORED
+    assert archive.getinfo("contracts/report.txt").date_time == (1980, 1, 1, 0, 0, 0)
+
+    manifest = json.loads(archive.read("manifest.json"))
+    assert [entry["path"] for entry in manifest["documents"]] == archive.namelist()[:3]
+    assert [entry["original_filename"] for entry in manifest["missing"]] == ["gone.txt"]
+
+
+def test_export_archive_without_manifest(tmp_path):
+    service = DocumentService(None, str(tmp_path / "storage"))
+    archive = export(service, [make_document(tmp_path, "a.txt", "general", b"a")], include_manifest=False)
+    assert archive.namelist() == ["general/a.txt"]
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from services.task_service import TaskService
+
+
+def snapshot(doc_id, text, **fields):
+    return {"id": doc_id, "original_filename": f"{doc_id}.txt", "extracted_text": text, **fields}
+
+
+def params(*documents):
+    return {"user_id": "u1", "action": "summarize", "document_ids": [doc["id"] for doc in documents],
+            "documents": list(documents)}
+
+
+@pytest.fixture
+def service(db):
+    return TaskService(db)
+
+
+def test_identical_submissions_share_a_task(service):
+    async def scenario():
+        first, created = await service.submit_task("document_summarization", "u1", params(snapshot("d1", "text")))
+        second, again = await service.submit_task("document_summarization", "u1", params(snapshot("d1", "text")))
+        return first, created, second, again
+
+    first, created, second, again = asyncio.run(scenario())
+    assert created and not again
+    assert second.id == first.id
+
+
+def test_changed_document_text_is_a_new_submission(service):
+    key = service._dedup_key("document_summarization", "u1", params(snapshot("d1", "old text")))
+    assert key != service._dedup_key("document_summarization", "u1", params(snapshot("d1", "new text")))
+    assert key != service._dedup_key("document_summarization", "u2", params(snapshot("d1", "old text")))
+    assert key == service._dedup_key("document_summarization", "u1", params(snapshot("d1", "old text")))
+
+
+def test_key_is_built_from_content_hashes_not_text(service, monkeypatch):
+    text = "confidential " * 100000
+    sources = []
+    real_dumps = __import__("json").dumps
+
+    def spy(obj, *args, **kwargs):
+        result = real_dumps(obj, *args, **kwargs)
+        sources.append(result)
+        return result
+
+    monkeypatch.setattr("services.task_service.json.dumps", spy)
+    service._dedup_key("document_summarization", "u1", params(snapshot("d1", text)))
+    assert sources and all(len(source) < 1000 for source in sources)
+
+
+def test_duplicate_lookup_skips_parameters(service, db, monkeypatch):
+    lookups = []
+    collection = type(db.tasks)
+    find_one = collection.find_one
+
+    async def spy(self, *args, **kwargs):
+        lookups.append(args[1] if len(args) > 1 else kwargs.get("projection"))
+        return await find_one(self, *args, **kwargs)
+
+    async def scenario():
+        await service.submit_task("document_summarization", "u1", params(snapshot("d1", "text")))
+        monkeypatch.setattr(collection, "find_one", spy)
+        return await service.submit_task("document_summarization", "u1", params(snapshot("d1", "text")))
+
+    task, created = asyncio.run(scenario())
+    assert not created and task.status == "pending"
+    assert lookups and all(
+        projection and projection["parameters"] == 0 and projection["checkpoint"] == 0 for projection in lookups
+    )
+
+
+def test_idempotency_key_replays_regardless_of_parameters(service):
+    async def scenario():
+        first, _ = await service.submit_task("document_merge", "u1", {"a": 1}, idempotency_key="k1")
+        second, created = await service.submit_task("document_merge", "u1", {"a": 2}, idempotency_key="k1")
+        return first, second, created
+
+    first, second, created = asyncio.run(scenario())
+    assert second.id == first.id and not created
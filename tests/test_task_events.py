@@ -0,0 +1,71 @@
+import asyncio
+import json
+
+from services.message_bus import LocalMessageBus
+from services.task_events import TaskEventBus
+
+
+def deliver(bus, origin, event_id, event="progress", task_id="t1"):
+    bus._on_message(json.dumps({"id": event_id, "origin": origin, "task_id": task_id,
+                                "event": event, "data": {}}))
+
+
+def history(bus, task_id="t1"):
+    return [(event["origin"], event["id"]) for event in bus._history.get(task_id, ())]
+
+
+def test_duplicate_deliveries_are_dropped():
+    bus = TaskEventBus()
+    deliver(bus, "a", 10)
+    deliver(bus, "a", 10)
+    deliver(bus, "a", 9)
+    assert history(bus) == [("a", 10)]
+
+
+def test_events_from_a_worker_with_a_slower_clock_are_kept():
+    bus = TaskEventBus()
+    deliver(bus, "a", 1000)
+    deliver(bus, "b", 500)
+    deliver(bus, "a", 1001)
+    deliver(bus, "b", 501)
+    assert history(bus) == [("a", 1000), ("b", 500), ("a", 1001), ("b", 501)]
+
+
+def test_workers_sharing_a_broker_see_each_others_events():
+    broker = LocalMessageBus()
+    first, second = TaskEventBus(broker), TaskEventBus(broker)
+
+    async def scenario():
+        await first.publish("t1", "progress", {"progress": 10})
+        await second.publish("t1", "progress", {"progress": 20})
+
+    asyncio.run(scenario())
+    assert [event["data"]["progress"] for event in first._history["t1"]] == [10, 20]
+    assert list(first._history["t1"]) == list(second._history["t1"])
+
+
+def test_resume_replays_everything_after_the_last_seen_event():
+    bus = TaskEventBus()
+    deliver(bus, "a", 1000)
+    deliver(bus, "b", 500)
+    deliver(bus, "a", 1001, "result")
+
+    _, replay = bus.subscribe("t1", last_event_id=1000)
+    assert [(event["origin"], event["id"]) for event in replay] == [("b", 500), ("a", 1001)]
+
+    _, replay = bus.subscribe("t1", last_event_id=999)  # Not in history: fall back to ids
+    assert [event["id"] for event in replay] == [1000, 1001]
+
+
+def test_subscribers_and_listeners_receive_events():
+    bus = TaskEventBus()
+    heard = []
+    bus.add_listener(heard.append)
+
+    async def scenario():
+        queue, _ = bus.subscribe("t1")
+        await bus.publish("t1", "cancelled", {})
+        return queue.get_nowait()
+
+    event = asyncio.run(scenario())
+    assert event["event"] == "cancelled" and heard == [event]
@@ -0,0 +1,57 @@
+from types import SimpleNamespace
+
+import pytest
+
+from services.task_pipeline import PIPELINE_TEMPLATES, PipelineRunner
+
+
+@pytest.fixture
+def runner():
+    return PipelineRunner(SimpleNamespace(db=None, llm_service=None), max_nodes=5)
+
+
+@pytest.mark.parametrize("template", sorted(PIPELINE_TEMPLATES))
+def test_templates_are_valid_dags(runner, template):
+    nodes = runner.resolve_nodes(template)
+    order = runner._topological_order(nodes)
+    position = {node_id: index for index, node_id in enumerate(order)}
+    for node in nodes:
+        assert all(position[dep] < position[node["id"]] for dep in node["inputs"])
+
+
+def test_fills_in_defaults(runner):
+    nodes = runner.resolve_nodes(nodes=[{"id": "s", "op": "summarize"}])
+    assert nodes == [{"id": "s", "op": "summarize", "inputs": [], "params": {}}]
+
+
+def test_rejects_cycles(runner):
+    nodes = [
+        {"id": "a", "op": "summarize", "inputs": ["c"]},
+        {"id": "b", "op": "analyze", "inputs": ["a"]},
+        {"id": "c", "op": "translate", "inputs": ["b"]},
+    ]
+    with pytest.raises(ValueError, match="cycle"):
+        runner.resolve_nodes(nodes=nodes)
+
+
+def test_rejects_self_dependency(runner):
+    with pytest.raises(ValueError, match="cycle"):
+        runner.resolve_nodes(nodes=[{"id": "a", "op": "summarize", "inputs": ["a"]}])
+
+
+@pytest.mark.parametrize("nodes, message", [
+    ([], "no nodes"),
+    ([{"id": f"n{i}", "op": "extract"} for i in range(6)], "exceeds 5 nodes"),
+    ([{"id": "a b", "op": "extract"}], "Invalid pipeline node id"),
+    ([{"id": "a", "op": "delete"}], "Unknown pipeline operation"),
+    ([{"id": "a", "op": "extract"}, {"id": "a", "op": "summarize"}], "unique"),
+    ([{"id": "a", "op": "summarize", "inputs": ["missing"]}], "unknown nodes"),
+])
+def test_rejects_invalid_graphs(runner, nodes, message):
+    with pytest.raises(ValueError, match=message):
+        runner.resolve_nodes(nodes=nodes)
+
+
+def test_rejects_unknown_template(runner):
+    with pytest.raises(ValueError, match="Unknown pipeline template"):
+        runner.resolve_nodes("nonexistent")
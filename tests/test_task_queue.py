@@ -0,0 +1,176 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.task_service import TaskService
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture
+def service(db):
+    return TaskService(db, max_attempts=2)
+
+
+async def fetch(service, task_id):
+    return await service.db.tasks.find_one({"id": task_id})
+
+
+def test_lease_marks_task_processing_and_counts_attempts(service):
+    async def scenario():
+        task = await service.create_task("document_merge", "u1")
+        leased = await service.lease_next_task("w1", 30)
+        assert leased["id"] == task.id
+        assert leased["status"] == "processing" and leased["lease_owner"] == "w1"
+        assert leased["attempts"] == 1
+        assert await service.lease_next_task("w2", 30) is None  # Held by w1
+
+    run(scenario())
+
+
+def test_future_tasks_are_not_leased(service):
+    async def scenario():
+        task = await service.create_task("document_merge", "u1")
+        await service.db.tasks.update_one(
+            {"id": task.id}, {"$set": {"available_at": datetime.utcnow() + timedelta(minutes=1)}}
+        )
+        assert await service.lease_next_task("w1", 30) is None
+
+    run(scenario())
+
+
+def test_expired_lease_is_taken_over(service):
+    async def scenario():
+        task = await service.create_task("document_merge", "u1")
+        await service.lease_next_task("w1", 30)
+        await service.db.tasks.update_one(
+            {"id": task.id}, {"$set": {"lease_expires_at": datetime.utcnow() - timedelta(seconds=1)}}
+        )
+        leased = await service.lease_next_task("w2", 30)
+        assert leased["lease_owner"] == "w2" and leased["attempts"] == 2
+
+        # The old owner can no longer extend or finish it
+        assert not await service.extend_lease(task.id, "w1", 30)
+        assert await service.extend_lease(task.id, "w2", 30)
+
+    run(scenario())
+
+
+def test_failed_run_is_retried_with_backoff(service):
+    async def boom(task, parameters):
+        raise RuntimeError("flaky")
+
+    service._execute_task = boom
+
+    async def scenario():
+        task = await service.create_task("document_merge", "u1")
+        # Mongo keeps datetimes at millisecond precision
+        now = datetime.utcnow()
+        before = now.replace(microsecond=now.microsecond // 1000 * 1000)
+        await service.run_leased_task(await service.lease_next_task("w1", 30), "w1")
+
+        doc = await fetch(service, task.id)
+        assert doc["status"] == "pending" and doc["error"] == "flaky"
+        assert doc["lease_owner"] is None
+        assert doc["available_at"] >= before + timedelta(seconds=2)
+
+        # Once due again, the last allowed attempt fails for good
+        await service.db.tasks.update_one({"id": task.id}, {"$set": {"available_at": datetime.utcnow()}})
+        await service.run_leased_task(await service.lease_next_task("w1", 30), "w1")
+        doc = await fetch(service, task.id)
+        assert doc["status"] == "failed" and doc["error"] == "flaky"
+        assert "expires_at" in doc and "active_dedup_key" not in doc
+
+    run(scenario())
+
+
+def test_invalid_input_fails_without_retry(service):
+    async def invalid(task, parameters):
+        raise ValueError("Missing document_ids or user_id")
+
+    service._execute_task = invalid
+
+    async def scenario():
+        task = await service.create_task("document_merge", "u1")
+        await service.run_leased_task(await service.lease_next_task("w1", 30), "w1")
+        doc = await fetch(service, task.id)
+        assert doc["status"] == "failed" and doc["attempts"] == 1
+
+    run(scenario())
+
+
+def test_task_past_max_attempts_is_abandoned(service):
+    executed = []
+
+    async def record(task, parameters):
+        executed.append(task.id)
+        return {}
+
+    service._execute_task = record
+
+    async def scenario():
+        task = await service.create_task("document_merge", "u1")
+        await service.db.tasks.update_one({"id": task.id}, {"$set": {"attempts": 2}})
+        await service.run_leased_task(await service.lease_next_task("w1", 30), "w1")
+        doc = await fetch(service, task.id)
+        assert doc["status"] == "failed" and "abandoned" in doc["error"]
+
+    run(scenario())
+    assert executed == []
+
+
+def test_result_is_not_recorded_after_losing_the_lease(service):
+    async def scenario():
+        task = await service.create_task("document_merge", "u1")
+        leased = await service.lease_next_task("w1", 30)
+        await service.db.tasks.update_one({"id": task.id}, {"$set": {"lease_owner": "w2"}})
+
+        async def done(task, parameters):
+            return {"ok": True}
+
+        service._execute_task = done
+        await service.run_leased_task(leased, "w1")
+        doc = await fetch(service, task.id)
+        assert doc["status"] == "processing" and doc["lease_owner"] == "w2"
+
+    run(scenario())
+
+
+def test_completed_task_stores_result(service):
+    async def done(task, parameters):
+        return {"ok": True}
+
+    service._execute_task = done
+
+    async def scenario():
+        task = await service.create_task("document_merge", "u1")
+        await service.run_leased_task(await service.lease_next_task("w1", 30), "w1")
+        status = await service.get_task_status(task.id, "u1")
+        assert status.status == "completed" and status.result == {"ok": True}
+        assert status.progress == 100.0
+
+    run(scenario())
+
+
+def test_users_take_turns_within_a_class(service):
+    async def scenario():
+        for _ in range(3):
+            await service.create_task("document_merge", "heavy")
+        await service.create_task("document_merge", "light")
+        first = await service.lease_next_task("w1", 30)
+        second = await service.lease_next_task("w1", 30)
+        return {first["user_id"], second["user_id"]}
+
+    assert run(scenario()) == {"heavy", "light"}
+
+
+def test_excluded_classes_are_skipped(service):
+    async def scenario():
+        await service.create_task("batch_document_processing", "u1")
+        assert await service.lease_next_task("w1", 30, exclude_classes={"bulk"}) is None
+        assert (await service.lease_next_task("w1", 30))["priority"] == "bulk"
+
+    run(scenario())
@@ -0,0 +1,168 @@
+import asyncio
+from collections import Counter
+from datetime import datetime
+
+import pytest
+
+from services.task_scheduler import FairScheduler, resolve_priority
+from services.task_service import TaskService
+from services.task_worker import TaskWorker
+
+
+def serve(scheduler, candidates, rounds):
+    served = Counter()
+    for _ in range(rounds):
+        priority, user_id = scheduler.choose(candidates)
+        scheduler.charge(priority, user_id, 0.0)
+        served[(priority, user_id)] += 1
+    return served
+
+
+def test_resolve_priority_defaults_by_task_type():
+    assert resolve_priority("document_summarization") == "interactive"
+    assert resolve_priority("batch_document_processing") == "bulk"
+    assert resolve_priority("unknown_type") == "normal"
+
+
+def test_resolve_priority_may_lower_but_not_raise():
+    assert resolve_priority("document_summarization", "bulk") == "bulk"
+    assert resolve_priority("batch_document_processing", "interactive") == "bulk"
+    assert resolve_priority("document_merge", "interactive") == "normal"
+
+
+def test_resolve_priority_rejects_unknown_class():
+    with pytest.raises(ValueError):
+        resolve_priority("document_merge", "urgent")
+
+
+def test_classes_are_served_in_proportion_to_weight():
+    scheduler = FairScheduler()
+    served = serve(scheduler, {("interactive", "u1"), ("normal", "u1"), ("bulk", "u1")}, 210)
+    assert served[("interactive", "u1")] == 160
+    assert served[("normal", "u1")] == 40
+    assert served[("bulk", "u1")] == 10
+
+
+def test_users_take_turns_within_a_class():
+    scheduler = FairScheduler()
+    served = serve(scheduler, {("bulk", "heavy"), ("bulk", "light")}, 10)
+    assert served[("bulk", "heavy")] == served[("bulk", "light")] == 5
+
+
+def test_returning_class_does_not_burst():
+    scheduler = FairScheduler()
+    serve(scheduler, {("normal", "u1")}, 50)
+    candidates = {("normal", "u1"), ("bulk", "u2")}
+    scheduler.retain(candidates)
+    served = serve(scheduler, candidates, 10)
+    assert served[("bulk", "u2")] <= 2
+
+
+class FakeTaskService:
+    def __init__(self, tasks):
+        self.tasks = list(tasks)
+        self.task_handles = {}
+        self.release = asyncio.Event()
+
+    async def lease_next_task(self, worker_id, visibility_timeout, exclude_classes=None):
+        for task in self.tasks:
+            if task["priority"] not in (exclude_classes or ()):
+                self.tasks.remove(task)
+                return task
+        return None
+
+    async def run_leased_task(self, task_doc, worker_id):
+        await self.release.wait()
+
+    async def extend_lease(self, task_id, worker_id, visibility_timeout):
+        return True
+
+
+def test_worker_reserves_slots_for_non_bulk_work():
+    async def scenario():
+        service = FakeTaskService([{"id": f"b{i}", "priority": "bulk"} for i in range(4)])
+        worker = TaskWorker(service, concurrency=3, poll_interval=0.01, reserved_slots=1)
+        await worker.start()
+        await asyncio.sleep(0.05)
+        assert worker.get_stats()["bulk_running"] == 2
+
+        service.tasks.append({"id": "i1", "priority": "interactive"})
+        worker.notify()
+        await asyncio.sleep(0.05)
+        assert "i1" in worker._running
+
+        service.release.set()
+        await worker.stop(grace_period=1)
+
+    asyncio.run(scenario())
+
+
+def test_user_weights_skew_turns_within_a_class():
+    scheduler = FairScheduler(user_weights={"team": 3.0})
+    served = serve(scheduler, {("normal", "team"), ("normal", "solo")}, 40)
+    assert served[("normal", "team")] == 30 and served[("normal", "solo")] == 10
+
+
+def test_leases_do_not_rescan_the_queue_each_time(db):
+    service = TaskService(db)
+    scans = []
+    refresh = service._refresh_candidates
+
+    async def counting_refresh(runnable):
+        scans.append(1)
+        await refresh(runnable)
+
+    service._refresh_candidates = counting_refresh
+
+    async def scenario():
+        for i in range(30):
+            await db.tasks.insert_one({
+                "id": f"t{i}", "task_type": "document_merge", "user_id": f"u{i % 3}",
+                "status": "pending", "priority": "normal", "attempts": 0,
+                "available_at": datetime.utcnow(), "created_at": datetime.utcnow()
+            })
+        leased = [await service.lease_next_task("w1", 30) for _ in range(31)]
+        return leased
+
+    leased = asyncio.run(scenario())
+    assert len({task["id"] for task in leased[:30]}) == 30 and leased[30] is None
+    assert len(scans) <= 2
+
+
+def test_work_from_other_processes_is_found_after_a_refresh(db):
+    service = TaskService(db)
+    service.candidate_refresh_interval = 0
+
+    async def scenario():
+        await service.create_task("document_merge", "local")
+        await db.tasks.insert_one({
+            "id": "remote", "task_type": "document_summarization", "user_id": "remote",
+            "status": "pending", "priority": "interactive", "attempts": 0,
+            "available_at": datetime.utcnow(), "created_at": datetime.utcnow()
+        })
+        return await service.lease_next_task("w1", 30)
+
+    assert asyncio.run(scenario())["id"] == "remote"
+
+
+def test_queue_stats_are_admin_only(db):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    import dependencies
+    from routes import tasks
+
+    service = TaskService(db)
+    app = FastAPI()
+    app.include_router(tasks.router)
+    app.dependency_overrides[dependencies.get_task_service] = lambda: service
+    client = TestClient(app)
+
+    prefix = tasks.router.prefix
+    app.dependency_overrides[dependencies.get_current_user] = lambda: "u1"
+    assert client.get(f"{prefix}/stats/queue").status_code == 403
+
+    app.dependency_overrides[dependencies.get_current_user] = lambda: "admin"
+    response = client.get(f"{prefix}/stats/queue")
+    assert response.status_code == 200
+    assert set(response.json()) == {"interactive", "normal", "bulk"}
@@ -0,0 +1,47 @@
+import asyncio
+
+from services.task_service import TaskService
+
+
+def test_stats_group_by_status_and_type(db):
+    service = TaskService(db)
+
+    async def scenario():
+        await db.tasks.insert_many([
+            {"id": "1", "user_id": "u1", "status": "completed", "task_type": "document_merge"},
+            {"id": "2", "user_id": "u1", "status": "completed", "task_type": "document_analysis"},
+            {"id": "3", "user_id": "u1", "status": "failed", "task_type": "document_merge"},
+            {"id": "4", "user_id": "u1", "status": "pending", "task_type": "document_merge"},
+            {"id": "5", "user_id": "u1", "status": "processing", "task_type": "document_analysis"},
+            {"id": "6", "user_id": "u2", "status": "completed", "task_type": "document_merge"},
+        ])
+        return await service.get_task_stats("u1")
+
+    assert asyncio.run(scenario()) == {
+        "total_tasks": 5,
+        "completion_rate": 40.0,
+        "status_breakdown": {"completed": 2, "failed": 1, "pending": 1, "processing": 1},
+        "type_breakdown": {"document_merge": 3, "document_analysis": 2},
+        "active_tasks": 2
+    }
+
+
+def test_stats_for_user_without_tasks(db):
+    stats = asyncio.run(TaskService(db).get_task_stats("nobody"))
+    assert stats["total_tasks"] == 0 and stats["completion_rate"] == 0
+
+
+def test_stats_are_cached_until_a_task_is_created(db):
+    service = TaskService(db)
+
+    async def scenario():
+        await service.create_task("document_merge", "u1")
+        assert (await service.get_task_stats("u1"))["total_tasks"] == 1
+
+        await db.tasks.insert_one({"id": "x", "user_id": "u1", "status": "pending", "task_type": "document_merge"})
+        assert (await service.get_task_stats("u1"))["total_tasks"] == 1  # Served from cache
+
+        await service.create_task("document_merge", "u1")
+        assert (await service.get_task_stats("u1"))["total_tasks"] == 3
+
+    asyncio.run(scenario())
@@ -0,0 +1,74 @@
+from utils import ttl_cache
+from utils.ttl_cache import TTLCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_cache(monkeypatch, **kwargs):
+    clock = Clock()
+    monkeypatch.setattr(ttl_cache.time, "monotonic", clock)
+    return TTLCache(**kwargs), clock
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    cache, clock = make_cache(monkeypatch, ttl=30)
+    cache.set("a", 1)
+    clock.now += 29.9
+    assert cache.get("a") == 1
+    clock.now += 0.1
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_per_entry_ttl_overrides_default(monkeypatch):
+    cache, clock = make_cache(monkeypatch, ttl=30)
+    cache.set("short", 1, ttl=5)
+    cache.set("long", 2)
+    clock.now += 10
+    assert cache.get("short") is None
+    assert cache.get("long") == 2
+
+
+def test_invalidate_and_clear(monkeypatch):
+    cache, _ = make_cache(monkeypatch, ttl=30)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.invalidate("a")
+    cache.invalidate("missing")
+    assert cache.get("a") is None and cache.get("b") == 2
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_set_is_skipped_after_a_concurrent_invalidation(monkeypatch):
+    cache, _ = make_cache(monkeypatch, ttl=30)
+    generation = cache.generation
+    cache.invalidate("a")
+    assert cache.set("a", "stale", if_generation=generation) is False
+    assert cache.get("a") is None
+    assert cache.set("a", "fresh", if_generation=cache.generation) is True
+    assert cache.get("a") == "fresh"
+
+
+def test_evicts_least_recently_used_beyond_max_size(monkeypatch):
+    cache, _ = make_cache(monkeypatch, ttl=30, max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+
+def test_stats_count_hits_and_misses(monkeypatch):
+    cache, _ = make_cache(monkeypatch, ttl=30)
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("b")
+    assert cache.get_stats() == {"size": 1, "hits": 1, "misses": 1, "hit_rate": 0.5}
@@ -0,0 +1,79 @@
+import asyncio
+import os
+
+from services.tts_service import MockSpeechSynthesizer, TTSService
+
+
+class FixedSizeSynthesizer(MockSpeechSynthesizer):
+    """Returns 100 bytes per phrase so byte budgets are easy to reason about"""
+
+    def synthesize(self, text, voice, language):
+        return text.encode("utf-8").ljust(100, b"\0")
+
+
+def synthesize(service, *texts):
+    async def run():
+        return [await service.synthesize(text) for text in texts]
+    return asyncio.run(run())
+
+
+def age(service, audio_id, seconds):
+    path = service._path_for(audio_id)
+    stat = path.stat()
+    os.utime(path, (stat.st_atime - seconds, stat.st_mtime - seconds))
+
+
+def test_repeated_phrase_is_served_from_cache(tmp_path):
+    service = TTSService(str(tmp_path), synthesizer=FixedSizeSynthesizer())
+    first, second = synthesize(service, "hello", "hello")
+    assert not first["cached"] and second["cached"]
+    assert first["audio_id"] == second["audio_id"]
+    assert service.get_stats()["entries"] == 1
+
+
+def test_evicts_least_recently_used_by_bytes(tmp_path):
+    service = TTSService(str(tmp_path), max_bytes=250, synthesizer=FixedSizeSynthesizer())
+    a, b = synthesize(service, "a", "b")
+    age(service, a["audio_id"], 20)
+    age(service, b["audio_id"], 10)
+    assert service.get_audio_path(a["audio_id"])  # Touch a, so b is now the oldest
+
+    (c,) = synthesize(service, "c")
+    assert service.get_audio_path(b["audio_id"]) is None
+    assert service.get_audio_path(a["audio_id"]) and service.get_audio_path(c["audio_id"])
+    assert service.get_stats()["total_bytes"] == 200
+
+
+def test_newest_entry_survives_even_if_over_budget(tmp_path):
+    service = TTSService(str(tmp_path), max_bytes=50, synthesizer=FixedSizeSynthesizer())
+    (a,) = synthesize(service, "a")
+    assert service.get_audio_path(a["audio_id"])
+
+
+def test_processes_share_the_store_on_disk(tmp_path):
+    writer = TTSService(str(tmp_path), max_bytes=250, synthesizer=FixedSizeSynthesizer())
+    reader = TTSService(str(tmp_path), max_bytes=250, synthesizer=FixedSizeSynthesizer())
+
+    (a,) = synthesize(writer, "a")
+    assert reader.get_audio_path(a["audio_id"]) == writer.get_audio_path(a["audio_id"])
+    assert synthesize(reader, "a")[0]["cached"]
+
+    # The budget counts files the other process wrote
+    age(writer, a["audio_id"], 10)
+    synthesize(writer, "b")
+    synthesize(reader, "c")
+    assert writer.get_audio_path(a["audio_id"]) is None
+    assert reader.get_stats()["total_bytes"] == 200
+
+
+def test_unknown_or_malformed_ids_are_not_found(tmp_path):
+    service = TTSService(str(tmp_path), synthesizer=FixedSizeSynthesizer())
+    assert service.get_audio_path("0" * 64) is None
+    assert service.get_audio_path("../secret") is None
+
+
+def test_duration_matches_the_synthesizer(tmp_path):
+    service = TTSService(str(tmp_path))
+    short, longer = synthesize(service, "hi", "x" * 40)
+    assert short["duration"] == 0.5
+    assert longer["duration"] == 2.0